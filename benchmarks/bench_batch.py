@@ -0,0 +1,111 @@
+# benchmarks/bench_batch.py
+"""批量任务基准：同样一批计划请求，逐个阻塞调用 /generate_plan 与一次提交 /batch_plans 的对比。
+
+阻塞方式下客户端为每个计划保持一个连接（受准入控制限制，可能收到 429/503）；
+批量方式只需一次提交加一个 NDJSON 结果流，相同的请求在任务内只执行一次。
+
+用法: python -m benchmarks.bench_batch --items 200 --distinct 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+import httpx
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app
+
+CITIES = ["杭州", "苏州", "南京", "成都", "西安", "厦门", "青岛", "长沙", "重庆", "昆明"]
+INTERESTS = [["美食", "历史"], ["自然"], ["购物"]]
+
+
+def make_items(n_items: int, distinct: int) -> list:
+    """生成 n_items 个请求，其中只有 distinct 个不同（按目的地、出发日期与兴趣区分）"""
+    items = []
+    for i in range(n_items):
+        k = i % distinct
+        day = 1 + (k // len(CITIES)) % 27
+        items.append({
+            "departure": "上海",
+            "destination": CITIES[k % len(CITIES)],
+            "start_date": f"2025-10-{day:02d}",
+            "end_date": f"2025-10-{day + 1:02d}",
+            "interests": INTERESTS[(k // (len(CITIES) * 27)) % len(INTERESTS)],
+        })
+    return items
+
+
+async def blocking(base_url: str, items: list) -> dict:
+    limits = httpx.Limits(max_connections=len(items))
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def one(i: int, item: dict) -> int:
+            response = await client.post(f"/api/v1/generate_plan/blocking-{i}", json=item)
+            return response.status_code
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(one(i, item) for i, item in enumerate(items)))
+        wall = time.perf_counter() - start
+    return {"wall": wall, "statuses": dict(Counter(statuses)), "connections": len(items)}
+
+
+async def batch(base_url: str, items: list) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        start = time.perf_counter()
+        submitted = (await client.post("/api/v1/batch_plans", json={"requests": items})).json()
+        first_result = None
+        outcomes: Counter = Counter()
+        async with client.stream("GET", f"/api/v1/batch_plans/{submitted['job_id']}/results") as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                if first_result is None:
+                    first_result = time.perf_counter() - start
+                outcomes[json.loads(line)["status"]] += 1
+        wall = time.perf_counter() - start
+        progress = (await client.get(f"/api/v1/batch_plans/{submitted['job_id']}")).json()
+    return {
+        "wall": wall,
+        "first_result": first_result or 0.0,
+        "outcomes": dict(outcomes),
+        "unique": progress["unique"],
+        "connections": 2,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=50, help="其中不同请求的数量，其余为重复项")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--amap-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    items = make_items(args.items, max(1, min(args.distinct, args.items)))
+
+    with ServerThread(create_fake_llm_app(args.llm_latency)) as llm, ServerThread(create_fake_amap_app(args.amap_latency)) as amap:
+        # 必须在导入 src 之前设置，使客户端指向替身服务
+        os.environ["QWEN_API_URL"] = f"{llm.url}/v1"
+        os.environ["QWEN_API_KEY"] = "bench"
+        os.environ["AMAP_BASE_URL"] = amap.url
+        os.environ["AMAP_API_KEY"] = "bench"
+        os.environ.setdefault("LOG_PROFILE", "production")
+        # 关闭计划缓存，两种方式都从零开始执行；批量任务内的去重不依赖计划缓存
+        os.environ["PLAN_CACHE_ENABLED"] = "false"
+        os.environ.setdefault("POI_INDEX_PATH", "")
+
+        from src.app import app
+
+        with ServerThread(app) as server:
+            blocking_result = asyncio.run(blocking(server.url, items))
+            batch_result = asyncio.run(batch(server.url, items))
+
+    print(f"请求数: {len(items)}  其中不同请求: {batch_result['unique']}")
+    print(f"逐个阻塞调用: 总耗时 {blocking_result['wall']:.2f}s  客户端连接 {blocking_result['connections']}  "
+          f"状态码 {blocking_result['statuses']}")
+    print(f"批量任务:     总耗时 {batch_result['wall']:.2f}s  客户端连接 {batch_result['connections']}  "
+          f"首个结果 {batch_result['first_result']:.2f}s  结果 {batch_result['outcomes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_brownout.py
+"""高德故障基准：先在高德正常时生成一批计划填充缓存，等缓存过期后让高德所有接口挂起（超过工具超时），
+再生成一批计划（一半与预热时相同、一半是新的兴趣），对比开启/关闭熔断器时的计划延迟、
+过期缓存兜底次数、熔断快速失败次数，以及故障期间实际打到高德的请求数。
+每种模式在独立的子进程中运行。
+
+用法: python -m benchmarks.bench_brownout --plans 40 --amap-timeout 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app
+from .bench_model_tiers import parse_counter
+from .run_e2e import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def drive(n_plans: int, concurrency: int, amap_url: str, cache_ttl: float, outage: float) -> dict:
+    import httpx
+
+    from src.app import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client, \
+            httpx.AsyncClient(base_url=amap_url) as amap:
+        async def one(i: int, interest: str) -> float:
+            payload = {
+                "departure": "上海",
+                "destination": "杭州",
+                "start_date": "2025-10-01",
+                "end_date": "2025-10-02",
+                "interests": [interest],
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f"/api/v1/generate_plan/brownout-{i}", json=payload)
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+        await asyncio.gather(*(one(i, f"兴趣{i}") for i in range(n_plans // 2)))
+        # 等预热结果过期，之后只能作为过期缓存兜底
+        await asyncio.sleep(cache_ttl + 0.5)
+        await amap.post("/_bench/outage", params={"seconds": outage})
+        before = (await amap.get("/_bench/stats")).json()["requests"]
+
+        latencies = await asyncio.gather(*(
+            one(n_plans + i, f"兴趣{i // 2}" if i % 2 == 0 else f"新兴趣{i}") for i in range(n_plans)
+        ))
+        upstream = (await amap.get("/_bench/stats")).json()["requests"] - before
+        await amap.post("/_bench/outage", params={"seconds": 0})
+        metrics_text = (await client.get("/metrics")).text
+
+    cache = parse_counter(metrics_text, "trip_tool_cache_total")
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "stale": sum(v for labels, v in cache.items() if 'result="stale"' in labels),
+        "circuit_open": sum(v for labels, v in cache.items() if 'result="circuit_open"' in labels),
+        "upstream": upstream,
+    }
+
+
+def run_mode(args: argparse.Namespace, breaker: bool, llm_url: str, amap_url: str) -> dict:
+    env = {
+        **os.environ,
+        "QWEN_API_URL": f"{llm_url}/v1",
+        "QWEN_API_KEY": "bench",
+        "AMAP_BASE_URL": amap_url,
+        "AMAP_API_KEY": "bench",
+        "LOG_PROFILE": "production",
+        "PLAN_CACHE_ENABLED": "false",
+        "POI_INDEX_PATH": "",
+        "AMAP_PLACE_TIMEOUT": str(args.amap_timeout),
+        "AMAP_ROUTE_TIMEOUT": str(args.amap_timeout),
+        "AMAP_WEATHER_TIMEOUT": str(args.amap_timeout),
+        "AMAP_CACHE_TTL_WEATHER": str(args.cache_ttl),
+        "AMAP_CACHE_TTL_POI_SEARCH": str(args.cache_ttl),
+        "AMAP_CACHE_TTL_POI_DETAIL": str(args.cache_ttl),
+        "AMAP_CACHE_TTL_ROUTE": str(args.cache_ttl),
+        "AMAP_BREAKER_ENABLED": "true" if breaker else "false",
+        # 关闭熔断时也不保留过期结果，对应改动前的行为
+        "AMAP_CACHE_STALE_TTL": "86400" if breaker else "0",
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_brownout", "--child",
+        "--plans", str(args.plans), "--concurrency", str(args.concurrency),
+        "--amap-url", amap_url, "--cache-ttl", str(args.cache_ttl), "--outage", str(args.outage),
+    ]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plans", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--amap-timeout", type=float, default=2.0)
+    parser.add_argument("--cache-ttl", type=float, default=1.0)
+    parser.add_argument("--outage", type=float, default=30.0, help="故障期间高德每个请求挂起的秒数")
+    parser.add_argument("--amap-url", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        result = asyncio.run(drive(args.plans, args.concurrency, args.amap_url, args.cache_ttl, args.outage))
+        print(json.dumps(result))
+        return
+
+    with ServerThread(create_fake_llm_app(args.llm_latency, response_chars=300)) as llm, \
+            ServerThread(create_fake_amap_app(0.02)) as amap:
+        for label, breaker in (("关闭熔断", False), ("开启熔断", True)):
+            result = run_mode(args, breaker, llm.url, amap.url)
+            print(f"{label}: 故障期间计划 p50={result['p50']:.2f}s p95={result['p95']:.2f}s "
+                  f"过期兜底 {result['stale']:.0f} 熔断快速失败 {result['circuit_open']:.0f} "
+                  f"打到高德的请求 {result['upstream']}")
+
+
+if __name__ == "__main__":
+    main()
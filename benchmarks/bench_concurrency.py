@@ -0,0 +1,96 @@
+# benchmarks/bench_concurrency.py
+"""并发基准：验证单个 worker 能同时处理多个旅游计划请求。
+
+用模拟的 LLM 与高德接口（异步 sleep）替换真实网络调用，
+比较 N 个并发请求的总耗时与单个请求耗时。
+
+用法: python -m benchmarks.bench_concurrency --requests 50 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("QWEN_API_KEY", "bench")
+os.environ.setdefault("AMAP_API_KEY", "bench")
+# 所有请求参数相同，关闭计划缓存以测量真实的并发执行
+os.environ.setdefault("PLAN_CACHE_ENABLED", "false")
+# 本地 POI 索引会跨运行保留结果，基准中关闭以测量模拟的高德延迟
+os.environ.setdefault("POI_INDEX_PATH", "")
+# 测量的是事件循环本身的并发能力，关闭准入控制（过载行为见 bench_overload）
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.app import app
+from src.graph import tools
+from src.graph.nodes import router, summarizer
+
+
+def patch_upstreams(llm_latency: float, tool_latency: float) -> None:
+    async def fake_router(prompt_value):
+        await asyncio.sleep(llm_latency)
+        messages = prompt_value.to_messages()
+        if any(isinstance(m, ToolMessage) for m in messages):
+            return AIMessage(content="信息已足够")
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": "get_weather", "args": {"city": "杭州"}, "id": "call_weather"}],
+        )
+
+    async def fake_summarizer(prompt_value):
+        await asyncio.sleep(llm_latency)
+        return AIMessage(content="第一天：西湖。第二天：灵隐寺。")
+
+    async def fake_amap_get(path: str, params: dict, timeout: float) -> dict:
+        await asyncio.sleep(tool_latency)
+        return {"status": "1", "lives": [{"city": params.get("city"), "weather": "晴"}]}
+
+    router.get_router_chain = lambda model_name=None: router.ROUTER_PROMPT | RunnableLambda(fake_router)
+    summarizer.get_summarizer_chain = lambda model_name=None: summarizer.SUMMARIZER_PROMPT | RunnableLambda(fake_summarizer)
+    tools._amap_get = fake_amap_get
+
+
+async def run(n_requests: int) -> None:
+    payload = {
+        "departure": "上海",
+        "destination": "杭州",
+        "start_date": "2025-10-01",
+        "end_date": "2025-10-02",
+        "interests": ["美食", "历史"],
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int) -> float:
+            start = time.perf_counter()
+            response = await client.post(f"/api/v1/generate_plan/bench-{i}", json=payload)
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        single = await one(-1)
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(n_requests)))
+        wall = time.perf_counter() - start
+
+    print(f"单请求耗时:        {single:.3f}s")
+    print(f"并发请求数:        {n_requests}")
+    print(f"并发总耗时:        {wall:.3f}s (串行预估 {single * n_requests:.3f}s)")
+    print(f"最大单请求耗时:    {max(latencies):.3f}s")
+    print(f"吞吐量:            {n_requests / wall:.1f} plans/s")
+    print(f"并发加速比:        {single * n_requests / wall:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tool-latency", type=float, default=0.1)
+    args = parser.parse_args()
+    patch_upstreams(args.llm_latency, args.tool_latency)
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_hedging.py
+"""对冲请求基准：router 主模型有长尾延迟（每 N 次请求有一次很慢），对比开启/关闭对冲时计划延迟的 p50/p95/p99。
+
+开启对冲后，主模型超过其 p95 仍未返回时向备用模型发起第二个请求并采用先返回的结果。
+每种模式在独立的子进程中运行。
+
+用法: python -m benchmarks.bench_hedging --plans 80 --slow-every 10 --slow-latency 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app
+from .bench_model_tiers import parse_counter
+from .run_e2e import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+PRIMARY_MODEL = "qwen-turbo"
+HEDGE_MODEL = "qwen-plus"
+
+
+async def drive(n_plans: int, concurrency: int) -> dict:
+    import httpx
+
+    from src.app import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int) -> float:
+            payload = {
+                "departure": "上海",
+                "destination": "杭州",
+                "start_date": "2025-10-01",
+                "end_date": "2025-10-02",
+                "interests": [f"兴趣{i}"],
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f"/api/v1/generate_plan/hedge-{i}", json=payload)
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+        latencies = await asyncio.gather(*(one(i) for i in range(n_plans)))
+        metrics_text = (await client.get("/metrics")).text
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "hedges": parse_counter(metrics_text, "trip_llm_hedges_total"),
+    }
+
+
+def run_mode(args: argparse.Namespace, hedging: bool, llm_url: str, amap_url: str) -> dict:
+    env = {
+        **os.environ,
+        "QWEN_API_URL": f"{llm_url}/v1",
+        "QWEN_API_KEY": "bench",
+        "AMAP_BASE_URL": amap_url,
+        "AMAP_API_KEY": "bench",
+        "LOG_PROFILE": "production",
+        "PLAN_CACHE_ENABLED": "false",
+        "POI_INDEX_PATH": "",
+        "PREFETCH_ENABLED": "false",
+        "ROUTER_MODEL_NAME": PRIMARY_MODEL,
+        "LLM_HEDGE_ENABLED": "true" if hedging else "false",
+        "LLM_HEDGE_PROVIDER": "qwen",
+        "LLM_HEDGE_MODEL_NAME": HEDGE_MODEL,
+        "LLM_HEDGE_MIN_SAMPLES": str(args.min_samples),
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_hedging", "--child",
+        "--plans", str(args.plans), "--concurrency", str(args.concurrency),
+    ]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plans", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--hedge-latency", type=float, default=0.3)
+    parser.add_argument("--slow-every", type=int, default=10)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--min-samples", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(drive(args.plans, args.concurrency))))
+        return
+
+    llm_app = create_fake_llm_app(
+        args.llm_latency,
+        response_chars=300,
+        model_latency={HEDGE_MODEL: args.hedge_latency},
+        slow_models=(PRIMARY_MODEL,),
+        slow_every=args.slow_every,
+        slow_latency=args.slow_latency,
+    )
+    with ServerThread(llm_app) as llm, ServerThread(create_fake_amap_app(0.02)) as amap:
+        for label, hedging in (("关闭对冲", False), ("开启对冲", True)):
+            result = run_mode(args, hedging, llm.url, amap.url)
+            print(f"{label}: 计划 p50={result['p50']:.2f}s p95={result['p95']:.2f}s p99={result['p99']:.2f}s "
+                  f"对冲 {result['hedges']}")
+
+
+if __name__ == "__main__":
+    main()
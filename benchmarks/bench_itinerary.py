@@ -0,0 +1,107 @@
+# benchmarks/bench_itinerary.py
+"""行程优化基准：比较 optimize_itinerary 与逐对调用 get_route 的方式。
+
+逐对方式需要为每一对景点规划路线后再排序，路线调用数为 n(n-1)/2；
+optimize_itinerary 在本地用距离矩阵完成分天与排序，只为最终相邻的景点规划路线。
+另外比较 NumPy 向量化距离矩阵与纯 Python 双重循环的耗时。
+
+用法: python -m benchmarks.bench_itinerary --pois 15 --days 3 --amap-latency 0.1
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+
+os.environ.setdefault("QWEN_API_KEY", "bench")
+os.environ.setdefault("AMAP_API_KEY", "bench")
+
+import numpy as np
+
+from src.graph import tools
+from src.services.itinerary import EARTH_RADIUS_KM, haversine_matrix
+
+route_calls = 0
+
+
+def patch_amap(latency: float) -> None:
+    async def fake_amap_get(path: str, params: dict, timeout: float) -> dict:
+        global route_calls
+        route_calls += 1
+        await asyncio.sleep(latency)
+        return {"status": "1", "route": {"paths": [{"distance": "1500", "duration": "1200", "steps": []}]}}
+
+    tools._amap_get = fake_amap_get
+
+
+def make_pois(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    hours = ["08:00-17:30", "09:00-21:00", "10:00-22:00", ""]
+    return [
+        {
+            "id": f"B0{i:06d}",
+            "name": f"景点{i}",
+            "location": f"{120.08 + rng.random() * 0.2:.6f},{30.18 + rng.random() * 0.12:.6f}",
+            "open_time": hours[i % len(hours)],
+        }
+        for i in range(n)
+    ]
+
+
+async def pairwise(pois: list, concurrency: int) -> None:
+    """模拟让 LLM 逐对查询路线：每一对景点调用一次 get_route"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def leg(a: dict, b: dict) -> None:
+        async with semaphore:
+            await tools.get_route.ainvoke({"start": a["location"], "end": b["location"], "city": "杭州"})
+
+    await asyncio.gather(*(leg(a, b) for i, a in enumerate(pois) for b in pois[i + 1:]))
+
+
+def python_matrix(coords: list) -> list:
+    def haversine(p, q):
+        lng1, lat1, lng2, lat2 = map(math.radians, (*p, *q))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    return [[haversine(p, q) for q in coords] for p in coords]
+
+
+def main() -> None:
+    global route_calls
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pois", type=int, default=15)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--amap-latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8, help="逐对方式的并发路线请求数")
+    args = parser.parse_args()
+
+    patch_amap(args.amap_latency)
+    pois = make_pois(args.pois)
+
+    start = time.perf_counter()
+    asyncio.run(pairwise(pois, args.concurrency))
+    print(f"逐对 get_route:        {time.perf_counter() - start:.3f}s  路线调用 {route_calls}")
+
+    tools.amap_cache.clear()
+    route_calls = 0
+    start = time.perf_counter()
+    result = asyncio.run(tools.optimize_itinerary.ainvoke({"pois": pois, "days": args.days, "city": "杭州"}))
+    print(f"optimize_itinerary:    {time.perf_counter() - start:.3f}s  路线调用 {route_calls}  "
+          f"直线总距离 {result['total_straight_km']} km")
+
+    for n in (20, 100, 500):
+        coords = [tuple(map(float, p["location"].split(","))) for p in make_pois(n, seed=n)]
+        start = time.perf_counter()
+        python_matrix(coords)
+        python_time = time.perf_counter() - start
+        start = time.perf_counter()
+        haversine_matrix(np.array(coords))
+        numpy_time = time.perf_counter() - start
+        print(f"距离矩阵 n={n:<4} 纯 Python {python_time * 1000:8.2f} ms  NumPy {numpy_time * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_model_tiers.py
+"""分级模型基准：router 与 summarizer 都使用大模型，对比 router 使用小模型（无效工具调用时升级到大模型）。
+
+替身 LLM 按模型名设置延迟，小模型每隔若干次工具调用返回一次缺少必填参数的调用。
+输出每个计划的延迟、各节点/模型的平均延迟、升级次数与估算成本。每种模式在独立的子进程中运行。
+
+用法: python -m benchmarks.bench_model_tiers --plans 30 --large-latency 0.6 --small-latency 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app
+from .run_e2e import parse_histogram_mean, percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+LARGE_MODEL = "qwen3-235b-a22b"
+SMALL_MODEL = "qwen-turbo"
+
+
+def parse_counter(metrics_text: str, name: str) -> dict:
+    values = {}
+    for line in metrics_text.splitlines():
+        if line.startswith(name + "{"):
+            labels, value = line[len(name):].rsplit(" ", 1)
+            values[labels] = float(value)
+    return values
+
+
+async def drive(n_plans: int, concurrency: int) -> dict:
+    import httpx
+
+    from src.app import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int) -> float:
+            payload = {
+                "departure": "上海",
+                "destination": "杭州",
+                "start_date": "2025-10-01",
+                "end_date": "2025-10-02",
+                "interests": [f"兴趣{i}"],
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f"/api/v1/generate_plan/tiers-{i}", json=payload)
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+        latencies = await asyncio.gather(*(one(i) for i in range(n_plans)))
+        metrics_text = (await client.get("/metrics")).text
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "model_latency": parse_histogram_mean(metrics_text, "trip_llm_model_duration_seconds"),
+        "cost": sum(parse_counter(metrics_text, "trip_llm_cost_total").values()) / n_plans,
+        "escalations": sum(parse_counter(metrics_text, "trip_router_escalations_total").values()),
+    }
+
+
+def run_mode(args: argparse.Namespace, router_model: str, llm_url: str, amap_url: str) -> dict:
+    env = {
+        **os.environ,
+        "QWEN_API_URL": f"{llm_url}/v1",
+        "QWEN_API_KEY": "bench",
+        "AMAP_BASE_URL": amap_url,
+        "AMAP_API_KEY": "bench",
+        "LOG_PROFILE": "production",
+        "PLAN_CACHE_ENABLED": "false",
+        "POI_INDEX_PATH": "",
+        # 关闭预取，使每个计划都经过多轮 router 决策
+        "PREFETCH_ENABLED": "false",
+        "QWEN_MODEL_NAME": LARGE_MODEL,
+        "ROUTER_MODEL_NAME": router_model,
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_model_tiers", "--child",
+        "--plans", str(args.plans), "--concurrency", str(args.concurrency),
+    ]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plans", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--large-latency", type=float, default=0.6)
+    parser.add_argument("--small-latency", type=float, default=0.15)
+    parser.add_argument("--tool-rounds", type=int, default=2)
+    parser.add_argument("--invalid-every", type=int, default=5, help="小模型每 N 次工具调用出错一次，0 表示不出错")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(drive(args.plans, args.concurrency))))
+        return
+
+    llm_app = create_fake_llm_app(
+        args.large_latency,
+        tool_rounds=args.tool_rounds,
+        model_latency={LARGE_MODEL: args.large_latency, SMALL_MODEL: args.small_latency},
+        invalid_tool_models=(SMALL_MODEL,),
+        invalid_tool_every=args.invalid_every,
+    )
+    with ServerThread(llm_app) as llm, ServerThread(create_fake_amap_app(0.02)) as amap:
+        for label, router_model in (("单一大模型", LARGE_MODEL), ("分级模型", SMALL_MODEL)):
+            result = run_mode(args, router_model, llm.url, amap.url)
+            print(f"{label}: 计划 p50={result['p50']:.2f}s p95={result['p95']:.2f}s "
+                  f"成本/计划={result['cost']:.4f} 升级次数={result['escalations']:.0f}")
+            for labels, mean in sorted(result["model_latency"].items()):
+                print(f"    LLM 平均延迟 {labels}: {mean:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
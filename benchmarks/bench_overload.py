@@ -0,0 +1,163 @@
+# benchmarks/bench_overload.py
+"""过载基准：瞬间涌入大量计划请求，比较开启/关闭准入控制时的成功率与延迟。
+
+模拟的 LLM 服务商只允许有限的并发调用，超出部分直接报限流错误，且延迟随并发数增加；
+未开启准入控制时所有请求一起涌向上游，开启后超出容量的请求会排队或快速收到 429/503。
+每种模式在独立的子进程中运行（配置在导入时读取）。
+
+用法: python -m benchmarks.bench_overload --requests 200 --provider-limit 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def patch_upstreams(llm_latency: float, provider_limit: int) -> None:
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.runnables import RunnableLambda
+
+    from src.graph import tools
+    from src.graph.nodes import router, summarizer
+
+    in_flight = 0
+
+    async def provider_call(result: AIMessage) -> AIMessage:
+        nonlocal in_flight
+        if in_flight >= provider_limit:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("429 Too Many Requests: provider rate limit exceeded")
+        in_flight += 1
+        try:
+            # 上游排队：并发越高单次调用越慢
+            await asyncio.sleep(llm_latency * (1 + in_flight / provider_limit))
+            return result
+        finally:
+            in_flight -= 1
+
+    async def fake_router(prompt_value):
+        messages = prompt_value.to_messages()
+        if any(isinstance(m, ToolMessage) for m in messages):
+            return await provider_call(AIMessage(content="信息已足够"))
+        return await provider_call(AIMessage(
+            content="",
+            tool_calls=[{"name": "get_weather", "args": {"city": "杭州"}, "id": "call_weather"}],
+        ))
+
+    async def fake_summarizer(prompt_value):
+        return await provider_call(AIMessage(content="第一天：西湖。第二天：灵隐寺。"))
+
+    async def fake_amap_get(path: str, params: dict, timeout: float) -> dict:
+        await asyncio.sleep(0.02)
+        return {"status": "1", "lives": [{"city": params.get("city"), "weather": "晴"}]}
+
+    router.get_router_chain = lambda model_name=None: router.ROUTER_PROMPT | RunnableLambda(fake_router)
+    summarizer.get_summarizer_chain = lambda model_name=None: summarizer.SUMMARIZER_PROMPT | RunnableLambda(fake_summarizer)
+    tools._amap_get = fake_amap_get
+
+
+async def spike(n_requests: int) -> dict:
+    import httpx
+
+    from src.app import app
+
+    payload = {
+        "departure": "上海",
+        "destination": "杭州",
+        "start_date": "2025-10-01",
+        "end_date": "2025-10-02",
+        "interests": ["美食", "历史"],
+    }
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int):
+            start = time.perf_counter()
+            response = await client.post(f"/api/v1/generate_plan/overload-{i}", json=payload)
+            ok = response.status_code == 200 and "错误" not in response.text
+            outcome = "ok" if ok else ("degraded" if response.status_code == 200 else str(response.status_code))
+            return outcome, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(n_requests)))
+        wall = time.perf_counter() - start
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    ok_latencies = [latency for outcome, latency in results if outcome == "ok"]
+    rejected_latencies = [latency for outcome, latency in results if outcome in ("429", "503")]
+    return {
+        "wall": wall,
+        "outcomes": dict(outcomes),
+        "ok_p50": statistics.median(ok_latencies) if ok_latencies else 0.0,
+        "ok_p95": _percentile(ok_latencies, 0.95),
+        "rejected_p50": statistics.median(rejected_latencies) if rejected_latencies else 0.0,
+    }
+
+
+def child(args: argparse.Namespace) -> None:
+    patch_upstreams(args.llm_latency, args.provider_limit)
+    print(json.dumps(asyncio.run(spike(args.requests))))
+
+
+def run_mode(args: argparse.Namespace, admission: bool) -> dict:
+    env = {
+        **os.environ,
+        "QWEN_API_KEY": "bench",
+        "AMAP_API_KEY": "bench",
+        "LOG_PROFILE": "production",
+        "PLAN_CACHE_ENABLED": "false",
+        "POI_INDEX_PATH": "",
+        "PREFETCH_ENABLED": "false",
+        "ADMISSION_ENABLED": "true" if admission else "false",
+        "ADMISSION_MAX_CONCURRENT": str(args.max_concurrent),
+        "ADMISSION_MAX_QUEUE": str(args.max_queue),
+        "ADMISSION_MAX_WAIT": str(args.max_wait),
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_overload", "--child",
+        "--requests", str(args.requests),
+        "--llm-latency", str(args.llm_latency),
+        "--provider-limit", str(args.provider_limit),
+    ]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--provider-limit", type=int, default=20)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    for admission in (False, True):
+        result = run_mode(args, admission)
+        label = "准入控制开启" if admission else "准入控制关闭"
+        print(f"{label}: 总耗时 {result['wall']:.2f}s 结果 {result['outcomes']}")
+        print(f"    成功请求 p50={result['ok_p50']:.2f}s p95={result['ok_p95']:.2f}s"
+              f"  被拒请求 p50={result['rejected_p50'] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
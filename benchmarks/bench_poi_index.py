@@ -0,0 +1,72 @@
+# benchmarks/bench_poi_index.py
+"""本地 POI 索引基准：比较 search_poi / get_opening_hours 请求高德（模拟延迟）与命中本地索引的耗时。
+
+每轮都清空进程内的高德响应缓存，模拟新进程或缓存过期后的重复查询。
+
+用法: python -m benchmarks.bench_poi_index --queries 200 --amap-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("QWEN_API_KEY", "bench")
+os.environ.setdefault("AMAP_API_KEY", "bench")
+os.environ["POI_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "poi_index.sqlite")
+
+from src.graph import tools
+from src.services.poi_index import open_poi_index
+
+
+def patch_amap(latency: float) -> None:
+    async def fake_amap_get(path: str, params: dict, timeout: float) -> dict:
+        await asyncio.sleep(latency)
+        city = params.get("city", "杭州")
+        if path == "/v3/place/detail":
+            return {"status": "1", "count": "1", "pois": [{
+                "id": params["id"], "name": "景点", "location": "120.150000,30.250000", "cityname": "杭州市",
+                "biz_ext": {"open_time": "08:00-17:30"},
+            }]}
+        pois = [
+            {"id": f"{params.get('keywords')}-{i}", "name": f"{city}{params.get('keywords')}{i}",
+             "type": "风景名胜", "cityname": f"{city}市", "location": f"{120.15 + i * 0.001:.6f},30.250000"}
+            for i in range(5)
+        ]
+        return {"status": "1", "count": "5", "pois": pois}
+
+    tools._amap_get = fake_amap_get
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def run(queries: int) -> None:
+    keywords = [f"景点{i}" for i in range(queries)]
+    for label in ("首次查询（高德）", "重复查询（本地索引）"):
+        tools.amap_cache.clear()
+        search, detail = [], []
+        for i, keyword in enumerate(keywords):
+            search.append(await timed(tools.search_poi.ainvoke({"keyword": keyword, "city": "杭州"})))
+            detail.append(await timed(tools.get_opening_hours.ainvoke({"poi_id": f"B{i:05d}"})))
+        print(f"{label:<16} search_poi p50={statistics.median(search) * 1000:8.3f} ms  "
+              f"get_opening_hours p50={statistics.median(detail) * 1000:8.3f} ms")
+    print(open_poi_index().stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--amap-latency", type=float, default=0.1)
+    args = parser.parse_args()
+    open_poi_index()
+    patch_amap(args.amap_latency)
+    asyncio.run(run(args.queries))
+
+
+if __name__ == "__main__":
+    main()
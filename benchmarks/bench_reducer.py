@@ -0,0 +1,89 @@
+# benchmarks/bench_reducer.py
+"""微基准：比较“节点返回完整历史副本”与 append_messages reducer 的单步开销。
+
+两个图的状态都只有 messages 一个字段，都只有一个循环节点，每步追加一条消息，按历史长度分段统计单步平均耗时。
+快照方式由节点复制历史，通道直接替换；增量方式节点只返回新消息，由 reducer 拼接出新列表。
+
+两种方式每步都要复制一次历史（增量方式中 LangGraph 为条件边求值还会额外应用一次 reducer），
+单步耗时都随历史长度缓慢增长，增量方式略慢（2000 步时总耗时多 5% 左右）。append_messages 的作用是让节点只返回新增消息、
+不再自行复制与合并历史，而不是降低单步开销；在实际会话的历史长度（数十条消息）下两者的差别可以忽略。
+
+用法: python -m benchmarks.bench_reducer --steps 2000
+"""
+import argparse
+import time
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langgraph.graph import END, START, StateGraph
+
+from src.graph.state import append_messages
+
+PAYLOAD = "景点信息" * 200
+
+
+class SnapshotState(TypedDict, total=False):
+    messages: List[BaseMessage]
+
+
+reducer_calls = 0
+
+
+def counted_append_messages(left, right):
+    global reducer_calls
+    reducer_calls += 1
+    return append_messages(left, right)
+
+
+class DeltaState(TypedDict, total=False):
+    messages: Annotated[List[BaseMessage], counted_append_messages]
+
+
+def build_loop_graph(state_type, delta: bool, steps: int, timings: List[float]):
+    def step(state):
+        timings.append(time.perf_counter())
+        message = AIMessage(content=PAYLOAD)
+        if delta:
+            return {"messages": [message]}
+        return {"messages": state.get("messages", []) + [message]}
+
+    def should_continue(state) -> str:
+        return "step" if len(state["messages"]) < steps else END
+
+    builder = StateGraph(state_type)
+    builder.add_node("step", step)
+    builder.add_edge(START, "step")
+    builder.add_conditional_edges("step", should_continue, {"step": "step", END: END})
+    return builder.compile()
+
+
+def run(label: str, state_type, delta: bool, steps: int, buckets: int) -> None:
+    global reducer_calls
+    reducer_calls = 0
+    timings: List[float] = []
+    graph = build_loop_graph(state_type, delta, steps, timings)
+    start = time.perf_counter()
+    graph.invoke({"messages": []}, {"recursion_limit": steps + 10})
+    total = time.perf_counter() - start
+
+    deltas = [b - a for a, b in zip(timings, timings[1:])]
+    size = max(1, len(deltas) // buckets)
+    print(f"{label}: 总耗时 {total:.3f}s")
+    if delta:
+        print(f"  reducer 调用 {reducer_calls} 次（每步 {reducer_calls / steps:.1f} 次）")
+    for i in range(0, len(deltas), size):
+        chunk = deltas[i:i + size]
+        print(f"  历史 {i:>6}-{i + len(chunk):<6} 单步平均 {sum(chunk) / len(chunk) * 1e6:8.1f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--buckets", type=int, default=5)
+    args = parser.parse_args()
+    run("快照（messages + [new]）", SnapshotState, delta=False, steps=args.steps, buckets=args.buckets)
+    run("增量（append_messages）", DeltaState, delta=True, steps=args.steps, buckets=args.buckets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_startup.py
+"""冷启动基准：测量 `import src.app` 的耗时（含 -X importtime 中最慢的模块）
+以及启用/关闭预热时首个请求与后续请求的延迟。
+
+用法: python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import src.app; print(time.perf_counter() - t)"
+
+FIRST_REQUEST_SNIPPET = """
+import sys, time, httpx
+from benchmarks.fake_servers import ServerThread
+from src.app import app
+
+payload = {"departure": "上海", "destination": "杭州", "start_date": "2025-10-01", "end_date": "2025-10-02"}
+start = time.perf_counter()
+with ServerThread(app) as server:
+    startup = time.perf_counter() - start
+    timings = []
+    for i in range(3):
+        t = time.perf_counter()
+        httpx.post(f"{server.url}/api/v1/generate_plan/s{i}", json={**payload, "interests": [str(i)]}, timeout=None)
+        timings.append(time.perf_counter() - t)
+print(startup, *timings)
+"""
+
+
+def run_python(snippet: str, env: dict, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", snippet], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    stderr = run_python("import src.app", env, "-X", "importtime").stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 格式: "import time: <self us> | <cumulative us> | <module>"
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with ServerThread(create_fake_llm_app(args.llm_latency)) as llm, ServerThread(create_fake_amap_app(0.02)) as amap:
+        env = {
+            **os.environ,
+            "QWEN_API_URL": f"{llm.url}/v1",
+            "QWEN_API_KEY": "bench",
+            "AMAP_BASE_URL": amap.url,
+            "AMAP_API_KEY": "bench",
+            "LOG_PROFILE": "production",
+            "PLAN_CACHE_ENABLED": "false",
+            "POI_INDEX_PATH": "",
+        }
+
+        import_times = [float(run_python(IMPORT_SNIPPET, env).stdout.strip()) for _ in range(args.runs)]
+        print(f"import src.app: mean={statistics.mean(import_times) * 1000:.1f} ms "
+              f"min={min(import_times) * 1000:.1f} ms")
+        print(f"累计耗时最长的 {args.top} 个模块导入:")
+        for cumulative_us, name in slowest_imports(env, args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        for prewarm in ("false", "true"):
+            output = run_python(FIRST_REQUEST_SNIPPET, {**env, "PREWARM_ENABLED": prewarm}).stdout.split()
+            startup, first, *rest = (float(v) for v in output)
+            print(f"PREWARM_ENABLED={prewarm}: 启动 {startup * 1000:.0f} ms, 首个请求 {first * 1000:.0f} ms, "
+                  f"后续请求 {statistics.mean(rest) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# benchmarks/fake_servers.py
+"""本地替身服务：OpenAI 兼容的 LLM 服务与高德地图 REST 服务。
+
+两者的延迟与响应大小均可配置，供基准测试在无网络环境下驱动完整的图执行。
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    """在后台线程中运行 uvicorn，避免替身服务与被测应用争用同一个事件循环"""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.port = port or find_free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _plan_tool_calls(destination: str) -> List[Dict[str, Any]]:
+    calls = [("get_weather", {"city": destination}), ("search_poi", {"keyword": "景点", "city": destination})]
+    return [
+        {
+            "index": i,
+            "id": f"call_{i}_{name}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)},
+        }
+        for i, (name, args) in enumerate(calls)
+    ]
+
+
+def create_fake_llm_app(latency: float = 0.5, response_chars: int = 1500, tool_rounds: int = 1,
+                        chunk_chars: int = 20, model_latency: Optional[Dict[str, float]] = None,
+                        invalid_tool_models: Sequence[str] = (), invalid_tool_every: int = 0,
+                        slow_models: Sequence[str] = (), slow_every: int = 0, slow_latency: float = 0.0) -> FastAPI:
+    """OpenAI 兼容的 /chat/completions：
+    - 请求带 tools、没有预取上下文且已完成的工具轮次少于 tool_rounds 时返回工具调用；
+    - 否则返回 response_chars 个字符的行程文本（支持流式）；
+    - model_latency 按模型名覆盖延迟；invalid_tool_models 中的模型每 invalid_tool_every 次工具调用
+      返回一次缺少必填参数的调用，用于模拟小模型出错；
+    - slow_models 中的模型每 slow_every 次请求有一次耗时 slow_latency，用于模拟长尾延迟。
+    """
+    app = FastAPI()
+    text = ("第1天：上午游览西湖，中午品尝本地美食，下午参观博物馆。\n\n" * (response_chars // 30 + 1))[:response_chars]
+    tool_responses = {"count": 0}
+    model_requests: Dict[str, int] = {}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        messages = body.get("messages", [])
+        rounds = sum(1 for m in messages if m.get("role") == "assistant" and m.get("tool_calls"))
+        # 已有预取上下文时与真实模型的预期行为一致：直接进入总结
+        prefetched = any(str(m.get("content") or "").startswith("[预取信息]") for m in messages)
+        wants_tools = bool(body.get("tools")) and rounds < tool_rounds and not prefetched
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_chars,
+            "completion_tokens": 0 if wants_tools else len(text),
+            "total_tokens": prompt_chars + (0 if wants_tools else len(text)),
+        }
+        model_requests[model] = model_requests.get(model, 0) + 1
+        if model in slow_models and slow_every and model_requests[model] % slow_every == 0:
+            await asyncio.sleep(slow_latency)
+        else:
+            await asyncio.sleep((model_latency or {}).get(model, latency))
+        tool_calls = _plan_tool_calls("杭州") if wants_tools else []
+        if wants_tools and model in invalid_tool_models and invalid_tool_every:
+            tool_responses["count"] += 1
+            if tool_responses["count"] % invalid_tool_every == 0:
+                tool_calls[-1]["function"]["arguments"] = json.dumps({"keyword": "景点"}, ensure_ascii=False)
+
+        if not body.get("stream"):
+            message: Dict[str, Any] = {"role": "assistant", "content": "" if wants_tools else text}
+            if wants_tools:
+                message["tool_calls"] = [
+                    {k: v for k, v in call.items() if k != "index"} for call in tool_calls
+                ]
+            return JSONResponse({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if wants_tools else "stop",
+                }],
+                "usage": usage,
+            })
+
+        async def stream():
+            if wants_tools:
+                yield _chunk(model, {"role": "assistant", "content": None, "tool_calls": tool_calls})
+                yield _chunk(model, {}, "tool_calls")
+            else:
+                yield _chunk(model, {"role": "assistant", "content": ""})
+                for i in range(0, len(text), chunk_chars):
+                    yield _chunk(model, {"content": text[i:i + chunk_chars]})
+                yield _chunk(model, {}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def create_fake_amap_app(latency: float = 0.1, pois: int = 5) -> FastAPI:
+    """高德地图 REST 替身，覆盖工具用到的全部接口。
+
+    POST /_bench/outage?seconds=N 之后每个请求额外挂起 N 秒（模拟高德故障），N=0 恢复；
+    GET /_bench/stats 返回收到的请求数。
+    """
+    app = FastAPI()
+    state = {"outage": 0.0, "requests": 0}
+
+    async def respond() -> None:
+        state["requests"] += 1
+        await asyncio.sleep(latency + state["outage"])
+
+    @app.post("/_bench/outage")
+    async def outage(seconds: float = 0.0):
+        state["outage"] = seconds
+        return {"outage": seconds}
+
+    @app.get("/_bench/stats")
+    async def stats():
+        return {"requests": state["requests"]}
+
+    def poi(i: int, city: str) -> Dict[str, Any]:
+        return {
+            "id": f"B0FFF{i:05d}",
+            "name": f"{city}景点{i}",
+            "type": "风景名胜",
+            "address": f"{city}某路{i}号",
+            "location": f"{120.15 + i * 0.01:.6f},{30.25 + i * 0.005:.6f}",
+            "biz_ext": {"rating": "4.6", "open_time": "08:00-17:30"},
+        }
+
+    @app.get("/v3/place/text")
+    async def place_text(city: str = "", keywords: str = "", offset: int = 5):
+        await respond()
+        count = min(pois, offset) if offset else pois
+        return {"status": "1", "count": str(count), "pois": [poi(i, city) for i in range(count)]}
+
+    @app.get("/v3/place/around")
+    async def place_around(location: str = "", keywords: str = ""):
+        await respond()
+        return {"status": "1", "count": str(pois), "pois": [poi(i, "附近") for i in range(pois)]}
+
+    @app.get("/v3/place/detail")
+    async def place_detail(id: str = ""):
+        await respond()
+        detail = poi(0, "杭州")
+        detail["id"] = id
+        return {"status": "1", "count": "1", "pois": [detail]}
+
+    @app.get("/v3/weather/weatherInfo")
+    async def weather(city: str = "", extensions: str = "base"):
+        await respond()
+        if extensions == "all":
+            casts = [
+                {"date": f"2025-10-0{i + 1}", "dayweather": "晴", "nightweather": "多云",
+                 "daytemp": "26", "nighttemp": "18"}
+                for i in range(4)
+            ]
+            return {"status": "1", "forecasts": [{"city": city, "casts": casts}]}
+        return {"status": "1", "lives": [{"city": city, "weather": "晴", "temperature": "24"}]}
+
+    @app.get("/v3/direction/{mode}")
+    async def direction(mode: str, origin: str = "", destination: str = ""):
+        await respond()
+        steps = [
+            {"instruction": f"沿道路步行{i * 100}米", "distance": str(i * 100), "duration": str(i * 80),
+             "polyline": ";".join(["120.150000,30.250000"] * 20)}
+            for i in range(1, 6)
+        ]
+        return {"status": "1", "route": {"origin": origin, "destination": destination,
+                                         "paths": [{"distance": "1500", "duration": "1200", "steps": steps}]}}
+
+    return app
@@ -0,0 +1,125 @@
+# benchmarks/replay_suite.py
+"""基于 cicd/testdata 的录制/回放回归与性能套件。
+
+目录约定：
+    cicd/testdata/input/<trace>.json        请求轨迹：{"request": TravelRequest, "chats": ["..."]}
+    cicd/testdata/expected/<trace>.msgpack  录制的 LLM 与高德地图响应
+    cicd/testdata/expected/<trace>.json     录制时的接口输出
+    cicd/testdata/output/<trace>.json       回放时的接口输出与耗时
+
+用法:
+    python -m benchmarks.replay_suite record   # 需要真实的 QWEN_API_KEY / AMAP_API_KEY
+    python -m benchmarks.replay_suite replay   # 无需网络与密钥，可在 CI 中运行
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+TESTDATA = Path(__file__).resolve().parent.parent / "cicd" / "testdata"
+
+
+async def run_trace(client, name: str, trace: Dict[str, Any]) -> Dict[str, Any]:
+    session_id = f"trace-{name}"
+    start = time.perf_counter()
+    outputs: List[Any] = []
+    response = await client.post(f"/api/v1/generate_plan/{session_id}", json=trace["request"])
+    outputs.append(response.json())
+    for message in trace.get("chats", []):
+        response = await client.post(f"/api/v1/chat/{session_id}", json={"message": message})
+        outputs.append(response.json())
+    return {"outputs": outputs, "duration": time.perf_counter() - start}
+
+
+async def run_suite(mode: str, traces: List[Path]) -> int:
+    import httpx
+
+    from src.app import app
+    from src.core.cassette import cassette
+    from src.core.llm_cache import llm_cache
+    from src.graph.tools import amap_cache
+    from src.services.plan_cache import plan_cache
+
+    failures = 0
+    durations: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+        for trace_file in traces:
+            name = trace_file.stem
+            cassette_file = TESTDATA / "expected" / f"{name}.msgpack"
+            expected_file = TESTDATA / "expected" / f"{name}.json"
+            # 每条轨迹独立：切换录制文件并清空进程内缓存，保证回放结果与顺序无关
+            cassette.load(str(cassette_file), mode)
+            amap_cache.clear()
+            llm_cache.memory.clear()
+            plan_cache.clear()
+            result = await run_trace(client, name, json.loads(trace_file.read_text(encoding="utf-8")))
+
+            if mode == "record":
+                cassette.save()
+                expected_file.write_text(json.dumps(result["outputs"], ensure_ascii=False, indent=2), encoding="utf-8")
+                print(f"[record] {name}: {len(cassette.interactions)} interactions, {result['duration']:.2f}s")
+                continue
+
+            durations.append(result["duration"])
+            expected = json.loads(expected_file.read_text(encoding="utf-8")) if expected_file.exists() else None
+            matched = expected == result["outputs"]
+            if not matched or cassette.misses:
+                failures += 1
+            output_file = TESTDATA / "output" / f"{name}.json"
+            output_file.write_text(
+                json.dumps({**result, "matched": matched, "misses": cassette.misses}, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+            status = "ok" if matched and not cassette.misses else "FAIL"
+            print(f"[{status}] {name}: {result['duration'] * 1000:.1f} ms, misses={cassette.misses}")
+
+    if durations:
+        ordered = sorted(durations)
+        print(
+            f"回放 {len(durations)} 条轨迹，失败 {failures}；图执行开销 "
+            f"mean={statistics.mean(durations) * 1000:.1f} ms "
+            f"p95={ordered[int(0.95 * (len(ordered) - 1))] * 1000:.1f} ms"
+        )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("traces", nargs="*", help="轨迹名（默认 input 目录下全部）")
+    args = parser.parse_args()
+
+    traces = sorted((TESTDATA / "input").glob("*.json"))
+    if args.traces:
+        traces = [t for t in traces if t.stem in args.traces]
+    if args.mode == "replay":
+        for trace in traces:
+            if not (TESTDATA / "expected" / f"{trace.stem}.msgpack").exists():
+                print(f"[skip] {trace.stem}: 未找到录制文件")
+        traces = [t for t in traces if (TESTDATA / "expected" / f"{t.stem}.msgpack").exists()]
+    if not traces:
+        print("没有可运行的轨迹")
+        return
+
+    # 必须在导入 src 之前设置，使 LLM 与高德客户端挂上录制/回放 transport
+    os.environ["CASSETTE_MODE"] = args.mode
+    os.environ["CASSETTE_PATH"] = str(TESTDATA / "expected" / f"{traces[0].stem}.msgpack")
+    if args.mode == "replay":
+        os.environ.setdefault("QWEN_API_KEY", "replay")
+        os.environ.setdefault("AMAP_API_KEY", "replay")
+        os.environ.setdefault("LOG_PROFILE", "production")
+    # 本地 POI 索引会让高德调用取决于之前的运行，录制与回放都需要确定的请求序列
+    os.environ["POI_INDEX_PATH"] = ""
+
+    failures = asyncio.run(run_suite(args.mode, traces))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
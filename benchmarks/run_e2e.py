@@ -0,0 +1,176 @@
+# benchmarks/run_e2e.py
+"""离线端到端基准：启动 LLM 与高德替身服务，以给定并发驱动 /api/v1/generate_plan 与 /api/v1/chat，
+输出吞吐量、p50/p95/p99 延迟、每请求 router 迭代次数以及内存占用。
+
+用法:
+    python -m benchmarks.run_e2e --users 50 --concurrency 20 --llm-latency 0.5 --amap-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+import httpx
+
+from .fake_servers import ServerThread, create_fake_amap_app, create_fake_llm_app, find_free_port
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def parse_histogram_mean(metrics_text: str, name: str) -> Dict[str, float]:
+    """从 /metrics 输出中计算某个直方图每个标签的平均值"""
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for line in metrics_text.splitlines():
+        if line.startswith(f"{name}_sum"):
+            labels, value = line[len(name) + 4:].rsplit(" ", 1)
+            sums[labels] = float(value)
+        elif line.startswith(f"{name}_count"):
+            labels, value = line[len(name) + 6:].rsplit(" ", 1)
+            counts[labels] = float(value)
+    return {labels: sums[labels] / counts[labels] for labels in sums if counts.get(labels)}
+
+
+async def drive(
+    base_url: str, users: int, concurrency: int, chats: int
+) -> Tuple[Dict[str, List[float]], int, str]:
+    latencies: Dict[str, List[float]] = {"generate_plan": [], "chat": []}
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {
+        "departure": "上海",
+        "destination": "杭州",
+        "start_date": "2025-10-01",
+        "end_date": "2025-10-03",
+        "interests": ["美食", "历史"],
+    }
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def timed(endpoint: str, url: str, body: dict) -> None:
+            nonlocal errors
+            start = time.perf_counter()
+            response = await client.post(url, json=body)
+            if response.status_code != 200:
+                errors += 1
+                return
+            latencies[endpoint].append(time.perf_counter() - start)
+
+        async def user(i: int) -> None:
+            async with semaphore:
+                await timed("generate_plan", f"/api/v1/generate_plan/bench-{i}", payload)
+                for _ in range(chats):
+                    await timed("chat", f"/api/v1/chat/bench-{i}", {"message": "第二天能换成室内景点吗？"})
+
+        await asyncio.gather(*(user(i) for i in range(users)))
+        metrics_text = (await client.get("/metrics")).text
+
+    return latencies, errors, metrics_text
+
+
+@contextmanager
+def serve_app(workers: int) -> Iterator[str]:
+    """workers 为 1 时在后台线程中运行应用；大于 1 时以子进程启动多 worker 的 uvicorn，会话放在共享的 SQLite 中"""
+    if workers <= 1:
+        from src.app import app
+
+        with ServerThread(app) as server:
+            yield server.url
+        return
+
+    port = find_free_port()
+    env = {**os.environ, "SESSION_BACKEND": "sqlite",
+           "SESSION_DB_PATH": os.path.join(tempfile.mkdtemp(), "sessions.sqlite")}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"{url}/metrics", timeout=1)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("uvicorn workers failed to start")
+                time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="虚拟用户数，每个用户生成一次计划")
+    parser.add_argument("--chats", type=int, default=1, help="每个用户在计划后追加的对话轮数")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-response-chars", type=int, default=1500)
+    parser.add_argument("--tool-rounds", type=int, default=1, help="每次计划中 LLM 发起的工具调用轮数")
+    parser.add_argument("--amap-latency", type=float, default=0.1)
+    parser.add_argument("--amap-pois", type=int, default=5)
+    parser.add_argument("--plan-cache", action="store_true", help="启用计划级缓存（默认关闭，否则相同请求全部命中缓存）")
+    parser.add_argument("--workers", type=int, default=1, help="应用 worker 进程数；大于 1 时 /metrics 只反映其中一个 worker")
+    parser.add_argument("--no-prefetch", action="store_true", help="关闭计划请求的预取阶段，对比每个计划的 router 迭代次数")
+    args = parser.parse_args()
+
+    llm_server = ServerThread(create_fake_llm_app(args.llm_latency, args.llm_response_chars, args.tool_rounds))
+    amap_server = ServerThread(create_fake_amap_app(args.amap_latency, args.amap_pois))
+    with llm_server, amap_server:
+        # 必须在导入 src 之前设置，使客户端指向替身服务
+        os.environ["QWEN_API_URL"] = f"{llm_server.url}/v1"
+        os.environ["QWEN_API_KEY"] = "bench"
+        os.environ["AMAP_BASE_URL"] = amap_server.url
+        os.environ["AMAP_API_KEY"] = "bench"
+        os.environ.setdefault("LOG_PROFILE", "production")
+        os.environ["PLAN_CACHE_ENABLED"] = "true" if args.plan_cache else "false"
+        os.environ["PREFETCH_ENABLED"] = "false" if args.no_prefetch else "true"
+        os.environ.setdefault("POI_INDEX_PATH", "")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with serve_app(args.workers) as app_url:
+            start = time.perf_counter()
+            latencies, errors, metrics_text = asyncio.run(drive(app_url, args.users, args.concurrency, args.chats))
+            wall = time.perf_counter() - start
+        rss_usage = resource.RUSAGE_SELF if args.workers <= 1 else resource.RUSAGE_CHILDREN
+        rss_after = resource.getrusage(rss_usage).ru_maxrss
+
+    # macOS 上 ru_maxrss 单位为字节，Linux 上为 KB
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    total = sum(len(values) for values in latencies.values())
+    print(f"请求总数: {total}  错误: {errors}  总耗时: {wall:.2f}s  吞吐量: {total / wall:.2f} req/s")
+    for endpoint in ("generate_plan", "chat"):
+        values = latencies[endpoint]
+        if not values:
+            continue
+        print(
+            f"{endpoint:<14} n={len(values):<5} mean={statistics.mean(values):.3f}s "
+            f"p50={percentile(values, 0.50):.3f}s p95={percentile(values, 0.95):.3f}s "
+            f"p99={percentile(values, 0.99):.3f}s"
+        )
+    for labels, mean in parse_histogram_mean(metrics_text, "trip_router_iterations").items():
+        print(f"router 迭代次数/请求 {labels}: {mean:.2f}")
+    for labels, mean in parse_histogram_mean(metrics_text, "trip_tool_result_tokens_saved").items():
+        print(f"工具结果投影节省的 token/请求 {labels}: {mean:.0f}")
+    print(f"峰值 RSS: {rss_after * rss_unit / 2**20:.1f} MB (应用启动前 {rss_before * rss_unit / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
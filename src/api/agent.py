@@ -1,13 +1,24 @@
 import re
-from fastapi import FastAPI
+import json
+import asyncio
+from typing import AsyncIterator, Optional, Union
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from langchain_core.messages import HumanMessage
 from datetime import datetime
 from fastapi import APIRouter
 
-from ..graph.graph import build_graph
+from ..graph.graph import get_graph, graph_run_config, release_graph_thread
 from ..graph.state import initialize_graph_state, GraphState
-from ..schemas import TravelRequest, UserInput
-from ..logger import get_logger
+from ..schemas import BatchPlanRequest, TravelRequest, UserInput
+from ..core.deadline import deadline_scope, set_deadline
+from ..core.metrics import finish_request, start_request, track_request
+from ..logger import get_logger, log_payload, log_structured, summarize_state
+from ..services.batch_jobs import BatchJobRejected, BatchJobsUnavailable, batch_job_manager
+from ..services.plan_cache import is_cacheable_plan, plan_cache, plan_cache_key, seed_session_state
+from ..services.session_store import session_store
+from ..settings import settings
+from ..utils.cache import LoadCancelled
 
 
 app = APIRouter()
@@ -15,46 +26,89 @@ app = APIRouter()
 logger = get_logger(service=__name__)
 
 
-user_sessions = {}
-def get_session(session_id: str):
-    if session_id not in user_sessions:
-        initial_state = initialize_graph_state()
-        user_sessions[session_id] = {
-            "graph": build_graph(), 
-            "state": initial_state  
-        }
-    return user_sessions[session_id]
+async def get_session(session_id: str):
+    return await session_store.aget(session_id)
 
 
-@app.post("/generate_plan/{session_id}")
-async def generate_plan(session_id: str, request: TravelRequest):
-    session = get_session(session_id)
+def _build_plan_state(request: TravelRequest) -> GraphState:
     start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
     end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
     days = (end_date - start_date).days + 1 # 利用 datetime 对象计算日期差值
 
+    requirements = []
+    if request.avoid_crowds:
+        requirements.append("避开拥挤场所")
+    if request.team_outing:
+        requirements.append("团队出行，优先选择适合多人同行的景点、餐厅与交通方式")
+
     prompt = (
         f"生成{days}天的旅游计划: \n"
         f"- 出发地: {request.departure}\n"
         f"- 目的地: {request.destination}\n"
         f"- 旅行日期: {request.start_date}至{request.end_date}\n"
         f"- 兴趣偏好: {request.interests}\n"
-        f"- 特殊要求：{'避开拥挤场所' if request.avoid_crowds else '无'}\n"
+        f"- 特殊要求：{'；'.join(requirements) or '无'}\n"
     )
 
     # 初始化图状态
     initialized_state: GraphState = initialize_graph_state()
     initialized_state["messages"].append(HumanMessage(content=prompt))
     initialized_state["max_iterations"] = 0 
-    session["state"] = initialized_state
-    logger.info(f"generate_plan: Initial State: {session['state']}")
-    
-    # 最终图状态
-    final_state: GraphState = session["graph"].invoke(session["state"])
-    logger.info(f"generate_plan: Final State: {final_state}")
-    
-    # 更新会话记录
-    session["state"]= final_state
+    initialized_state["travel_request"] = request.model_dump()
+    return initialized_state
+
+
+def _append_chat_message(session: dict, user_input: UserInput) -> None:
+    # 当前计划不再写入历史，由 build_context_window 附加到最新一条用户消息
+    user_msg_content = user_input.message
+
+    # 初始化图状态
+    if "messages" not in session["state"] or not isinstance(session["state"]["messages"], list):
+        session["state"]["messages"] = []
+    session["state"]["messages"].append(HumanMessage(content=user_msg_content))
+    session["state"]["max_iterations"] = session["state"].get("max_iterations", 0) + 1
+
+
+async def _run_plan_graph(session_id: str, request: TravelRequest, initial_state: GraphState) -> GraphState:
+    """执行计划图；相同请求命中计划缓存，并发的相同请求共享同一次图执行"""
+    async def run() -> GraphState:
+        return await get_graph().ainvoke(initial_state, await graph_run_config(session_id))
+
+    if not settings.PLAN_CACHE_ENABLED:
+        return await run()
+    return await plan_cache.get_or_load(plan_cache_key(request), run, should_cache=is_cacheable_plan)
+
+
+def _timeout_response(session_id: str, error: Exception) -> JSONResponse:
+    logger.warning(f"graph run exceeded its deadline: {error}")
+    return JSONResponse({"error": "生成超时，请稍后重试", "session_id": session_id}, status_code=504)
+
+
+@app.post("/generate_plan/{session_id}")
+async def generate_plan(session_id: str, request: TravelRequest):
+    async with session_store.lock(session_id):
+        session = await get_session(session_id)
+        session["state"] = _build_plan_state(request)
+        log_structured("generate_plan.start", {"session_id": session_id, **summarize_state(session["state"])})
+        log_payload(logger, "generate_plan: Initial State", session["state"])
+
+        # 最终图状态
+        try:
+            with track_request("generate_plan") as request_metrics, deadline_scope(settings.REQUEST_DEADLINE):
+                final_state: GraphState = await _run_plan_graph(session_id, request, session["state"])
+        except TimeoutError as e:
+            return _timeout_response(session_id, e)
+        log_structured("generate_plan.end", {
+            "session_id": session_id,
+            "tool_tokens_saved": request_metrics.tool_tokens_saved,
+            "llm_cost": round(request_metrics.llm_cost, 6),
+            **summarize_state(final_state),
+        })
+        log_payload(logger, "generate_plan: Final State", final_state)
+
+        # 更新会话记录（缓存中的状态可能被多个会话共享，需复制后再写入会话）
+        session["state"] = seed_session_state(final_state)
+        await session_store.asave(session_id, session)
 
     # 提取并整理有效输出
     messages = final_state.get("messages", [])
@@ -68,29 +122,24 @@ async def generate_plan(session_id: str, request: TravelRequest):
 
 @app.post("/chat/{session_id}")
 async def chat_endpoint(session_id: str, user_input: UserInput):
-    session = get_session(session_id)
-    
-    # 附加当前计划作为上下文
-    user_msg_content = user_input.message
-    context_message = ""
-    if session["state"].get("current_plan"):
-        context_message = f"当前旅游计划：{session['state']['current_plan']}\n"
-    
-    full_user_msg = f"{context_message}, 用户问题：{user_msg_content}"
-    
-    # 初始化图状态
-    if "messages" not in session["state"] or not isinstance(session["state"]["messages"], list):
-        session["state"]["messages"] = []
-    session["state"]["messages"].append(HumanMessage(content=full_user_msg))
-    session["state"]["max_iterations"] = session["state"].get("max_iterations", 0) + 1
-    logger.info(f"chat_endpoint: Initial State: {session['state']}")
+    async with session_store.lock(session_id):
+        session = await get_session(session_id)
+        _append_chat_message(session, user_input)
+        log_structured("chat.start", {"session_id": session_id, **summarize_state(session["state"])})
+        log_payload(logger, "chat_endpoint: Initial State", session["state"])
 
-    # 最终图状态
-    final_state: GraphState = session["graph"].invoke(session["state"])
-    logger.info(f"chat_endpoint: Final State: {final_state}")
+        # 最终图状态
+        try:
+            with track_request("chat"), deadline_scope(settings.REQUEST_DEADLINE):
+                final_state: GraphState = await get_graph().ainvoke(session["state"], await graph_run_config(session_id))
+        except TimeoutError as e:
+            return _timeout_response(session_id, e)
+        log_structured("chat.end", {"session_id": session_id, **summarize_state(final_state)})
+        log_payload(logger, "chat_endpoint: Final State", final_state)
 
-    # 更新会话记录
-    session["state"]= final_state
+        # 更新会话记录
+        session["state"]= final_state
+        await session_store.asave(session_id, session)
 
     # 提取并整理有效输出
     messages = final_state.get("messages", [])
@@ -102,6 +151,213 @@ async def chat_endpoint(session_id: str, user_input: UserInput):
     return {"response": cleaned_output, "session_id": session_id}
 
 
+@app.post("/generate_plan/{session_id}/stream")
+async def generate_plan_stream(session_id: str, request: TravelRequest):
+    cache_key = plan_cache_key(request) if settings.PLAN_CACHE_ENABLED else None
+    return _sse_response(_plan_stream_events(session_id, request, cache_key))
+
+
+@app.post("/chat/{session_id}/stream")
+async def chat_stream(session_id: str, user_input: UserInput):
+    return _sse_response(_chat_stream_events(session_id, user_input))
+
+
+async def _run_batch_item(item_id: str, request: TravelRequest) -> dict:
+    """批量任务中的单个计划：不创建会话，与交互式接口共享计划缓存"""
+    try:
+        with track_request("batch_plan"), deadline_scope(settings.REQUEST_DEADLINE):
+            final_state: GraphState = await _run_plan_graph(item_id, request, _build_plan_state(request))
+    finally:
+        await release_graph_thread(item_id)
+    messages = final_state.get("messages", [])
+    if not messages:
+        raise ValueError("未生成任何内容")
+    return {"plan": clean_agent_output(messages[-1].content)}
+
+
+def _get_batch_job(job_id: str):
+    job = batch_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="批量任务不存在或已过期")
+    return job
+
+
+@app.post("/batch_plans", status_code=202)
+async def submit_batch_plans(batch: BatchPlanRequest):
+    try:
+        job = batch_job_manager.submit(batch.requests, _run_batch_item)
+    except BatchJobRejected as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except BatchJobsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    log_structured("batch_plans.submit", {"job_id": job.job_id, "total": job.total, "unique": len(job.groups)})
+    return job.progress()
+
+
+@app.get("/batch_plans/{job_id}")
+async def batch_plan_progress(job_id: str):
+    return _get_batch_job(job_id).progress()
+
+
+@app.get("/batch_plans/{job_id}/results")
+async def batch_plan_results(job_id: str, offset: int = 0):
+    """按完成顺序以 NDJSON 推送结果，全部完成后结束；offset 为已读取的条数，用于断线续读"""
+    job = _get_batch_job(job_id)
+
+    async def lines() -> AsyncIterator[str]:
+        async for result in job.stream_results(max(offset, 0)):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/sessions/stats")
+async def session_stats():
+    return await session_store.astats()
+
+
+GRAPH_NODES = ("prefetch", "router", "tool_executor", "summarizer")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _chat_stream_events(session_id: str, user_input: UserInput) -> AsyncIterator[str]:
+    # 会话锁在整个流式响应期间持有，客户端断开时随生成器关闭释放
+    async with session_store.lock(session_id):
+        session = await get_session(session_id)
+        _append_chat_message(session, user_input)
+        log_structured("chat_stream.start", {"session_id": session_id, **summarize_state(session["state"])})
+        async for event in _stream_graph(session, session_id, result_key="response", endpoint="chat_stream"):
+            yield event
+
+
+async def _plan_stream_events(session_id: str, request: TravelRequest, cache_key: Optional[tuple]) -> AsyncIterator[str]:
+    """流式计划：命中缓存直接返回；相同计划正在执行（流式或非流式）时等待其结果；否则由本请求执行图。
+    缓存判断与登记之间没有 await，并发的相同请求不会重复执行图"""
+    async with session_store.lock(session_id):
+        session = await get_session(session_id)
+        session["state"] = _build_plan_state(request)
+        log_structured("generate_plan_stream.start", {"session_id": session_id, **summarize_state(session["state"])})
+        if cache_key is None:
+            async for event in _stream_graph(session, session_id, result_key="plan", endpoint="generate_plan_stream"):
+                yield event
+            return
+
+        cached_state = plan_cache.get(cache_key)
+        inflight = plan_cache.join_inflight(cache_key) if cached_state is None else None
+        if cached_state is not None or inflight is not None:
+            async for event in _shared_plan_events(session, session_id, inflight if inflight is not None else cached_state):
+                yield event
+            return
+
+        load = plan_cache.begin_load(cache_key)
+        try:
+            async for event in _stream_graph(
+                session, session_id, result_key="plan", endpoint="generate_plan_stream", cache_key=cache_key
+            ):
+                yield event
+        except (asyncio.CancelledError, GeneratorExit):
+            # 客户端断开：等待中的非流式请求重新发起执行，而不是跟着失败
+            plan_cache.fail_load(cache_key, LoadCancelled("计划生成已中断"))
+            raise
+        finally:
+            # 执行失败：让等待中的相同请求收到错误，而不是一直等待
+            if not load.done():
+                plan_cache.fail_load(cache_key, RuntimeError("计划生成失败"))
+
+
+async def _shared_plan_events(
+    session: dict, session_id: str, result: Union[GraphState, asyncio.Future]
+) -> AsyncIterator[str]:
+    """不执行图：直接使用缓存中的计划，或等待进行中的相同计划完成"""
+    yield _sse("start", {"session_id": session_id, "cached": True})
+    if isinstance(result, asyncio.Future):
+        try:
+            result = await asyncio.shield(result)
+        except Exception as e:
+            yield _sse("error", {"error": str(e), "session_id": session_id})
+            return
+    if not result or not result.get("messages"):
+        yield _sse("error", {"error": "未生成任何内容", "session_id": session_id})
+        return
+    session["state"] = seed_session_state(result)
+    await session_store.asave(session_id, session)
+    cleaned_output = clean_agent_output(result["messages"][-1].content)
+    yield _sse("done", {"plan": cleaned_output, "session_id": session_id, "cached": True})
+
+
+async def _stream_graph(
+    session: dict, session_id: str, result_key: str, endpoint: str, cache_key: Optional[tuple] = None
+) -> AsyncIterator[str]:
+    """以 SSE 事件推送图执行进度：节点切换、工具调用以及 summarizer 的增量输出；
+    cache_key 不为空时调用方已通过 plan_cache.begin_load 登记了这次执行"""
+    yield _sse("start", {"session_id": session_id})
+
+    cleaner = IncrementalCleaner()
+    final_state: Optional[GraphState] = None
+    request_metrics = start_request(endpoint)
+    set_deadline(settings.REQUEST_DEADLINE)
+    try:
+        async for event in get_graph().astream_events(
+            session["state"], await graph_run_config(session_id), version="v2"
+        ):
+            kind = event["event"]
+            name = event.get("name")
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chain_start" and name in GRAPH_NODES and node == name:
+                yield _sse("node_start", {"node": name})
+            elif kind == "on_chain_end" and name in GRAPH_NODES and node == name:
+                payload = {"node": name}
+                output = event["data"].get("output")
+                if name == "router" and isinstance(output, dict):
+                    payload["next_node"] = output.get("next_node")
+                yield _sse("node_end", payload)
+            elif kind == "on_tool_start":
+                yield _sse("tool_start", {"tool": name, "args": event["data"].get("input")})
+            elif kind == "on_tool_end":
+                yield _sse("tool_end", {"tool": name})
+            elif kind == "on_chat_model_stream" and node == "summarizer":
+                chunk = event["data"]["chunk"]
+                delta = cleaner.feed(chunk.content if isinstance(chunk.content, str) else "")
+                if delta:
+                    yield _sse("token", {"text": delta})
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                final_state = event["data"].get("output")
+    except Exception as e:
+        logger.exception(f"_stream_graph: graph execution failed: {e}")
+        yield _sse("error", {"error": str(e), "session_id": session_id})
+        return
+    finally:
+        finish_request(request_metrics)
+
+    tail = cleaner.flush()
+    if tail:
+        yield _sse("token", {"text": tail})
+
+    if not final_state or not final_state.get("messages"):
+        yield _sse("error", {"error": "未生成任何内容", "session_id": session_id})
+        return
+
+    # 更新会话记录；等待同一计划的其他请求同时拿到结果
+    if cache_key is not None:
+        plan_cache.finish_load(cache_key, final_state, should_cache=is_cacheable_plan)
+    session["state"] = seed_session_state(final_state)
+    await session_store.asave(session_id, session)
+    cleaned_output = clean_agent_output(final_state["messages"][-1].content)
+    yield _sse("done", {result_key: cleaned_output, "session_id": session_id})
+
+
 def clean_agent_output(text: str) -> str:
     if not text:
         return ""
@@ -111,6 +367,38 @@ def clean_agent_output(text: str) -> str:
     return re.sub(r"\n\s*\n", "\n\n", text).strip()
 
 
+class IncrementalCleaner:
+    """对流式输出增量执行 clean_agent_output：按空行切分，只输出已完整的段落"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        # 工具调用标签尚未闭合时继续缓冲，避免把半截标签推给前端
+        if self._buffer.count("<tool_code>") > self._buffer.count("</tool_code>"):
+            return ""
+        last_tag_end = self._buffer.rfind("</tool_code>")
+        index = self._buffer.rfind("\n\n", last_tag_end + 1 if last_tag_end >= 0 else 0)
+        if index < 0:
+            return ""
+        ready, self._buffer = self._buffer[:index], self._buffer[index + 2:]
+        return self._emit(ready)
+
+    def flush(self) -> str:
+        ready, self._buffer = self._buffer, ""
+        return self._emit(ready)
+
+    def _emit(self, text: str) -> str:
+        cleaned = clean_agent_output(text)
+        if not cleaned:
+            return ""
+        prefix = "\n\n" if self._emitted else ""
+        self._emitted = True
+        return prefix + cleaned
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
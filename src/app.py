@@ -11,12 +11,16 @@ def main():
 
     from .settings import settings
 
+    # 多 worker 时会话必须放在进程间共享的存储中；uvicorn 不支持 reload 与多 worker 同时使用
+    if settings.WORKERS > 1 and settings.SESSION_BACKEND == "memory":
+        raise ValueError("WORKERS > 1 需要设置 SESSION_BACKEND=sqlite，否则后续对话可能落到没有该会话的 worker 上")
     uvicorn.run(
         "src.app:app",
         host=settings.HOST,
         port=settings.PORT,
         log_level="info",
-        reload=True,
+        reload=settings.RELOAD and settings.WORKERS == 1,
+        workers=settings.WORKERS,
     )
 
 
@@ -0,0 +1,138 @@
+# src/core/cassette.py
+"""LLM 与高德地图 HTTP 调用的录制/回放。
+
+record 模式下转发真实请求并把响应写入磁盘（ormsgpack 编码）；
+replay 模式下完全不访问网络，按请求内容确定性地返回录制的响应。
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+import ormsgpack
+import xxhash
+
+from ..logger import get_logger
+from ..settings import settings
+
+logger = get_logger(service=__name__)
+
+CASSETTE_VERSION = 1
+# 不参与请求匹配的查询参数（密钥等）
+IGNORED_QUERY_PARAMS = ("key",)
+# 录制时已解码响应体，这些头不能原样回放
+STRIPPED_RESPONSE_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+class CassetteMissError(httpx.TransportError):
+    """回放模式下找不到匹配的录制响应"""
+
+
+def request_key(request: httpx.Request) -> str:
+    query = sorted((k, v) for k, v in request.url.params.multi_items() if k not in IGNORED_QUERY_PARAMS)
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    except ValueError:
+        pass
+    digest = xxhash.xxh3_64()
+    digest.update(f"{request.method} {request.url.host}{request.url.path}?{urlencode(query)}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class Cassette:
+    def __init__(self, mode: str = "off", path: Optional[str] = None):
+        self.mode = mode
+        self.path = path
+        self.interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("record", "replay")
+
+    def load(self, path: str, mode: str) -> None:
+        """切换到另一个录制文件；回放模式下文件必须存在"""
+        self.path = path
+        self.mode = mode
+        self.interactions = {}
+        self._positions = {}
+        self.misses = 0
+        file = Path(path)
+        if file.exists():
+            data = ormsgpack.unpackb(file.read_bytes())
+            self.interactions = data.get("interactions", {})
+        elif mode == "replay":
+            raise FileNotFoundError(f"cassette not found: {path}")
+
+    def save(self) -> None:
+        if self.mode != "record" or not self.path:
+            return
+        file = Path(self.path)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(ormsgpack.packb({"version": CASSETTE_VERSION, "interactions": self.interactions}))
+        logger.info(f"Cassette: saved {len(self.interactions)} interactions to {self.path}")
+
+    def record(self, key: str, entry: Dict[str, Any]) -> None:
+        self.interactions.setdefault(key, []).append(entry)
+
+    def play(self, key: str) -> Optional[Dict[str, Any]]:
+        """同一请求被录制多次时按顺序返回，超出后重复最后一次"""
+        entries = self.interactions.get(key)
+        if not entries:
+            self.misses += 1
+            return None
+        position = self._positions.get(key, 0)
+        self._positions[key] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.play(key)
+            if entry is None:
+                raise CassetteMissError(
+                    f"no recorded response for {request.method} {request.url.path}", request=request
+                )
+            return httpx.Response(
+                entry["status"], headers=entry["headers"], content=entry["content"], request=request
+            )
+
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in STRIPPED_RESPONSE_HEADERS]
+        if self.cassette.mode == "record":
+            self.cassette.record(key, {"status": response.status_code, "headers": headers, "content": content})
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+cassette = Cassette()
+if settings.CASSETTE_MODE in ("record", "replay"):
+    cassette.load(settings.CASSETTE_PATH, settings.CASSETTE_MODE)
+
+
+def wrap_transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """启用录制/回放时在真实 transport 外包一层"""
+    if not cassette.enabled:
+        return inner
+    return CassetteTransport(cassette, inner)
+
+
+def llm_http_client() -> Optional[httpx.AsyncClient]:
+    """供 ChatQwen 使用的 http_async_client；未启用录制/回放时返回 None（使用 SDK 默认客户端）"""
+    if not cassette.enabled:
+        return None
+    return httpx.AsyncClient(transport=CassetteTransport(cassette), timeout=None)
@@ -0,0 +1,138 @@
+# src/core/circuit_breaker.py
+"""熔断器：上游连续失败/超时达到阈值后打开，期间直接失败而不再等待超时；
+经过 reset_timeout 后进入半开状态，放行少量探测请求，探测成功则恢复，失败则重新打开。
+"""
+import time
+from typing import Dict, List
+
+from ..settings import settings
+from .metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS, registry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 熔断中，{retry_after:.0f}s 后重试")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(half_open_probes, 1)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """是否放行本次调用；放行后必须调用 record_success / record_failure / release 之一"""
+        if not self.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.retry_after() <= 0:
+            self._transition(HALF_OPEN)
+            self._probes = 0
+        if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+            self._probes += 1
+            return True
+        CIRCUIT_REJECTED.inc(self.name)
+        return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self._probes = 0
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            # 半开探测失败或连续失败达到阈值：重新计时
+            self.opened_at = time.monotonic()
+            self._probes = 0
+            self._transition(OPEN)
+
+    def release(self) -> None:
+        """放行的调用未真正到达上游（如本地时间预算已用完）：不计成功也不计失败，只归还探测名额"""
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after": round(self.retry_after(), 3) if self.state == OPEN else 0.0,
+        }
+
+
+class BreakerGroup:
+    """按名字（如高德接口路径）懒创建熔断器，各接口独立计数"""
+
+    def __init__(self, prefix: str, failure_threshold: int, reset_timeout: float, half_open_probes: int = 1):
+        self.prefix = prefix
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                f"{self.prefix}{name}", self.failure_threshold, self.reset_timeout, self.half_open_probes
+            )
+            self._breakers[name] = breaker
+        return breaker
+
+    def __iter__(self):
+        return iter(list(self._breakers.values()))
+
+
+amap_breakers = BreakerGroup(
+    "amap:",
+    settings.AMAP_BREAKER_FAILURES if settings.AMAP_BREAKER_ENABLED else 0,
+    settings.AMAP_BREAKER_RESET,
+    settings.AMAP_BREAKER_PROBES,
+)
+
+
+def _circuit_metrics() -> List[str]:
+    lines: List[str] = []
+    for breaker in amap_breakers:
+        lines.append(f'trip_circuit_state{{breaker="{breaker.name}"}} {_STATE_VALUES[breaker.state]}')
+    if not lines:
+        return []
+    return [
+        "# HELP trip_circuit_state Circuit breaker state (0 closed, 1 half-open, 2 open)",
+        "# TYPE trip_circuit_state gauge",
+    ] + lines
+
+
+registry.register_collector(_circuit_metrics)
@@ -0,0 +1,45 @@
+# src/core/deadline.py
+"""请求级截止时间：在接口处设置，通过 contextvar 传递到图节点与工具中，
+每次 LLM / 高德调用的超时都不超过剩余的时间预算。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# time.monotonic() 下的绝对截止时间；None 表示没有截止时间（如脚本直接调用图）
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def set_deadline(seconds: float) -> None:
+    """在当前上下文中设置截止时间；用于无法使用 with 语句包裹的场景（如 SSE 生成器）"""
+    current_deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    token = current_deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(cap: float, reserve: float = 0.0) -> float:
+    """单次调用的超时：不超过 cap，也不超过剩余预算减去 reserve（留给后续步骤的时间）；预算已用完时抛出 DeadlineExceeded"""
+    left = remaining()
+    if left is None:
+        return cap
+    budget = left - reserve
+    if budget <= 0:
+        raise DeadlineExceeded("请求的时间预算已用完")
+    return min(cap, budget)
@@ -0,0 +1,63 @@
+# src/core/hedging.py
+"""带超时的对冲调用：主调用超过其历史 p95 仍未返回时，向备用模型/提供商发起第二个请求，
+采用先返回的结果并取消另一个；主调用失败时备用请求作为降级立即发出。
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from ..settings import settings
+from .metrics import LLM_HEDGES, LLM_MODEL_DURATION, LLM_TIMEOUTS
+
+Call = Callable[[], Awaitable[Any]]
+
+
+def hedge_delay(node: str, model: str) -> Optional[float]:
+    """主调用的对冲等待时间：该节点/模型的延迟分位数；样本不足时返回 None（只在失败时降级）"""
+    if LLM_MODEL_DURATION.count(node, model) < settings.LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return LLM_MODEL_DURATION.quantile(settings.LLM_HEDGE_QUANTILE, node, model)
+
+
+async def hedged_call(
+    node: str,
+    primary: Call,
+    timeout: float,
+    hedge: Optional[Call] = None,
+    delay: Optional[float] = None,
+) -> Any:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + timeout
+    primary_task = asyncio.ensure_future(primary())
+    hedge_task: Optional[asyncio.Future] = None
+    pending: Set[asyncio.Future] = {primary_task}
+    last_error: Optional[BaseException] = None
+    try:
+        while True:
+            can_hedge = hedge is not None and hedge_task is None
+            if can_hedge and (not pending or (delay is not None and loop.time() - start >= delay)):
+                # 主调用失败：立即降级；主调用过慢：发起对冲
+                LLM_HEDGES.inc(node, "fallback" if not pending else "launched")
+                hedge_task = asyncio.ensure_future(hedge())
+                pending.add(hedge_task)
+                continue
+            if not pending:
+                raise last_error
+
+            wait = deadline - loop.time()
+            if can_hedge and delay is not None:
+                wait = min(wait, start + delay - loop.time())
+            if wait <= 0 and loop.time() >= deadline:
+                LLM_TIMEOUTS.inc(node)
+                raise asyncio.TimeoutError(f"{node} LLM 调用超时（{timeout:.1f}s）")
+
+            done, pending = await asyncio.wait(pending, timeout=max(wait, 0), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge_task:
+                        LLM_HEDGES.inc(node, "won")
+                    return task.result()
+                last_error = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
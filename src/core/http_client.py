@@ -0,0 +1,44 @@
+# src/core/http_client.py
+from typing import Optional
+
+import httpx
+
+from ..settings import settings
+from .cassette import wrap_transport
+
+_amap_client: Optional[httpx.AsyncClient] = None
+
+
+def _create_amap_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.AMAP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.AMAP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.AMAP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(settings.AMAP_PLACE_TIMEOUT, connect=settings.AMAP_CONNECT_TIMEOUT)
+    transport = wrap_transport(httpx.AsyncHTTPTransport(limits=limits))
+    return httpx.AsyncClient(base_url=settings.AMAP_BASE_URL, transport=transport, timeout=timeout)
+
+
+async def init_amap_client() -> httpx.AsyncClient:
+    """在应用启动时创建共享的高德地图客户端（连接池 + keep-alive）"""
+    global _amap_client
+    if _amap_client is None or _amap_client.is_closed:
+        _amap_client = _create_amap_client()
+    return _amap_client
+
+
+async def close_amap_client() -> None:
+    """在应用关闭时释放连接池"""
+    global _amap_client
+    if _amap_client is not None:
+        await _amap_client.aclose()
+        _amap_client = None
+
+
+def get_amap_client() -> httpx.AsyncClient:
+    """获取共享客户端；未经过 lifespan（如脚本直接调用工具）时按需创建"""
+    global _amap_client
+    if _amap_client is None or _amap_client.is_closed:
+        _amap_client = _create_amap_client()
+    return _amap_client
@@ -0,0 +1,146 @@
+# src/core/llm_cache.py
+"""router / summarizer 的 LLM 响应缓存（按内容寻址，默认关闭）。
+
+键为模型名、绑定的工具、系统提示词与消息序列的 xxhash；
+内存层为 TTL + LRU，可选的磁盘层为 SQLite（在线程池中读写），适合重试、重复对话与相同的计划请求。
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+import xxhash
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from ..logger import get_logger
+from ..settings import settings
+from ..utils.cache import TTLCache
+from .metrics import gauge_lines, registry
+
+logger = get_logger(service=__name__)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def fingerprint(value: Any) -> str:
+    """对任意可 JSON 序列化的对象计算稳定的哈希，用于预先计算工具定义等不变部分"""
+    return xxhash.xxh3_128_hexdigest(_dumps(value).encode("utf-8"))
+
+
+def _message_key(message: BaseMessage) -> dict:
+    # 只取决定模型输出的字段；id、response_metadata、usage_metadata 等在相同的对话之间也会不同
+    return {
+        "role": message.type,
+        "content": message.content,
+        "tool_calls": getattr(message, "tool_calls", None) or [],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+class _DiskTier:
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, time.time() + ttl, value),
+            )
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+
+class LLMResponseCache:
+    def __init__(self, enabled: bool, maxsize: int, ttl: float, disk_path: str = ""):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk: Optional[_DiskTier] = None
+        self.disk_hits = 0
+        if enabled and disk_path:
+            self.disk = _DiskTier(disk_path)
+            self.disk.purge_expired()
+
+    def make_key(
+        self, model: str, tools_fingerprint: str, system_prompt: str, messages: Sequence[BaseMessage]
+    ) -> str:
+        digest = xxhash.xxh3_128()
+        digest.update(f"{model}\x00{tools_fingerprint}\x00{system_prompt}\x00".encode("utf-8"))
+        for message in messages:
+            digest.update(_dumps(_message_key(message)).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    async def get_or_call(
+        self,
+        call: Callable[[], Awaitable[BaseMessage]],
+        model: str,
+        tools_fingerprint: str,
+        system_prompt: str,
+        messages: Sequence[BaseMessage],
+    ) -> BaseMessage:
+        """命中内存或磁盘层直接返回；未命中时调用 LLM，并发相同请求只调用一次"""
+        if not self.enabled:
+            return await call()
+        key = self.make_key(model, tools_fingerprint, system_prompt, messages)
+
+        async def load() -> str:
+            if self.disk is not None:
+                cached = await asyncio.to_thread(self.disk.get, key)
+                if cached is not None:
+                    self.disk_hits += 1
+                    return cached
+            response = await call()
+            value = _dumps(message_to_dict(response))
+            if self.disk is not None:
+                await asyncio.to_thread(self.disk.set, key, value, self.ttl)
+            return value
+
+        value = await self.memory.get_or_load(key, load)
+        return messages_from_dict([json.loads(value)])[0]
+
+    def stats(self) -> dict:
+        return {**self.memory.stats(), "disk_hits": self.disk_hits, "enabled": self.enabled}
+
+
+llm_cache = LLMResponseCache(
+    enabled=settings.LLM_CACHE_ENABLED,
+    maxsize=settings.LLM_CACHE_MAXSIZE,
+    ttl=settings.LLM_CACHE_TTL,
+    disk_path=settings.LLM_CACHE_DISK_PATH,
+)
+
+
+def _llm_cache_metrics() -> List[str]:
+    stats = llm_cache.stats()
+    return (
+        gauge_lines("trip_llm_cache_hits_total", "LLM responses served from memory", stats["hits"], "counter")
+        + gauge_lines("trip_llm_cache_disk_hits_total", "LLM responses served from disk", stats["disk_hits"], "counter")
+        + gauge_lines("trip_llm_cache_misses_total", "LLM cache misses", stats["misses"], "counter")
+        + gauge_lines("trip_llm_cache_size", "Entries in the in-memory LLM cache", stats["size"])
+    )
+
+
+registry.register_collector(_llm_cache_metrics)
@@ -0,0 +1,300 @@
+# src/core/metrics.py
+"""进程内指标采集，按 Prometheus 文本格式输出，无需外部采集组件"""
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..settings import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 20, 30)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{k}="{str(v)}"' for k, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [每个桶的计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """按桶上界估算分位数（如 p95），用于告警阈值与对冲请求的触发时机"""
+        series = self._values.get(labels)
+        if not series:
+            return None
+        total = sum(series[:-1])
+        if not total:
+            return None
+        rank, cumulative = q * total, 0.0
+        for i, bound in enumerate(self.buckets):
+            cumulative += series[i]
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        """注册在抓取时才计算的指标（如缓存、会话存储的统计信息）"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "trip_request_duration_seconds", "End-to-end latency of plan/chat requests", ["endpoint"]
+)
+ROUTER_ITERATIONS = registry.histogram(
+    "trip_router_iterations", "Router node executions per request", ["endpoint"], buckets=COUNT_BUCKETS
+)
+NODE_DURATION = registry.histogram(
+    "trip_graph_node_duration_seconds", "Wall time of each graph node execution", ["node"]
+)
+NODE_ERRORS = registry.counter("trip_graph_node_errors_total", "Graph node executions that raised", ["node"])
+TOOL_DURATION = registry.histogram("trip_tool_duration_seconds", "Latency of each tool call", ["tool"])
+TOOL_CALLS = registry.counter("trip_tool_calls_total", "Tool calls by outcome", ["tool", "status"])
+TOOL_CACHE = registry.counter("trip_tool_cache_total", "AMap cache lookups per tool", ["tool", "result"])
+LLM_DURATION = registry.histogram("trip_llm_duration_seconds", "Latency of LLM calls", ["node"])
+LLM_TOKENS = registry.counter("trip_llm_tokens_total", "LLM tokens by node and type", ["node", "type"])
+LLM_MODEL_DURATION = registry.histogram(
+    "trip_llm_model_duration_seconds", "Latency of LLM calls per node and model tier", ["node", "model"]
+)
+LLM_COST = registry.counter("trip_llm_cost_total", "Estimated LLM cost (LLM_PRICES units)", ["node", "model"])
+LLM_HEDGES = registry.counter(
+    "trip_llm_hedges_total", "Hedged/fallback LLM requests (launched, fallback, won)", ["node", "outcome"]
+)
+LLM_TIMEOUTS = registry.counter("trip_llm_timeouts_total", "LLM calls abandoned at their deadline", ["node"])
+ROUTER_ESCALATIONS = registry.counter(
+    "trip_router_escalations_total", "Router decisions retried on the escalation model", ["reason"]
+)
+TOOL_TOKENS_SAVED = registry.counter(
+    "trip_tool_result_tokens_saved_total", "Estimated tokens removed from the prompt by tool result projection", ["tool"]
+)
+PROMPT_TOKENS_SAVED = registry.histogram(
+    "trip_tool_result_tokens_saved", "Tool-result tokens saved per request by projection", ["endpoint"],
+    buckets=(0, 100, 500, 1000, 2000, 5000, 10000, 20000, 50000),
+)
+ADMISSION_REQUESTS = registry.counter(
+    "trip_admission_requests_total", "Admission decisions for graph endpoints", ["endpoint", "result"]
+)
+ADMISSION_WAIT = registry.histogram(
+    "trip_admission_wait_seconds", "Time spent queued before a graph run was admitted", ["endpoint"]
+)
+RATE_LIMIT_WAIT = registry.histogram(
+    "trip_rate_limit_wait_seconds", "Time spent waiting on an upstream token bucket", ["limiter"]
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "trip_circuit_transitions_total", "Circuit breaker state changes", ["breaker", "state"]
+)
+CIRCUIT_REJECTED = registry.counter(
+    "trip_circuit_rejected_total", "Calls short-circuited by an open breaker", ["breaker"]
+)
+
+
+class RequestMetrics:
+    """单个请求内的计数（通过 contextvar 传递到图节点中）"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started_at = time.perf_counter()
+        self.node_calls: Dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_tokens_saved = 0
+        self.tool_tokens_saved_by_tool: Dict[str, int] = {}
+        self.llm_cost = 0.0
+
+
+current_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+
+def start_request(endpoint: str) -> RequestMetrics:
+    """在当前上下文中开始统计一个请求；用于无法使用 with 语句包裹的场景（如 SSE 生成器）"""
+    request_metrics = RequestMetrics(endpoint)
+    current_request_metrics.set(request_metrics)
+    return request_metrics
+
+
+def finish_request(request_metrics: RequestMetrics) -> None:
+    REQUEST_DURATION.observe(time.perf_counter() - request_metrics.started_at, request_metrics.endpoint)
+    ROUTER_ITERATIONS.observe(request_metrics.node_calls.get("router", 0), request_metrics.endpoint)
+    PROMPT_TOKENS_SAVED.observe(request_metrics.tool_tokens_saved, request_metrics.endpoint)
+    for tool, saved in request_metrics.tool_tokens_saved_by_tool.items():
+        TOOL_TOKENS_SAVED.inc(tool, amount=saved)
+
+
+@contextmanager
+def track_request(endpoint: str) -> Iterator[RequestMetrics]:
+    request_metrics = RequestMetrics(endpoint)
+    token = current_request_metrics.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        finish_request(request_metrics)
+        current_request_metrics.reset(token)
+
+
+def instrument_node(node: str):
+    """记录图节点的耗时、调用次数与异常"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request_metrics = current_request_metrics.get()
+            if request_metrics is not None:
+                request_metrics.node_calls[node] = request_metrics.node_calls.get(node, 0) + 1
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.inc(node)
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - start, node)
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=1)
+def _llm_prices() -> Dict[str, Tuple[float, float]]:
+    prices = {}
+    for item in settings.LLM_PRICES.split(","):
+        parts = item.strip().split(":")
+        if len(parts) == 3:
+            prices[parts[0]] = (float(parts[1]), float(parts[2]))
+    return prices
+
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """按 LLM_PRICES 中的每千 token 单价估算成本；未配置单价的模型记为 0"""
+    input_price, output_price = _llm_prices().get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+
+
+def record_llm_usage(node: str, response: Any, duration: float, model: str = "") -> None:
+    """从 AIMessage.usage_metadata 中记录 token 用量，并按模型记录延迟与成本"""
+    LLM_DURATION.observe(duration, node)
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    LLM_TOKENS.inc(node, "prompt", amount=prompt_tokens)
+    LLM_TOKENS.inc(node, "completion", amount=completion_tokens)
+    cost = llm_cost(model, prompt_tokens, completion_tokens)
+    if model:
+        LLM_MODEL_DURATION.observe(duration, node, model)
+        LLM_COST.inc(node, model, amount=cost)
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.prompt_tokens += prompt_tokens
+        request_metrics.completion_tokens += completion_tokens
+        request_metrics.llm_cost += cost
+
+
+def record_tool_tokens_saved(tool: str, saved: int) -> None:
+    """累计到当前请求，在 finish_request 时按计划统一上报；不在请求上下文中时直接计数"""
+    request_metrics = current_request_metrics.get()
+    if request_metrics is None:
+        TOOL_TOKENS_SAVED.inc(tool, amount=saved)
+        return
+    request_metrics.tool_tokens_saved += saved
+    by_tool = request_metrics.tool_tokens_saved_by_tool
+    by_tool[tool] = by_tool.get(tool, 0) + saved
+
+
+def gauge_lines(name: str, documentation: str, value: float, metric_type: str = "gauge") -> List[str]:
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+
+
+def render_metrics() -> str:
+    return registry.render()
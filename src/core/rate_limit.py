@@ -0,0 +1,107 @@
+# src/core/rate_limit.py
+"""上游令牌桶限流：所有请求共享同一组桶，LLM 按每分钟 token 数、高德按 QPS 限流。
+
+桶内令牌不足时在本地排队等待（按到达顺序），而不是把请求发给上游后再被限流报错。
+"""
+import asyncio
+import time
+from typing import Any, Dict
+
+from ..settings import settings
+from .metrics import RATE_LIMIT_WAIT, gauge_lines, registry
+
+
+class TokenBucket:
+    """rate 为每秒补充的令牌数，capacity 为允许的突发上限；rate <= 0 表示不限流"""
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """取走 amount 个令牌，不足时等待补充；返回等待的秒数。超过桶容量的请求按容量计"""
+        if not self.enabled:
+            return 0.0
+        amount = min(amount, self.capacity)
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            # 同一时刻只有一个请求在等待补充，后到的请求排在锁后面，大请求不会被小请求饿死
+            async with self._lock:
+                self._refill()
+                deficit = amount - self._tokens
+                if deficit > 0:
+                    await asyncio.sleep(deficit / self.rate)
+                    self._refill()
+                self._tokens -= amount
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - start
+        RATE_LIMIT_WAIT.observe(waited, self.name)
+        return waited
+
+    def adjust(self, amount: float) -> None:
+        """按实际用量修正预扣的令牌：正数补扣（允许透支，由后续请求等待偿还），负数退还"""
+        if not self.enabled or not amount:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.enabled:
+            self._refill()
+        return {"tokens": self._tokens, "waiting": self._waiting}
+
+
+llm_token_bucket = TokenBucket(
+    "llm_tokens", rate=settings.LLM_TOKENS_PER_MINUTE / 60.0, capacity=settings.LLM_TOKENS_PER_MINUTE
+)
+amap_bucket = TokenBucket("amap", rate=settings.AMAP_QPS, capacity=settings.AMAP_QPS)
+
+
+async def reserve_llm_tokens(estimate: int) -> int:
+    """调用 LLM 前按提示词估算的 token 数预扣"""
+    await llm_token_bucket.acquire(estimate)
+    return estimate
+
+
+def charge_llm_tokens(estimate: int) -> int:
+    """不排队地预扣：用于对冲请求，令牌不足时透支，由后续请求等待偿还"""
+    llm_token_bucket.adjust(estimate)
+    return estimate
+
+
+def settle_llm_tokens(reserved: int, response: Any) -> None:
+    """调用结束后按 usage_metadata 中的实际 token 数（含输出）修正预扣量"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    actual = usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    if actual:
+        llm_token_bucket.adjust(actual - reserved)
+
+
+def _rate_limit_metrics() -> list:
+    lines: list = []
+    for bucket in (llm_token_bucket, amap_bucket):
+        if not bucket.enabled:
+            continue
+        stats = bucket.stats()
+        lines += gauge_lines(f"trip_rate_limit_{bucket.name}_available", f"Tokens left in the {bucket.name} bucket", stats["tokens"])
+        lines += gauge_lines(f"trip_rate_limit_{bucket.name}_waiting", f"Callers waiting on the {bucket.name} bucket", stats["waiting"])
+    return lines
+
+
+registry.register_collector(_rate_limit_metrics)
@@ -1,9 +1,15 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
 from langgraph.graph import StateGraph, END, START
 from .state import GraphState
+from .nodes.prefetch import prefetch_node
 from .nodes.router import router_node
 from .nodes.tool_executor import tool_executor_node
 from .nodes.summarizer import summarizer_node
 from .tools import ALL_TOOLS
+from ..services.checkpointer import SQLiteCheckpointSaver
+from ..services.session_store import session_store
+from ..settings import settings
 
 
 def should_continue(state: GraphState) -> str:
@@ -15,15 +21,25 @@ def should_continue(state: GraphState) -> str:
             return "tool_executor" 
     return "summarizer"
 
-def build_graph() -> StateGraph:
+
+def route_start(state: GraphState) -> str:
+    # 只有携带 travel_request 的计划请求才经过预取节点，对话请求直接进入 router
+    if settings.PREFETCH_ENABLED and state.get("travel_request"):
+        return "prefetch"
+    return "router"
+
+
+def build_graph(checkpointer: Optional[SQLiteCheckpointSaver] = None) -> StateGraph:
     builder = StateGraph(GraphState)
     # 添加节点
+    builder.add_node("prefetch", prefetch_node)
     builder.add_node("router", router_node)  
     builder.add_node("tool_executor", tool_executor_node) 
     builder.add_node("summarizer", summarizer_node)  
 
     # 定义边
-    builder.add_edge(START, "router")  
+    builder.add_conditional_edges(START, route_start, {"prefetch": "prefetch", "router": "router"})
+    builder.add_edge("prefetch", "router")
     builder.add_edge("tool_executor", "router")  
     builder.add_edge("summarizer", END)  
     builder.add_conditional_edges(
@@ -35,5 +51,39 @@ def build_graph() -> StateGraph:
         }
     )
 
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
+
+
+@lru_cache(maxsize=1)
+def get_checkpointer() -> Optional[SQLiteCheckpointSaver]:
+    if not settings.CHECKPOINT_ENABLED:
+        return None
+    checkpointer = SQLiteCheckpointSaver(settings.CHECKPOINT_DB_PATH, max_per_thread=settings.CHECKPOINT_MAX_PER_THREAD)
+    # 线程 id 即会话 id：会话被淘汰或过期后，它的检查点也不再需要
+    session_store.on_evict = checkpointer.delete_threads
+    return checkpointer
+
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """返回进程内共享的已编译图，所有会话复用同一个实例"""
+    return build_graph(get_checkpointer())
+
+
+async def graph_run_config(session_id: str) -> Optional[Dict[str, Any]]:
+    """启用 checkpointer 时以会话 id 作为线程 id，检查点记录该会话最近一次执行的每一步，
+    可通过 get_graph().aget_state({"configurable": {"thread_id": session_id}}) 查看或恢复。
+    会话状态由会话存储作为输入传入，因此执行前先清除上一次执行的检查点，避免输入与旧状态合并。
+    调用方需持有 session_store.lock(session_id)，同一会话的执行不会互相删除或交错写入检查点"""
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return None
+    await checkpointer.adelete_thread(session_id)
+    return {"configurable": {"thread_id": session_id}}
+
 
+async def release_graph_thread(thread_id: str) -> None:
+    """删除一次性执行（如批量任务项）的检查点线程；这类线程不对应会话，不会被会话淘汰清理"""
+    checkpointer = get_checkpointer()
+    if checkpointer is not None:
+        await checkpointer.adelete_thread(thread_id)
@@ -0,0 +1,212 @@
+# src/graph/history.py
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from .state import GraphState
+from ..logger import get_logger
+from ..settings import settings
+
+logger = get_logger(service=__name__)
+
+# 每条消息的角色/分隔符开销（近似 OpenAI 聊天格式）
+MESSAGE_OVERHEAD_TOKENS = 4
+# 预取节点写入的上下文消息名称；它属于当前轮次，不会开启新的对话轮次
+CONTEXT_MESSAGE_NAME = "prefetch_context"
+# token 计数缓存的条目数上限
+TOKEN_COUNT_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(settings.HISTORY_TOKEN_ENCODING)
+    except Exception as e:
+        # 离线环境无法下载编码表时退化为按字符估算
+        logger.info(f"Warning: tiktoken encoding unavailable, falling back to char count: {e}")
+        return None
+
+
+def count_text_tokens(text: str) -> int:
+    """不缓存的 token 计数"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# 以内容摘要为键：每个条目只占 16 字节的键，不会像以完整文本为键的 lru_cache 那样长期持有大段消息
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """带缓存的 token 计数，用于每次调用 LLM 都会重复计算的历史消息与系统提示词"""
+    if not text:
+        return 0
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _token_counts_lock:
+        tokens = _token_counts.get(key)
+        if tokens is not None:
+            _token_counts.move_to_end(key)
+            return tokens
+    tokens = count_text_tokens(text)
+    with _token_counts_lock:
+        _token_counts[key] = tokens
+        while len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return tokens
+
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tokens += count_tokens(str(tool_calls))
+    return tokens
+
+
+def estimate_prompt_tokens(system_prompt: str, messages: List[BaseMessage]) -> int:
+    """调用前估算提示词 token 数（系统提示词 + 上下文窗口），用于 LLM 限流预扣"""
+    return count_tokens(system_prompt) + sum(message_tokens(m) for m in messages)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "…(已省略)"
+
+
+def is_context_message(message: BaseMessage) -> bool:
+    return isinstance(message, HumanMessage) and message.name == CONTEXT_MESSAGE_NAME
+
+
+def _condense_context_message(message: HumanMessage) -> HumanMessage:
+    content = str(message.content)
+    if len(content) <= settings.HISTORY_TOOL_MESSAGE_MAX_CHARS:
+        return message
+    return HumanMessage(content=_truncate(content, settings.HISTORY_TOOL_MESSAGE_MAX_CHARS), name=message.name)
+
+
+def _condense_tool_message(message: ToolMessage) -> ToolMessage:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if len(content) <= settings.HISTORY_TOOL_MESSAGE_MAX_CHARS:
+        return message
+    return ToolMessage(
+        content=_truncate(content, settings.HISTORY_TOOL_MESSAGE_MAX_CHARS),
+        tool_call_id=message.tool_call_id,
+    )
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """按用户消息切分对话轮次，保证 AIMessage 的 tool_calls 与对应 ToolMessage 不被拆开"""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if (isinstance(message, HumanMessage) and not is_context_message(message)) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def _summarize_turn(turn: List[BaseMessage]) -> str:
+    question = next((m.content for m in turn if isinstance(m, HumanMessage)), "")
+    answer = next(
+        (m.content for m in reversed(turn) if isinstance(m, AIMessage) and not m.tool_calls and m.content),
+        "",
+    )
+    line = f"用户：{_truncate(str(question), 120)}"
+    if answer:
+        line += f"；助手：{_truncate(str(answer), 240)}"
+    return line
+
+
+def _summary_header(dropped: List[List[BaseMessage]]) -> str:
+    if not dropped:
+        return ""
+    summary = "\n".join(_summarize_turn(turn) for turn in dropped)
+    if len(summary) > settings.HISTORY_SUMMARY_MAX_CHARS:
+        summary = "…" + summary[-settings.HISTORY_SUMMARY_MAX_CHARS:]
+    return f"[早前对话摘要]\n{summary}"
+
+
+def _condense_older_message(message: BaseMessage) -> BaseMessage:
+    if isinstance(message, ToolMessage):
+        return _condense_tool_message(message)
+    if is_context_message(message):
+        return _condense_context_message(message)
+    return message
+
+
+def _turns_tokens(turns: List[List[BaseMessage]]) -> int:
+    return sum(message_tokens(m) for turn in turns for m in turn)
+
+
+def build_context_window(state: GraphState, budget: Optional[int] = None) -> List[BaseMessage]:
+    """构造发送给 LLM 的消息窗口，使提示词规模不随会话长度增长：
+    1. 当前计划只附加在最新一条用户消息上，而不是在历史中重复；
+    2. 早前轮次的工具结果被截断；
+    3. 超出预算的早前轮次折叠为一段滚动摘要。
+    不修改图状态中的原始消息。
+    """
+    budget = budget or settings.HISTORY_TOKEN_BUDGET
+    turns = _split_turns(state.get("messages", []))
+    if not turns:
+        return []
+
+    current_plan = state.get("current_plan")
+    current_turn = list(turns[-1])
+    if current_plan and isinstance(current_turn[0], HumanMessage):
+        current_turn[0] = HumanMessage(
+            content=f"当前旅游计划：{current_plan}\n, 用户问题：{current_turn[0].content}"
+        )
+
+    older = [[_condense_older_message(m) for m in turn] for turn in turns[:-1]]
+
+    # 当前轮次本身超出预算时，只保留最近一批工具结果的完整内容
+    if _turns_tokens([current_turn]) > budget:
+        last_call_index = max(
+            (i for i, m in enumerate(current_turn) if isinstance(m, AIMessage) and m.tool_calls),
+            default=len(current_turn),
+        )
+        current_turn = [
+            _condense_tool_message(m) if isinstance(m, ToolMessage) and i < last_call_index else m
+            for i, m in enumerate(current_turn)
+        ]
+
+    remaining = budget - _turns_tokens([current_turn])
+    kept: List[List[BaseMessage]] = []
+    for turn in reversed(older):
+        tokens = _turns_tokens([turn])
+        if tokens > remaining:
+            break
+        kept.insert(0, turn)
+        remaining -= tokens
+
+    dropped = older[: len(older) - len(kept)]
+    header = _summary_header(dropped)
+    # 摘要同样占用预算：放不下时继续折叠最早保留的轮次
+    while kept and header and count_tokens(header) + MESSAGE_OVERHEAD_TOKENS > remaining:
+        remaining += _turns_tokens([kept[0]])
+        dropped.append(kept.pop(0))
+        header = _summary_header(dropped)
+
+    window = [m for turn in kept + [current_turn] for m in turn]
+    if header:
+        # 摘要合并进窗口中第一条用户消息，避免出现连续的用户消息
+        first = window[0]
+        if isinstance(first, HumanMessage):
+            window[0] = HumanMessage(content=f"{header}\n\n{first.content}")
+        else:
+            window.insert(0, HumanMessage(content=header))
+
+    return window
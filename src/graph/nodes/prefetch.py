@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from ..history import CONTEXT_MESSAGE_NAME
+from ..projections import estimate_tokens_saved
+from ..state import GraphState
+from .tool_executor import _execute_tool_call
+from ...core.metrics import instrument_node, record_tool_tokens_saved
+from ...logger import get_logger, log_structured
+from ...settings import settings
+
+logger = get_logger(service=__name__)
+
+DEFAULT_INTEREST = "景点"
+
+
+def _tool_call(name: str, call_id: str, **args: Any) -> Dict[str, Any]:
+    return {"name": name, "args": args, "id": f"prefetch_{call_id}"}
+
+
+async def _run_calls(calls: List[Dict[str, Any]]) -> Dict[str, Tuple[str, Any]]:
+    """复用 tool_executor 的执行逻辑（缓存、指标、异常处理），返回 id -> (工具名, 结果)"""
+    results = await asyncio.gather(*(_execute_tool_call(call) for call in calls))
+    return {call_id: (call["name"], result) for call, (call_id, result, _) in zip(calls, results)}
+
+
+def _ok(result: Any) -> bool:
+    return isinstance(result, dict) and "error" not in result and str(result.get("status", "1")) == "1"
+
+
+def _format_weather(result: Any, start_date: str, end_date: str) -> str:
+    if not _ok(result):
+        return "天气：获取失败"
+    forecasts = result.get("forecasts") or []
+    casts = forecasts[0].get("casts", []) if forecasts else []
+    days = [
+        f"{c.get('date')} {c.get('dayweather')}/{c.get('nightweather')} {c.get('nighttemp')}~{c.get('daytemp')}℃"
+        for c in casts
+        if start_date <= str(c.get("date", "")) <= end_date
+    ]
+    if days:
+        return "天气：" + "；".join(days)
+    return "天气：旅行日期超出预报范围"
+
+
+def _format_poi(poi: Dict[str, Any], detail: Any) -> str:
+    biz_ext = poi.get("biz_ext") or {}
+    if _ok(detail) and detail.get("pois"):
+        biz_ext = {**biz_ext, **(detail["pois"][0].get("biz_ext") or {})}
+    parts = [f"id={poi.get('id')}", f"位置={poi.get('location')}"]
+    if biz_ext.get("rating"):
+        parts.append(f"评分={biz_ext['rating']}")
+    open_time = biz_ext.get("open_time") or biz_ext.get("opentime2")
+    if open_time:
+        parts.append(f"开放时间={open_time}")
+    if poi.get("address"):
+        parts.append(f"地址={poi['address']}")
+    return f"  - {poi.get('name')}（{', '.join(parts)}）"
+
+
+@instrument_node("prefetch")
+async def prefetch_node(state: GraphState) -> Dict[str, Any]:
+    """计划请求的目的地、日期与兴趣偏好在请求中已确定，无需由 LLM 逐个发起工具调用：
+    这里并发获取天气与各兴趣点的搜索结果，再并发获取排名靠前景点的开放时间，
+    汇总为一条紧凑的上下文消息，使 router 通常可以直接进入总结。
+    """
+    request = state.get("travel_request") or {}
+    destination = request.get("destination")
+    # 预取只针对本次计划执行一次，清空后同一会话的后续对话不会再次预取
+    state_updates = GraphState(travel_request=None)
+    if not destination:
+        return state_updates
+
+    interests = [i.strip() for i in request.get("interests", []) if i and i.strip()]
+    interests = list(dict.fromkeys(interests))[: settings.PREFETCH_MAX_INTERESTS] or [DEFAULT_INTEREST]
+
+    search_calls = [
+        _tool_call("search_poi", f"poi_{i}", keyword=interest, city=destination)
+        for i, interest in enumerate(interests)
+    ]
+    weather_call = _tool_call("get_weather", "weather", city=destination, date=request.get("start_date", ""))
+    results = await _run_calls([weather_call, *search_calls])
+
+    top_pois: Dict[str, List[Dict[str, Any]]] = {}
+    for interest, call in zip(interests, search_calls):
+        _, result = results[call["id"]]
+        pois = result.get("pois", []) if _ok(result) else []
+        top_pois[interest] = [p for p in pois if p.get("id")][: settings.PREFETCH_POIS_PER_INTEREST]
+
+    poi_ids = list(dict.fromkeys(p["id"] for pois in top_pois.values() for p in pois))
+    detail_calls = [_tool_call("get_opening_hours", f"hours_{poi_id}", poi_id=poi_id) for poi_id in poi_ids]
+    details = await _run_calls(detail_calls)
+    results.update(details)
+
+    lines = [
+        "[预取信息] 以下数据已通过工具获取，请直接使用；仅在信息不足时再调用工具。",
+        _format_weather(results[weather_call["id"]][1], request.get("start_date", ""), request.get("end_date", "")),
+    ]
+    for interest, pois in top_pois.items():
+        lines.append(f"{interest}：" + ("" if pois else "未找到相关地点"))
+        lines.extend(_format_poi(p, details.get(f"prefetch_hours_{p['id']}", (None, None))[1]) for p in pois)
+
+    log_structured("prefetch.done", {
+        "destination": destination,
+        "interests": interests,
+        "tool_calls": len(results),
+        "pois": len(poi_ids),
+    })
+
+    content = "\n".join(lines)
+    # 预取结果以摘要文本代替原始响应进入提示词，同样计入投影节省
+    saved = estimate_tokens_saved([result for _, result in results.values()], content)
+    if saved > 0:
+        record_tool_tokens_saved("prefetch", saved)
+
+    state_updates["messages"] = [HumanMessage(content=content, name=CONTEXT_MESSAGE_NAME)]
+    state_updates["tool_results"] = {
+        call_id: {"name": name, "result": result} for call_id, (name, result) in results.items()
+    }
+    return state_updates
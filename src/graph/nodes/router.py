@@ -1,43 +1,34 @@
-import os
-from typing import Dict, Any
-from dotenv import load_dotenv
-from langchain_qwq import ChatQwen
+import time
+from functools import lru_cache
+from typing import Dict, Any, Optional
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage
-from ...logger import get_logger
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ValidationError
+from ...core.deadline import call_timeout
+from ...core.hedging import hedge_delay, hedged_call
+from ...core.llm_cache import fingerprint, llm_cache
+from ...core.metrics import ROUTER_ESCALATIONS, instrument_node, record_llm_usage
+from ...core.rate_limit import charge_llm_tokens, reserve_llm_tokens, settle_llm_tokens
+from ...llm_provider import get_chat_model, get_hedge_model, node_model_name
+from ...logger import get_logger, log_payload, log_structured
+from ...settings import settings
 
 from ..state import GraphState
+from ..history import build_context_window, estimate_prompt_tokens
 from ..tools import ALL_TOOLS 
+from .tool_executor import TOOLS_BY_NAME
 
 logger = get_logger(service=__name__)
 
-load_dotenv()
+TOOLS_FINGERPRINT = fingerprint([convert_to_openai_tool(t) for t in ALL_TOOLS])
 
-chat = ChatQwen(
-    temperature=0.1,
-    api_key=os.getenv("QWEN_API_KEY"),
-    model_name=os.getenv("QWEN_MODEL_NAME", "qwen-turbo"),
-    streaming=True,
-    max_tokens=2048,
-    base_url=os.getenv("QWEN_API_URL"),
-)
-
-chat_with_tools = chat.bind_tools(ALL_TOOLS)
-
-def router_node(state: GraphState) -> Dict[str, Any]:
-    state_updates = GraphState()
-    messages = state.get("messages", [])
-    if state.get("max_iterations", 0) >= 20:
-        state_updates["next_node"] = "summarizer"
-        if not any(isinstance(msg, AIMessage) and msg.tool_calls for msg in messages):
-            messages.append(AIMessage(content="看起来我尝试了很多次，但未能找到答案或完成任务。请总结当前信息并给出回答。"))
-            state_updates["messages"] = messages
-        return state_updates
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """你是一个智能决策助手，负责分析用户的请求和对话历史，决定是否需要调用外部工具来获取信息。
+ROUTER_SYSTEM_PROMPT = """你是一个智能决策助手，负责分析用户的请求和对话历史，决定是否需要调用外部工具来获取信息。
             
                     如果需要工具，请调用合适的工具，并提供所有必要的参数。
+                    如果需要多个互不依赖的工具结果（例如天气、多个景点搜索），请在同一轮中一次性发起所有工具调用。
+                    如果对话中已有[预取信息]，请直接使用其中的天气、景点与开放时间，不要重复查询。
+                    安排多日行程的游览顺序时，请调用 optimize_itinerary，不要逐对调用 get_route。
                     如果不需要工具，或者你认为可以根据当前信息直接回答，则直接回复用户。
                     
                     请记住：
@@ -46,34 +37,136 @@ def router_node(state: GraphState) -> Dict[str, Any]:
                     - 如果不需要工具，你将以自然语言文本的形式输出。
                     - 你的主要目标是有效地满足用户的旅游计划需求。
                     """
-        ),
-        MessagesPlaceholder(variable_name="messages")
-    ])
-    chain = prompt | chat_with_tools
-    logger.info(f"router_node: Input messages to LLM: {messages}")
+
+ROUTER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", ROUTER_SYSTEM_PROMPT),
+    MessagesPlaceholder(variable_name="messages")
+])
+
+
+@lru_cache(maxsize=None)
+def get_router_chain(model_name: Optional[str] = None):
+    """每个模型的提示词模板与工具绑定只构建一次；允许模型在同一轮中返回多个工具调用，由 tool_executor 并发执行"""
+    chat_with_tools = get_chat_model(model_name or node_model_name("router")).bind_tools(
+        ALL_TOOLS, parallel_tool_calls=True
+    )
+    return ROUTER_PROMPT | chat_with_tools
+
+
+def invalid_tool_call_reason(response: AIMessage) -> Optional[str]:
+    """检查工具调用能否执行：参数无法解析、工具不存在或参数不符合工具定义时返回原因"""
+    if getattr(response, "invalid_tool_calls", None):
+        return "unparsable"
+    for tool_call in response.tool_calls:
+        tool = TOOLS_BY_NAME.get(tool_call.get("name"))
+        if tool is None:
+            return "unknown_tool"
+        try:
+            tool.args_schema.model_validate(tool_call.get("args") or {})
+        except ValidationError:
+            return "invalid_args"
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_hedge_router_chain():
+    """对冲/降级使用的备用 router 链；未开启对冲时为 None"""
+    model = get_hedge_model()
+    if model is None:
+        return None
+    return ROUTER_PROMPT | model.bind_tools(ALL_TOOLS)
+
+
+async def _invoke_router(model_name: str, llm_messages: list) -> AIMessage:
+    """单次 router 决策：超时不超过剩余预算（并为 summarizer 预留时间）；主模型超过其 p95 未返回时发起对冲"""
+    # 在计时之前预扣 token 配额：限流排队不计入对冲等待与调用超时；缓存未命中才会走到这里
+    estimate = estimate_prompt_tokens(ROUTER_SYSTEM_PROMPT, llm_messages)
+    reserved = await reserve_llm_tokens(estimate)
+    timeout = call_timeout(settings.LLM_CALL_TIMEOUT, reserve=settings.DEADLINE_SUMMARIZER_RESERVE)
+
+    async def primary() -> AIMessage:
+        start = time.perf_counter()
+        response = await get_router_chain(model_name).ainvoke({"messages": llm_messages})
+        record_llm_usage("router", response, time.perf_counter() - start, model=model_name)
+        settle_llm_tokens(reserved, response)
+        return response
+
+    hedge_chain = get_hedge_router_chain()
+    if hedge_chain is None:
+        return await hedged_call("router", primary, timeout)
+
+    hedge_model = settings.LLM_HEDGE_MODEL_NAME or settings.LLM_HEDGE_PROVIDER
+
+    async def hedge() -> AIMessage:
+        # 对冲请求同样消耗配额，但不能再排队等待，否则对冲失去意义
+        hedge_reserved = charge_llm_tokens(estimate)
+        start = time.perf_counter()
+        response = await hedge_chain.ainvoke({"messages": llm_messages})
+        record_llm_usage("router", response, time.perf_counter() - start, model=hedge_model)
+        settle_llm_tokens(hedge_reserved, response)
+        return response
+
+    return await hedged_call("router", primary, timeout, hedge=hedge, delay=hedge_delay("router", model_name))
+
+
+@instrument_node("router")
+async def router_node(state: GraphState) -> Dict[str, Any]:
+    state_updates = GraphState()
+    messages = state.get("messages", [])
+    if state.get("max_iterations", 0) >= 20:
+        state_updates["next_node"] = "summarizer"
+        if not any(isinstance(msg, AIMessage) and msg.tool_calls for msg in messages):
+            state_updates["messages"] = [AIMessage(content="看起来我尝试了很多次，但未能找到答案或完成任务。请总结当前信息并给出回答。")]
+        return state_updates
+    
+    # 按 token 预算裁剪历史，提示词规模不随会话长度增长
+    llm_messages = build_context_window(state)
+    log_payload(logger, "router_node: Input messages to LLM", llm_messages)
+
+    router_model = node_model_name("router")
+    escalation_model = node_model_name("router_escalation")
+
+    async def call_llm():
+        # 先由小模型决策；工具调用无效时交给大模型重新决策，而不是把错误的调用交给 tool_executor
+        response = await _invoke_router(router_model, llm_messages)
+        reason = invalid_tool_call_reason(response)
+        if reason and escalation_model != router_model:
+            ROUTER_ESCALATIONS.inc(reason)
+            log_structured("router.escalate", {"reason": reason, "from": router_model, "to": escalation_model})
+            response = await _invoke_router(escalation_model, llm_messages)
+        return response
 
     try:
-        response = chain.invoke({"messages": messages})
-        logger.info(f"router_node: LLM response: {response}")
+        response = await llm_cache.get_or_call(
+            call_llm,
+            model=router_model,
+            tools_fingerprint=TOOLS_FINGERPRINT,
+            system_prompt=ROUTER_SYSTEM_PROMPT,
+            messages=llm_messages,
+        )
+        log_payload(logger, "router_node: LLM response", response)
+        log_structured("router.decision", {
+            "input_messages": len(llm_messages),
+            "tool_calls": [tc.get("name") for tc in response.tool_calls],
+        })
         
-        new_messages = messages + [response]
-        state_updates["messages"] = new_messages
+        state_updates["messages"] = [response]
 
         if response.tool_calls:
-            tool_call = response.tool_calls[0] # 假设只调用第一个工具
-            tool_name = tool_call.get("name") # 直接获取 'name' 键
-            
+            # 所有工具调用都交给 tool_executor 并发执行，这里只需确认至少有一个有效的工具名
+            tool_name = next((tc.get("name") for tc in response.tool_calls if tc.get("name")), None)
+
             if tool_name:
                 state_updates["next_node"] = tool_name
             else:
-                logger.info(f"Warning: LLM returned tool_calls but the first tool_call has no 'name' key: {tool_call}")
-                state_updates["next_node"] = "summarizer" 
+                logger.info(f"Warning: LLM returned tool_calls without any 'name' key: {response.tool_calls}")
+                state_updates["next_node"] = "summarizer"
         else:
             state_updates["next_node"] = "summarizer"
         
     except Exception as e:
-        print(f"Error in router_node LLM call: {e}")
+        logger.error(f"Error in router_node LLM call: {e}")
         state_updates["next_node"] = "summarizer"
-        state_updates["messages"] = messages + [AIMessage(content=f"在决策过程中发生错误：{e}，我将尝试总结现有信息。")]
+        state_updates["messages"] = [AIMessage(content=f"在决策过程中发生错误：{e}，我将尝试总结现有信息。")]
 
     return state_updates
\ No newline at end of file
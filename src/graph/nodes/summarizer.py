@@ -1,49 +1,79 @@
-import os
+import time
+from functools import lru_cache
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage
-from langchain_qwq import ChatQwen
-from typing import Dict, Any
-from dotenv import load_dotenv
+from typing import Dict, Any, Optional
 
 from ..state import GraphState
-from ...logger import get_logger
+from ..history import build_context_window, estimate_prompt_tokens
+from ...core.deadline import call_timeout
+from ...core.hedging import hedged_call
+from ...core.llm_cache import llm_cache
+from ...core.metrics import instrument_node, record_llm_usage
+from ...core.rate_limit import reserve_llm_tokens, settle_llm_tokens
+from ...llm_provider import get_chat_model, node_model_name
+from ...logger import get_logger, log_payload, log_structured
+from ...settings import settings
 
 logger = get_logger(service=__name__)
 
-load_dotenv()
-
-chat = ChatQwen(
-    temperature=0.1,
-    api_key=os.getenv("QWEN_API_KEY"),
-    model_name=os.getenv("QWEN_MODEL_NAME", "qwen-turbo"),
-    streaming=True,
-    max_tokens=2048,
-    base_url=os.getenv("QWEN_API_URL"),
-)
-
-def summarizer_node(state: GraphState) -> Dict[str, Any]:
-    state_updates = GraphState()    
-    messages = state.get("messages", [])
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """你是旅游规划助手。根据对话历史和所有工具调用结果，生成自然语言回答：
+SUMMARIZER_SYSTEM_PROMPT = """你是旅游规划助手。根据对话历史和所有工具调用结果，生成自然语言回答：
             - 如果有工具调用结果，请基于这些结果，并结合用户之前的提问进行详细、清晰的回答。
             - 如果没有工具结果，请直接回答用户的问题，或者告知用户无法获取所需信息。
             - 回答需简洁清晰、友好，并且不暴露工具调用的内部过程。
             - 如果用户要求生成旅游计划，请生成详细的行程安排。
             - 你的回答应该以用户的原始意图为导向，结合所有可用的信息进行总结。
             """
-        ),
-        MessagesPlaceholder(variable_name="messages"),
-    ])
-    chain = prompt | chat
-    logger.info(f"summarizer_node: Input messages to LLM: {messages}")
 
-    response = chain.invoke({"messages": messages})
-    logger.info(f"summarizer_node: LLM response: {response}")
 
-    new_messages = messages + [response]
-    state_updates["messages"] = new_messages
+SUMMARIZER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SUMMARIZER_SYSTEM_PROMPT),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+
+@lru_cache(maxsize=None)
+def get_summarizer_chain(model_name: Optional[str] = None):
+    """提示词模板只构建一次；最终的行程由大模型生成，与 router 升级时使用的模型共享同一个客户端"""
+    return SUMMARIZER_PROMPT | get_chat_model(model_name or node_model_name("summarizer"))
+
+
+@instrument_node("summarizer")
+async def summarizer_node(state: GraphState) -> Dict[str, Any]:
+    state_updates = GraphState()    
+    messages = state.get("messages", [])
+
+    # 按 token 预算裁剪历史，提示词规模不随会话长度增长
+    llm_messages = build_context_window(state)
+    log_payload(logger, "summarizer_node: Input messages to LLM", llm_messages)
+
+    model_name = node_model_name("summarizer")
+
+    async def call_llm():
+        # 缓存未命中才真正调用 LLM；在计时之前预扣 token 配额，限流排队不计入调用超时
+        reserved = await reserve_llm_tokens(estimate_prompt_tokens(SUMMARIZER_SYSTEM_PROMPT, llm_messages))
+
+        async def invoke():
+            start = time.perf_counter()
+            response = await get_summarizer_chain(model_name).ainvoke({"messages": llm_messages})
+            record_llm_usage("summarizer", response, time.perf_counter() - start, model=model_name)
+            settle_llm_tokens(reserved, response)
+            return response
+
+        # 流式接口会把 summarizer 的增量输出推给前端，不做对冲，只按剩余预算限制超时
+        return await hedged_call("summarizer", invoke, call_timeout(settings.SUMMARIZER_CALL_TIMEOUT))
+
+    response = await llm_cache.get_or_call(
+        call_llm,
+        model=model_name,
+        tools_fingerprint="",
+        system_prompt=SUMMARIZER_SYSTEM_PROMPT,
+        messages=llm_messages,
+    )
+    log_payload(logger, "summarizer_node: LLM response", response)
+    log_structured("summarizer.done", {"input_messages": len(llm_messages), "output_chars": len(response.content or "")})
+
+    state_updates["messages"] = [response]
     
     initial_human_message = next((m for m in messages if isinstance(m, HumanMessage)), None)
     if initial_human_message and "生成" in initial_human_message.content and "旅游计划" in initial_human_message.content:
@@ -51,6 +81,7 @@ def summarizer_node(state: GraphState) -> Dict[str, Any]:
     else:
         state_updates["current_plan"] = state.get("current_plan", "")
     
-    state_updates["tool_results"] = {}
+    # 完整工具结果只在本次执行内使用，结束时清空，不随会话保存
+    state_updates["tool_results"] = None
 
     return state_updates
\ No newline at end of file
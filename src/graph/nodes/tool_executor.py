@@ -1,19 +1,66 @@
 import os
+import time
+import asyncio
 from langchain_core.messages import AIMessage, ToolMessage
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
+from ..projections import estimate_tokens_saved, project_tool_result
 from ..state import GraphState
-from ..tools import ALL_TOOLS 
-from ...logger import get_logger
+from ..tools import ALL_TOOLS
+from ...core.metrics import TOOL_CALLS, TOOL_DURATION, instrument_node, record_tool_tokens_saved
+from ...logger import get_logger, log_payload, log_structured
 
 logger = get_logger(service=__name__)
 
+TOOLS_BY_NAME = {t.name: t for t in ALL_TOOLS}
 
-def tool_executor_node(state: GraphState) -> Dict[str, Any]:
+
+async def _execute_tool_call(tool_call: Dict[str, Any]) -> Tuple[str, Any, ToolMessage]:
+    """执行单个工具调用，返回 (tool_call_id, 工具结果, ToolMessage)；异常不会向外抛出"""
+    tool_name = tool_call.get("name")
+    tool_args = tool_call.get("args", {})
+    tool_call_id = tool_call.get("id")
+    if not tool_call_id:
+        tool_call_id = f"tool_call_{tool_name}_{os.urandom(4).hex()}"
+        logger.info(f"Warning: Tool call ID not found in AI message, using '{tool_call_id}'.")
+
+    if not tool_name:
+        error_message = "Invalid tool call format: missing 'name'."
+        logger.info(f"Error: Invalid tool call received: {tool_call}. No 'name' key.")
+        return tool_call_id, {"error": error_message}, ToolMessage(content=error_message, tool_call_id=tool_call_id)
+
+    tool_to_execute = TOOLS_BY_NAME.get(tool_name)
+    if not tool_to_execute:
+        error_message = f"Tool '{tool_name}' not found."
+        logger.info(f"Error: Tool '{tool_name}' not found in ALL_TOOLS.")
+        return tool_call_id, {"error": error_message}, ToolMessage(content=error_message, tool_call_id=tool_call_id)
+
+    logger.debug("tool_executor_node: Executing tool '{}' with args: {}", tool_name, tool_args)
+    start = time.perf_counter()
+    try:
+        tool_result = await tool_to_execute.ainvoke(tool_args)
+        failed = isinstance(tool_result, dict) and "error" in tool_result
+        TOOL_DURATION.observe(time.perf_counter() - start, tool_name)
+        TOOL_CALLS.inc(tool_name, "error" if failed else "ok")
+        log_payload(logger, f"tool_executor_node: Tool '{tool_name}' result", tool_result)
+        log_structured("tool.done", {"tool": tool_name, "error": failed})
+        # 提示词中只放投影后的紧凑结果，完整结果通过 tool_results 保留
+        content = project_tool_result(tool_name, tool_result)
+        return tool_call_id, tool_result, ToolMessage(content=content, tool_call_id=tool_call_id)
+    except Exception as e:
+        TOOL_DURATION.observe(time.perf_counter() - start, tool_name)
+        TOOL_CALLS.inc(tool_name, "error")
+        error_message = f"Failed to execute tool '{tool_name}' with args {tool_args}: {str(e)}"
+        logger.info(f"Error: {error_message}")
+        return tool_call_id, {"error": error_message}, ToolMessage(content=error_message, tool_call_id=tool_call_id)
+
+
+@instrument_node("tool_executor")
+async def tool_executor_node(state: GraphState) -> Dict[str, Any]:
     state_updates = GraphState()
-    
+
     messages = state.get("messages", [])
-    
+
     last_ai_message: Optional[AIMessage] = None
     for msg in reversed(messages):
         if isinstance(msg, AIMessage) and msg.tool_calls:
@@ -27,66 +74,27 @@ def tool_executor_node(state: GraphState) -> Dict[str, Any]:
         return state_updates
 
     tool_calls = last_ai_message.tool_calls
-    
+
     if not tool_calls:
         logger.info("Error: AIMessage found but no tool_calls. Forcing summarizer.")
         state_updates["tool_results"] = {"error": "AI message has no tool_calls."}
         state_updates["next_node"] = "summarizer"
         return state_updates
 
-    first_tool_call = tool_calls[0]
-    
-    next_tool_name = first_tool_call.get("name") 
-    tool_args = first_tool_call.get("args", {}) 
-    
-    if not next_tool_name:
-        logger.info(f"Error: Invalid tool call received: {first_tool_call}. No 'name' key. Forcing summarizer.")
-        state_updates["tool_results"] = {"error": "Invalid tool call format: missing 'name'."}
-        state_updates["next_node"] = "summarizer"
-        return state_updates
+    # 同一轮 LLM 返回的所有工具调用并发执行，每个调用对应一条 ToolMessage
+    results = await asyncio.gather(*(_execute_tool_call(tool_call) for tool_call in tool_calls))
 
-    tool_to_execute = None
-    for t in ALL_TOOLS:
-        if t.name == next_tool_name:
-            tool_to_execute = t
-            break
+    tool_results: Dict[str, Any] = {}
+    tool_messages = []
+    for tool_call, (tool_call_id, tool_result, tool_message) in zip(tool_calls, results):
+        tool_results[tool_call_id] = {"name": tool_call.get("name"), "result": tool_result}
+        tool_messages.append(tool_message)
+        saved = estimate_tokens_saved(tool_result, tool_message.content)
+        if saved > 0:
+            record_tool_tokens_saved(tool_call.get("name") or "unknown", saved)
 
-    if not tool_to_execute:
-        logger.info(f"Error: Tool '{next_tool_name}' not found in ALL_TOOLS. Forcing summarizer.")
-        state_updates["tool_results"] = {"error": f"Tool '{next_tool_name}' not found."}
-        state_updates["next_node"] = "summarizer"
-        return state_updates
-    
-    logger.info(f"tool_executor_node: Executing tool '{next_tool_name}' with args: {tool_args}")
+    state_updates["tool_results"] = tool_results
+    state_updates["messages"] = tool_messages
+    state_updates["next_node"] = None
 
-    try:
-        tool_result = tool_to_execute.invoke(tool_args)
-        logger.info(f"tool_executor_node: Tool '{next_tool_name}' executed. Result: {tool_result}")
-
-        state_updates["tool_results"] = {next_tool_name: tool_result}
-        
-        tool_call_id = first_tool_call.get("id")
-        if not tool_call_id:
-            tool_call_id = f"tool_call_{next_tool_name}_{os.urandom(4).hex()}"
-            logger.info(f"Warning: Tool call ID not found in AI message, using '{tool_call_id}'.")
-
-
-        new_messages = messages + [
-            ToolMessage(content=str(tool_result), tool_call_id=tool_call_id)
-        ]
-        state_updates["messages"] = new_messages
-        state_updates["next_node"] = None
-        
-    except Exception as e:
-        error_message = f"Failed to execute tool '{next_tool_name}' with args {tool_args}: {str(e)}"
-        logger.info(f"Error: {error_message}")
-        state_updates["tool_results"] = {next_tool_name: {"error": error_message}}
-        
-        tool_call_id = first_tool_call.get("id") or f"tool_call_error_{next_tool_name}_{os.urandom(4).hex()}"
-        new_messages = messages + [
-            ToolMessage(content=error_message, tool_call_id=tool_call_id)
-        ]
-        state_updates["messages"] = new_messages
-        state_updates["next_node"] = None
-        
-    return state_updates
\ No newline at end of file
+    return state_updates
@@ -0,0 +1,164 @@
+# src/graph/projections.py
+"""工具结果投影：只保留决策需要的字段并紧凑序列化后写入 ToolMessage。
+
+高德原始响应（尤其是带每一步 polyline 的路线）动辄上千 token，且会在之后每次调用 LLM 时重复发送；
+完整结果仍保存在 GraphState.tool_results 中。
+"""
+import json
+from typing import Any, Callable, Dict, List
+
+MAX_POIS = 10
+MAX_ROUTE_STEPS = 8
+MAX_TRANSITS = 3
+MAX_INSTRUCTION_CHARS = 40
+# 按 UTF-8 字节估算 token：中文约 3 字节/字，英文与 JSON 约 4 字节/token
+BYTES_PER_TOKEN = 4
+
+
+def _text(value: Any) -> str:
+    # 高德对空字段返回 []，统一转为字符串
+    return value if isinstance(value, str) else ""
+
+
+def _compact(value: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in value.items() if v not in ("", None, [], {})}
+
+
+def _amap_error(result: Any) -> Dict[str, Any]:
+    if not isinstance(result, dict):
+        return {"error": str(result)}
+    if "error" in result:
+        return {"error": result["error"]}
+    if str(result.get("status", "1")) != "1":
+        return {"error": result.get("info") or "高德接口返回失败"}
+    return {}
+
+
+def project_poi(poi: Dict[str, Any]) -> Dict[str, Any]:
+    biz_ext = poi.get("biz_ext") if isinstance(poi.get("biz_ext"), dict) else {}
+    return _compact({
+        "id": _text(poi.get("id")),
+        "name": _text(poi.get("name")),
+        "type": _text(poi.get("type")).split(";")[0],
+        "location": _text(poi.get("location")),
+        "address": _text(poi.get("address")),
+        "rating": _text(biz_ext.get("rating")),
+        "open_time": _text(biz_ext.get("open_time")) or _text(biz_ext.get("opentime2")),
+        "cost": _text(biz_ext.get("cost")),
+        "distance": _text(poi.get("distance")),
+    })
+
+
+def project_pois(result: Any) -> Dict[str, Any]:
+    error = _amap_error(result)
+    if error:
+        return error
+    pois = result.get("pois") or []
+    return {"count": len(pois), "pois": [project_poi(p) for p in pois[:MAX_POIS]]}
+
+
+def project_weather(result: Any) -> Dict[str, Any]:
+    error = _amap_error(result)
+    if error:
+        return error
+    if result.get("forecasts"):
+        forecast = result["forecasts"][0]
+        return {
+            "city": forecast.get("city"),
+            "forecast": [
+                _compact({
+                    "date": c.get("date"),
+                    "day": c.get("dayweather"),
+                    "night": c.get("nightweather"),
+                    "temp": f"{c.get('nighttemp')}~{c.get('daytemp')}℃",
+                    "wind": _text(c.get("daywind")),
+                })
+                for c in forecast.get("casts", [])
+            ],
+        }
+    lives = result.get("lives") or []
+    if not lives:
+        return {"error": "未获取到天气信息"}
+    live = lives[0]
+    return _compact({
+        "city": live.get("city"),
+        "weather": live.get("weather"),
+        "temperature": live.get("temperature"),
+        "wind": _text(live.get("winddirection")),
+        "humidity": _text(live.get("humidity")),
+    })
+
+
+def _steps_summary(steps: List[Dict[str, Any]]) -> List[str]:
+    summary = [_text(s.get("instruction"))[:MAX_INSTRUCTION_CHARS] for s in steps[:MAX_ROUTE_STEPS]]
+    if len(steps) > MAX_ROUTE_STEPS:
+        summary.append(f"…共{len(steps)}步")
+    return [s for s in summary if s]
+
+
+def _transit_summary(transit: Dict[str, Any]) -> Dict[str, Any]:
+    lines = []
+    for segment in transit.get("segments", []):
+        for busline in (segment.get("bus") or {}).get("buslines", [])[:1]:
+            lines.append(_text(busline.get("name")))
+    return _compact({
+        "duration_s": transit.get("duration"),
+        "cost": _text(transit.get("cost")),
+        "walking_m": transit.get("walking_distance"),
+        "lines": [name for name in lines if name],
+    })
+
+
+def project_route(result: Any) -> Dict[str, Any]:
+    error = _amap_error(result)
+    if error:
+        return error
+    route = result.get("route") or {}
+    if route.get("transits"):
+        return _compact({
+            "distance_m": route.get("distance"),
+            "taxi_cost": _text(route.get("taxi_cost")),
+            "options": [_transit_summary(t) for t in route["transits"][:MAX_TRANSITS]],
+        })
+    paths = route.get("paths") or []
+    if not paths:
+        return {"error": "未找到路线"}
+    path = paths[0]
+    return _compact({
+        "distance_m": path.get("distance"),
+        "duration_s": path.get("duration"),
+        "tolls": _text(path.get("tolls")),
+        "steps": _steps_summary(path.get("steps", [])),
+    })
+
+
+PROJECTORS: Dict[str, Callable[[Any], Any]] = {
+    "search_poi": project_pois,
+    "search_nearby_poi": project_pois,
+    "get_poi_congestion": project_pois,
+    "get_opening_hours": project_pois,
+    "get_weather": project_weather,
+    "get_route": project_route,
+}
+
+
+def project_tool_result(tool_name: str, result: Any) -> str:
+    """按工具类型投影并序列化为紧凑 JSON；没有对应投影的工具（如 optimize_itinerary）只做紧凑序列化"""
+    projector = PROJECTORS.get(tool_name)
+    projected = projector(result) if projector else result
+    if projector and isinstance(result, dict) and result.get("stale") and "error" not in projected:
+        # 高德熔断/故障时返回的过期缓存：保留标记，让模型知道数据可能不是最新的
+        projected = {**projected, "stale": True, "stale_age_s": result.get("stale_age_s")}
+    return json.dumps(projected, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _json_bytes(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def estimate_tokens_saved(raw: Any, content: str) -> int:
+    """按字节长度估算投影节省的 token：原始结果（带 polyline 的路线可达上万 token）不经分词器，只序列化一次"""
+    saved = _json_bytes(raw) - _json_bytes(content)
+    return max(saved, 0) // BYTES_PER_TOKEN
@@ -1,14 +1,47 @@
 from langchain_core.messages import BaseMessage
-from typing import List, Optional, TypedDict, Dict, Any
+from typing import Annotated, List, Optional, TypedDict, Dict, Any, Union
+
+
+def append_messages(
+    left: Optional[List[BaseMessage]], right: Union[BaseMessage, List[BaseMessage], None]
+) -> List[BaseMessage]:
+    """追加式 reducer：节点只返回本步新增的消息，追加到历史末尾，不需要像 add_messages 那样按 id 逐条合并。
+
+    返回新列表而不是原地 extend：LangGraph 的通道副本（条件边求值、检查点）与通道共享同一个列表，
+    原地修改会让已保存的检查点随后续步骤改变。因此每次应用仍要复制一次历史，单步开销与节点返回完整副本相当
+    （见 benchmarks/bench_reducer.py），收益在于节点不再自行复制与合并历史。"""
+    if left is None:
+        left = []
+    if not right:
+        return left
+    if isinstance(right, BaseMessage):
+        right = [right]
+    return left + right
+
+
+def merge_tool_results(
+    left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """按 tool_call_id 合并工具结果：节点只返回本轮的结果，多轮工具调用的完整结果都会保留。
+
+    right 为 None 表示清空（summarizer 在执行结束时释放完整结果）；返回新字典，不修改检查点共享的旧值。"""
+    if right is None:
+        return {}
+    if left is None:
+        left = {}
+    if not right:
+        return left
+    return {**left, **right}
 
 
 class GraphState(TypedDict, total=False):
-    messages: List[BaseMessage]
+    messages: Annotated[List[BaseMessage], append_messages]
     current_plan: Optional[str]  
     use_tools: bool
     max_iterations: int
     next_node: Optional[str]
-    tool_results: Dict[str, Any]
+    tool_results: Annotated[Dict[str, Any], merge_tool_results]
+    travel_request: Optional[Dict[str, Any]]
 
 
 def initialize_graph_state() -> GraphState:
@@ -19,4 +52,5 @@ def initialize_graph_state() -> GraphState:
         max_iterations=0,
         next_node="",
         tool_results={}, 
-    )
\ No newline at end of file
+        travel_request=None,
+    )
@@ -1,18 +1,178 @@
 # src/graph/tools.py
 import os
-import requests
+import json
+import asyncio
+import sqlite3
+import httpx
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 
+from ..core.circuit_breaker import CircuitOpenError, amap_breakers
+from ..core.deadline import DeadlineExceeded, call_timeout
+from ..core.http_client import get_amap_client
+from ..core.metrics import TOOL_CACHE, gauge_lines, registry
+from ..core.rate_limit import amap_bucket
+from ..logger import get_logger
+from ..services.itinerary import optimize, parse_clock
+from ..services.poi_index import get_poi_index
+from ..settings import settings
+from ..utils.cache import TTLCache, make_key
+
 load_dotenv() # 在这里也加载dotenv，确保工具可以访问环境变量
 
+logger = get_logger(service=__name__)
+
+
+async def _amap_get(path: str, params: dict, timeout: float) -> dict:
+    """通过共享连接池异步请求高德地图API，复用 DNS/TCP/TLS 连接；发出前先经过 QPS 限流"""
+    await amap_bucket.acquire()
+    # 超时不超过请求剩余的时间预算
+    timeout = call_timeout(timeout)
+    client = get_amap_client()
+    response = await client.get(
+        path,
+        params=params,
+        timeout=httpx.Timeout(timeout, connect=min(timeout, settings.AMAP_CONNECT_TIMEOUT)),
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+# 高德地图响应缓存，所有会话共享
+amap_cache = TTLCache(maxsize=settings.AMAP_CACHE_MAXSIZE, stale_ttl=settings.AMAP_CACHE_STALE_TTL)
+
+# 表示高德自身过载/限流的 infocode（访问过频、服务繁忙、QPS 超限等），计入熔断失败；参数错误等业务错误不计入
+_OVERLOAD_INFOCODES = {"10003", "10004", "10014", "10016", "10019", "10020", "10021"}
+
+
+def _is_cacheable(result: dict) -> bool:
+    # 高德业务错误同样返回 200，只缓存 status 为 "1" 的成功结果
+    return isinstance(result, dict) and str(result.get("status", "1")) == "1"
+
+
+def _is_overloaded(result: Any) -> bool:
+    return isinstance(result, dict) and str(result.get("infocode", "")) in _OVERLOAD_INFOCODES
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    # 4xx（限流除外）说明请求本身有问题，不代表高德不可用
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+
+def _amap_cache_metrics() -> list:
+    stats = amap_cache.stats()
+    return (
+        gauge_lines("trip_amap_cache_size", "Entries in the AMap response cache", stats["size"])
+        + gauge_lines("trip_amap_cache_hits_total", "AMap cache hits", stats["hits"], "counter")
+        + gauge_lines("trip_amap_cache_misses_total", "AMap cache misses", stats["misses"], "counter")
+        + gauge_lines("trip_amap_cache_coalesced_total", "AMap calls coalesced onto an in-flight request", stats["coalesced"], "counter")
+        + gauge_lines("trip_amap_cache_stale_hits_total", "Expired AMap responses served as fallback", stats["stale_hits"], "counter")
+    )
+
+
+registry.register_collector(_amap_cache_metrics)
+
+
+async def _cached_amap_get(path: str, params: dict, timeout: float, ttl: float, tool: str) -> dict:
+    """带缓存的高德地图请求：相同参数在 TTL 内直接命中，并发相同请求只发一次。
+
+    每个接口有独立的熔断器：熔断打开或请求失败时，返回过期的缓存结果（带 stale 标记）；
+    没有可用的旧结果时，熔断中的请求立即返回错误而不再等待超时。
+    """
+    key = make_key(path, params, exclude=("key",))
+    breaker = amap_breakers.get(path)
+    loaded = False
+
+    async def load() -> dict:
+        nonlocal loaded
+        loaded = True
+        breaker.check()
+        try:
+            result = await _amap_get(path, params, timeout=timeout)
+        except (DeadlineExceeded, asyncio.CancelledError):
+            breaker.release()
+            raise
+        except Exception as e:
+            if _is_upstream_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        if _is_overloaded(result):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return result
+
+    try:
+        result = await amap_cache.get_or_load(key, load, ttl=ttl, should_cache=_is_cacheable)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        stale = _stale_result(key, tool)
+        if stale is not None:
+            return stale
+        if isinstance(e, CircuitOpenError):
+            TOOL_CACHE.inc(tool, "circuit_open")
+            return {"error": f"高德地图服务暂时不可用（熔断中，约 {e.retry_after:.0f}s 后恢复），请勿重试，直接使用已有信息"}
+        raise
+    if _is_overloaded(result):
+        stale = _stale_result(key, tool)
+        if stale is not None:
+            return stale
+    TOOL_CACHE.inc(tool, "miss" if loaded else "hit")
+    return result
+
+
+def _stale_result(key, tool: str) -> Optional[dict]:
+    stale, age = amap_cache.get_stale(key)
+    if stale is None:
+        return None
+    TOOL_CACHE.inc(tool, "stale")
+    return {**stale, "stale": True, "stale_age_s": int(age)}
+
+def _index_key(path: str, params: dict) -> str:
+    return json.dumps(make_key(path, params, exclude=("key",)), ensure_ascii=False)
+
+
+async def _from_index(tool_name: str, lookup) -> Optional[dict]:
+    """本地 POI 索引命中时返回结果；索引关闭、数据不够新或读取失败时返回 None，由调用方请求高德。
+    SQLite 查询在线程池中执行，不阻塞事件循环"""
+    index = get_poi_index()
+    if index is None:
+        return None
+    try:
+        result = await asyncio.to_thread(lookup, index)
+    except sqlite3.Error as e:
+        logger.warning(f"POI index lookup failed: {e}")
+        return None
+    if result is not None:
+        TOOL_CACHE.inc(tool_name, "index")
+    return result
+
+
+async def _to_index(result: dict, record) -> None:
+    """把成功的高德响应写入本地 POI 索引；写入失败不影响工具结果"""
+    index = get_poi_index()
+    if index is None or not _is_cacheable(result) or "error" in result or result.get("stale"):
+        return
+    try:
+        await asyncio.to_thread(record, index)
+    except sqlite3.Error as e:
+        logger.warning(f"POI index write failed: {e}")
+
+
 @tool
-def search_poi(keyword: str, city: str, poi_type: str = "") -> dict:
+async def search_poi(keyword: str, city: str, poi_type: str = "") -> dict:
     """搜索兴趣点（高德地图API）"""
     if not keyword or not city:
         return {"error": "关键词和城市名称不能为空"}
-    base_url = "https://restapi.amap.com/v3/place/text"
+    path = "/v3/place/text"
     params = {
         "key": os.getenv("AMAP_API_KEY"),
         "keywords": keyword,
@@ -21,34 +181,84 @@ def search_poi(keyword: str, city: str, poi_type: str = "") -> dict:
         "output": "json",
         "offset": 5
     }
+    index_key = _index_key(path, params)
+    local = await _from_index("search_poi", lambda index: index.search(index_key, city, keyword, poi_type, params["offset"]))
+    if local is not None:
+        return local
+    try:
+        result = await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_PLACE_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_POI_SEARCH,
+            tool="search_poi",
+        )
+    except Exception as e:
+        return {"error": f"请求错误: {str(e)}"}
+    await _to_index(result, lambda index: index.record_search(index_key, result, city=city))
+    return result
+
+
+@tool
+async def search_nearby_poi(location: str, keyword: str = "", radius: int = 1000) -> dict:
+    """搜索某个坐标附近的兴趣点（高德地图API），location 格式为 "经度,纬度"，radius 单位为米"""
+    if not location:
+        return {"error": "中心点坐标不能为空"}
+    if radius <= 0 or radius > 50000:
+        return {"error": "搜索半径必须在 1 到 50000 米之间"}
+    path = "/v3/place/around"
+    params = {
+        "key": os.getenv("AMAP_API_KEY"),
+        "location": location,
+        "keywords": keyword,
+        "radius": radius,
+        "output": "json",
+        "offset": 5
+    }
+    index_key = _index_key(path, params)
+    local = await _from_index(
+        "search_nearby_poi", lambda index: index.nearby(index_key, location, radius, keyword, params["offset"])
+    )
+    if local is not None:
+        return local
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        result = await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_PLACE_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_POI_SEARCH,
+            tool="search_nearby_poi",
+        )
     except Exception as e:
         return {"error": f"请求错误: {str(e)}"}
+    await _to_index(result, lambda index: index.record_search(index_key, result))
+    return result
 
 @tool
-def get_route(start: str, end: str, city: str = "", mode: str = "walking") -> dict:
+async def get_route(start: str, end: str, city: str = "", mode: str = "walking") -> dict:
     """获取路线规划（高德地图API）"""
     if not start or not end:
         return {"error": "起点和终点不能为空"}
     valid_modes = ["walking", "bus", "driving"]
     if mode not in valid_modes:
         return {"error": f"交通方式必须是 {', '.join(valid_modes)}"}
-    base_url = f"https://restapi.amap.com/v3/direction/{mode}"
+    path = f"/v3/direction/{mode}"
     params = {"key": os.getenv("AMAP_API_KEY"), "origin": start, "destination": end}
     if city:
         params["city"] = city
     try:
-        response = requests.get(base_url, params=params, timeout=15)
-        response.raise_for_status()
-        return response.json()
+        return await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_ROUTE_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_ROUTE,
+            tool="get_route",
+        )
     except Exception as e:
         return {"error": f"请求错误: {str(e)}"}
 
 @tool
-def get_weather(city: str, date: str = "") -> dict:
+async def get_weather(city: str, date: str = "") -> dict:
     """获取天气预报（高德天气API）"""
     if not city:
         return {"error": "城市名称不能为空"}
@@ -57,7 +267,7 @@ def get_weather(city: str, date: str = "") -> dict:
             datetime.strptime(date, "%Y-%m-%d")
         except ValueError:
             return {"error": "日期格式必须为 YYYY-MM-DD"}
-    base_url = "https://restapi.amap.com/v3/weather/weatherInfo"
+    path = "/v3/weather/weatherInfo"
     extensions = "all" if date else "base"
     params = {
         "key": os.getenv("AMAP_API_KEY"),
@@ -66,39 +276,139 @@ def get_weather(city: str, date: str = "") -> dict:
         "output": "json"
     }
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_WEATHER_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_WEATHER,
+            tool="get_weather",
+        )
     except Exception as e:
         return {"error": f"请求错误: {str(e)}"}
 
 @tool
-def get_poi_congestion(poi_id: str) -> dict:
+async def get_poi_congestion(poi_id: str) -> dict:
     """获取景点拥挤度（基于高德地图POI详情API）"""
     if not poi_id:
         return {"error": "景点ID不能为空"}
-    base_url = "https://restapi.amap.com/v3/place/detail"
+    path = "/v3/place/detail"
     params = {"key": os.getenv("AMAP_API_KEY"), "id": poi_id, "extensions": "all"}
+    local = await _from_index("get_poi_congestion", lambda index: index.detail(poi_id))
+    if local is not None:
+        return local
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        result = await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_PLACE_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_POI_DETAIL,
+            tool="get_poi_congestion",
+        )
     except Exception as e:
         return {"error": f"请求错误: {str(e)}"}
+    await _to_index(result, lambda index: index.upsert(result.get("pois") or [], detail=True))
+    return result
 
 @tool
-def get_opening_hours(poi_id: str) -> dict:
+async def get_opening_hours(poi_id: str) -> dict:
     """获取景点开放时间（高德地图API）"""
     if not poi_id:
         return {"error": "景点ID不能为空"}
-    base_url = "https://restapi.amap.com/v3/place/detail"
+    path = "/v3/place/detail"
     params = {"key": os.getenv("AMAP_API_KEY"), "id": poi_id, "extensions": "all"}
+    local = await _from_index("get_opening_hours", lambda index: index.detail(poi_id))
+    if local is not None:
+        return local
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        result = await _cached_amap_get(
+            path,
+            params,
+            timeout=settings.AMAP_PLACE_TIMEOUT,
+            ttl=settings.AMAP_CACHE_TTL_POI_DETAIL,
+            tool="get_opening_hours",
+        )
     except Exception as e:
         return {"error": f"请求错误: {str(e)}"}
+    await _to_index(result, lambda index: index.upsert(result.get("pois") or [], detail=True))
+    return result
+
+def _route_summary(result: Any) -> Dict[str, Any]:
+    """只保留路线的距离与耗时，逐步导航对排程没有意义"""
+    if not isinstance(result, dict) or "error" in result:
+        return {"error": result.get("error") if isinstance(result, dict) else str(result)}
+    paths = (result.get("route") or {}).get("paths") or []
+    if not paths:
+        return {"error": result.get("info", "未找到路线")}
+    return {"distance_m": paths[0].get("distance"), "duration_s": paths[0].get("duration")}
+
+
+@tool
+async def optimize_itinerary(
+    pois: List[Dict[str, Any]],
+    days: int,
+    city: str = "",
+    mode: str = "walking",
+    start_time: str = "09:00",
+    visit_minutes: int = 90,
+) -> dict:
+    """把多个景点分配到各天并排定游览顺序（考虑开放时间），只为每天相邻的景点规划路线。
+    pois 为 search_poi 返回的景点列表，每项至少包含 name 与 location（"经度,纬度"），可选 id 与 open_time。"""
+    if not pois:
+        return {"error": "景点列表不能为空"}
+    if days < 1:
+        return {"error": "天数必须大于0"}
+    valid_modes = ["walking", "bus", "driving"]
+    if mode not in valid_modes:
+        return {"error": f"交通方式必须是 {', '.join(valid_modes)}"}
+    day_start = parse_clock(start_time)
+    if day_start is None:
+        return {"error": "开始时间格式必须为 HH:MM"}
+
+    # search_poi 原始结果中的开放时间位于 biz_ext 中
+    normalized = [
+        {**poi, "open_time": poi.get("open_time") or (poi.get("biz_ext") or {}).get("open_time")}
+        for poi in pois
+    ]
+    try:
+        plan = optimize(normalized, days, mode=mode, start_minute=day_start, visit_minutes=visit_minutes)
+    except Exception as e:
+        return {"error": f"行程优化失败: {str(e)}"}
+
+    # 只对最终相邻的景点调用路线规划，并发执行
+    legs = [(a, b) for day in plan["days"] for a, b in zip(day["order"], day["order"][1:])]
+    routes = await asyncio.gather(*(
+        get_route.ainvoke({
+            "start": normalized[a]["location"], "end": normalized[b]["location"], "city": city, "mode": mode,
+        })
+        for a, b in legs
+    ))
+    route_by_leg = {leg: _route_summary(route) for leg, route in zip(legs, routes)}
+
+    itinerary = []
+    for number, day in enumerate(plan["days"], start=1):
+        stops = []
+        for position, index in enumerate(day["order"]):
+            poi = normalized[index]
+            stop = {
+                "name": poi.get("name"),
+                "id": poi.get("id"),
+                "arrive": day["times"][position][0],
+                "leave": day["times"][position][1],
+            }
+            if position + 1 < len(day["order"]):
+                stop["next_leg"] = {
+                    "straight_km": day["legs_km"][position],
+                    **route_by_leg[(index, day["order"][position + 1])],
+                }
+            stops.append(stop)
+        itinerary.append({"day": number, "stops": stops, "straight_km": day["km"], "late_minutes": day["late_minutes"]})
+
+    return {
+        "days": itinerary,
+        "skipped": [normalized[i].get("name") for i in plan["skipped"]],
+        "total_straight_km": plan["total_km"],
+        "route_calls": len(legs),
+    }
 
 # 所有可用工具
-ALL_TOOLS = [search_poi, get_route, get_weather, get_poi_congestion, get_opening_hours]
\ No newline at end of file
+ALL_TOOLS = [search_poi, search_nearby_poi, get_route, get_weather, get_poi_congestion, get_opening_hours, optimize_itinerary]
\ No newline at end of file
@@ -2,12 +2,17 @@
 
 import os
 import sys
-from typing import Literal
+from functools import lru_cache
+from typing import Any, Literal
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_qwq import ChatQwen
 from pydantic import SecretStr
 
+from .core.cassette import llm_http_client
+from .logger import get_logger
+from .settings import settings
+
+logger = get_logger(service=__name__)
+
 # from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
 # # from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 # import torch
@@ -44,22 +49,30 @@ def get_llm(
     temperature: float = 0.2,
     api_provider: Literal["google", "qwen", "qwen3", "local"] = "qwen",
     model_path: str | None = None,
+    **kwargs: Any,
 ):
     if not api_key:
         raise ValueError("API Key 不能为空，请检查环境变量 LLM_API_KEY 是否设置正确。")
 
     print(f"--- 使用LLM提供商: {api_provider} ---")
 
+    # 各提供商的 SDK 按需导入，只用千问时不加载 Google 的依赖
     if api_provider == "google":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         if not model_name:
             model_name = "gemini-1.5-flash-latest"
         return ChatGoogleGenerativeAI(
             model=model_name,
             google_api_key=api_key,
             temperature=temperature,
+            timeout=kwargs.pop("request_timeout", settings.SUMMARIZER_CALL_TIMEOUT),
+            **kwargs,
         )
 
     elif api_provider in ["qwen3", "qwen"]:
+        from langchain_qwq import ChatQwen
+
         if not model_name:
             model_name = "qwen3-235b-a22b"
 
@@ -72,10 +85,62 @@ def get_llm(
             max_tokens=max_tokens,
             temperature=temperature,
             enable_thinking=False,
-            # request_timeout=300,
+            # SDK 层的兜底超时取最长的单次调用上限，各节点再按剩余预算收紧
+            request_timeout=kwargs.pop("request_timeout", settings.SUMMARIZER_CALL_TIMEOUT),
             max_retries=3,
+            **kwargs,
         )
     else:
         raise ValueError(
             f"未知的LLM提供商: '{api_provider}'。支持的提供商有 'google', 'qwen', 'qwen3', 'local'。"
         )
+
+
+NODE_MODEL_SETTINGS = {
+    "router": "ROUTER_MODEL_NAME",
+    "router_escalation": "ROUTER_ESCALATION_MODEL_NAME",
+    "summarizer": "SUMMARIZER_MODEL_NAME",
+}
+
+
+def node_model_name(node: str) -> str:
+    """按图节点选择模型；未单独配置的节点使用 QWEN_MODEL_NAME"""
+    setting = NODE_MODEL_SETTINGS.get(node)
+    return (getattr(settings, setting) if setting else "") or settings.QWEN_MODEL_NAME
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name: str | None = None):
+    """进程内共享的对话模型客户端（复用同一个连接池），供各图节点使用"""
+    return get_llm(
+        api_key=settings.QWEN_API_KEY,
+        model_name=model_name or settings.QWEN_MODEL_NAME,
+        api_base_url=settings.QWEN_API_URL,
+        max_tokens=2048,
+        temperature=0.1,
+        api_provider="qwen",
+        streaming=True,
+        stream_usage=True,
+        http_async_client=llm_http_client(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_hedge_model():
+    """router 对冲/降级使用的备用模型（默认 google）；未开启或无法创建时返回 None"""
+    if not settings.LLM_HEDGE_ENABLED:
+        return None
+    provider = settings.LLM_HEDGE_PROVIDER
+    api_key = settings.GOOGLE_API_KEY if provider == "google" else settings.QWEN_API_KEY
+    try:
+        return get_llm(
+            api_key=api_key,
+            model_name=settings.LLM_HEDGE_MODEL_NAME or None,
+            api_base_url=settings.QWEN_API_URL,
+            max_tokens=2048,
+            temperature=0.1,
+            api_provider=provider,
+        )
+    except (ImportError, ValueError) as e:
+        logger.warning(f"备用LLM不可用，关闭对冲请求: {e}")
+        return None
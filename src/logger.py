@@ -1,20 +1,38 @@
 from loguru import logger
 import sys
+import random
+import uuid
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Any, Optional
+
+from .settings import settings
 
 log_dir = Path("logs")
 log_dir.mkdir(exist_ok=True)
 
+# 当前请求 ID，由 middlewares.request_id 在每个请求开始时设置
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+IS_PRODUCTION = settings.LOG_PROFILE == "production"
+
+
+def _inject_request_id(record):
+    record["extra"].setdefault("request_id", request_id_var.get())
+
+
 # 移除默认的控制台输出
 logger.remove()
+logger.configure(patcher=_inject_request_id)
 
-# 添加控制台输出
+# 添加控制台输出（生产模式下不输出 DEBUG，不展开异常变量，写入放到后台线程）
 logger.add(
     sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level="DEBUG",
-    backtrace=True,
-    diagnose=True,
+    format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <magenta>{extra[request_id]}</magenta> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+    level="INFO" if IS_PRODUCTION else "DEBUG",
+    backtrace=not IS_PRODUCTION,
+    diagnose=not IS_PRODUCTION,
+    enqueue=IS_PRODUCTION,
 )
 
 # 添加文件输出
@@ -23,9 +41,10 @@ logger.add(
     rotation="500 MB",  # 日志文件大小超过500MB时轮转
     retention="10 days",  # 保留10天的日志
     compression="zip",  # 压缩旧的日志文件
-    format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {extra[request_id]} | {name}:{function}:{line} - {message}",
     level="INFO",
     encoding="utf-8",
+    enqueue=IS_PRODUCTION,
 )
 
 # 错误日志单独存储
@@ -34,9 +53,10 @@ logger.add(
     rotation="100 MB",
     retention="30 days",
     compression="zip",
-    format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {extra[request_id]} | {name}:{function}:{line} - {message}",
     level="ERROR",
     encoding="utf-8",
+    enqueue=IS_PRODUCTION,
 )
 
 
@@ -44,6 +64,42 @@ def get_logger(service: str, level: str = "INFO"):
     return logger.bind(service=service, level=level)
 
 
+def new_request_id(request_id: Optional[str] = None) -> str:
+    """设置当前上下文的请求 ID，未提供时生成一个新的"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    request_id_var.set(request_id)
+    return request_id
+
+
+def truncate_payload(payload: Any, limit: Optional[int] = None) -> str:
+    """把大对象转为字符串并截断，避免整段消息历史或高德原始 JSON 写入日志"""
+    limit = settings.LOG_MAX_PAYLOAD_CHARS if limit is None else limit
+    text = str(payload)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(truncated, {len(text)} chars)"
+
+
+def summarize_state(state: dict) -> dict:
+    """图状态的紧凑摘要，用于替代打印完整状态"""
+    messages = state.get("messages") or []
+    return {
+        "messages": len(messages),
+        "last_message": type(messages[-1]).__name__ if messages else None,
+        "next_node": state.get("next_node"),
+        "iterations": state.get("max_iterations"),
+        "plan_chars": len(state.get("current_plan") or ""),
+    }
+
+
+def log_payload(log, label: str, payload: Any) -> None:
+    """以 DEBUG 级别惰性记录大对象：只有 DEBUG 开启且命中采样时才会序列化"""
+    rate = settings.LOG_PAYLOAD_SAMPLE_RATE
+    if rate < 1.0 and random.random() >= rate:
+        return
+    log.opt(lazy=True, depth=1).debug("{}: {}", lambda: label, lambda: truncate_payload(payload))
+
+
 def log_structured(event_type: str, data: dict):
     """结构化日志记录"""
-    logger.info({"event_type": event_type, "data": data})
+    logger.opt(depth=1).info({"event_type": event_type, "request_id": request_id_var.get(), "data": data})
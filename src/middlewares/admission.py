@@ -0,0 +1,146 @@
+# src/middlewares/admission.py
+"""图执行接口的准入控制：限制同时执行的图数量，超出部分按到达顺序排队。
+
+队列已满立即返回 429，排队超时返回 503，均带 Retry-After，过载时快速失败而不是把所有请求一起拖慢。
+实现为纯 ASGI 中间件，流式接口在响应体发送完毕后才释放名额。
+"""
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+from ..core.metrics import ADMISSION_REQUESTS, ADMISSION_WAIT, gauge_lines, registry
+from ..settings import settings
+
+# /api/v1/generate_plan/{session_id}[/stream]、/api/v1/chat/{session_id}[/stream]
+ADMITTED_PATH = re.compile(r"^/api/v1/(generate_plan|chat)/[^/]+(/stream)?$")
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """固定名额 + FIFO 等待队列；释放名额时直接交给队首请求，后到的请求无法插队"""
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait: float):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # 名额占用时长的指数滑动平均，用于估算 Retry-After
+        self._avg_hold: Optional[float] = None
+
+    def retry_after(self) -> int:
+        avg_hold = self._avg_hold or 1.0
+        estimate = avg_hold * (len(self._waiters) + 1) / self.max_concurrent
+        return min(max(math.ceil(estimate), 1), MAX_RETRY_AFTER)
+
+    async def acquire(self) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected(429, "服务繁忙，排队人数已满", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时或取消的同时恰好拿到名额，交给下一个等待者
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected(503, "服务繁忙，排队等待超时", self.retry_after()) from None
+            raise
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # 名额直接转交，_active 不变
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+admission_controller = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT,
+)
+
+
+def _admission_metrics() -> list:
+    stats = admission_controller.stats()
+    return (
+        gauge_lines("trip_admission_in_flight", "Graph runs currently admitted", stats["in_flight"])
+        + gauge_lines("trip_admission_queued", "Graph runs waiting for admission", stats["queued"])
+    )
+
+
+registry.register_collector(_admission_metrics)
+
+
+def _endpoint(match: "re.Match[str]") -> str:
+    return match.group(1) + ("_stream" if match.group(2) else "")
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        match = ADMITTED_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if match is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = _endpoint(match)
+        start = time.perf_counter()
+        try:
+            await self.controller.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REQUESTS.inc(endpoint, "rejected_queue_full" if e.status_code == 429 else "rejected_timeout")
+            response = JSONResponse(
+                {"error": e.reason, "retry_after": e.retry_after},
+                status_code=e.status_code,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        admitted_at = time.perf_counter()
+        ADMISSION_WAIT.observe(admitted_at - start, endpoint)
+        ADMISSION_REQUESTS.inc(endpoint, "admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - admitted_at)
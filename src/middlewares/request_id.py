@@ -0,0 +1,14 @@
+# src/middlewares/request_id.py
+from fastapi import Request
+
+from ..logger import new_request_id
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+async def request_id_middleware(request: Request, call_next):
+    """为每个请求设置请求 ID（优先沿用客户端传入的 X-Request-ID），并写回响应头"""
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    response = await call_next(request)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
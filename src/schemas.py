@@ -2,6 +2,8 @@ from pydantic import BaseModel,field_validator
 from typing import List
 from datetime import datetime
 
+from .settings import settings
+
 class TravelRequest(BaseModel):
     departure: str
     destination: str
@@ -37,4 +39,16 @@ class UserInput(BaseModel):
         v = v.strip()
         if not v:
             raise ValueError("输入不能为空")
-        return v
\ No newline at end of file
+        return v
+
+class BatchPlanRequest(BaseModel):
+    requests: List[TravelRequest]
+
+    @field_validator('requests')
+    @classmethod
+    def validate_requests(cls, v: List[TravelRequest]) -> List[TravelRequest]:
+        if not v:
+            raise ValueError("批量请求不能为空")
+        if len(v) > settings.BATCH_MAX_ITEMS:
+            raise ValueError(f"单个批量任务最多{settings.BATCH_MAX_ITEMS}条请求")
+        return v
@@ -0,0 +1,197 @@
+# src/services/batch_jobs.py
+"""批量计划任务：一次提交多个 TravelRequest，由固定数量的后台 worker 逐项执行。
+
+同一任务中归一化后相同的请求（plan_cache_key 相同）只执行一次；不同任务以及交互式接口之间
+通过计划缓存复用结果。客户端凭任务 ID 轮询进度，并以 NDJSON 流按完成顺序读取结果。
+任务只保存在接收它的 worker 进程内存中，因此 WORKERS > 1 时拒绝提交批量任务，
+否则后续的进度和结果请求可能落到没有该任务的 worker 上而返回 404。
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..core.metrics import gauge_lines, registry
+from ..logger import get_logger
+from ..schemas import TravelRequest
+from ..settings import settings
+from .plan_cache import plan_cache_key
+
+logger = get_logger(service=__name__)
+
+# (item_id, request) -> 结果字段（如 {"plan": ...}）；抛出异常视为该项失败
+ItemRunner = Callable[[str, TravelRequest], Awaitable[Dict[str, Any]]]
+
+
+class BatchJobRejected(Exception):
+    pass
+
+
+class BatchJobsUnavailable(Exception):
+    pass
+
+
+class BatchJob:
+    def __init__(self, requests: List[TravelRequest], runner: ItemRunner):
+        self.job_id = uuid.uuid4().hex
+        self.total = len(requests)
+        self.runner = runner
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # plan_cache_key -> 使用该请求的下标，第一个下标的请求代表整组执行
+        self.groups: Dict[Tuple, List[int]] = {}
+        self.requests: Dict[Tuple, TravelRequest] = {}
+        for index, request in enumerate(requests):
+            key = plan_cache_key(request)
+            self.groups.setdefault(key, []).append(index)
+            self.requests.setdefault(key, request)
+        # 按完成顺序追加，流式读取用下标作为游标
+        self.results: List[Dict[str, Any]] = []
+        self.failed = 0
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) >= self.total
+
+    @property
+    def status(self) -> str:
+        if self.done:
+            return "done"
+        return "running" if self.started_at else "queued"
+
+    def _add_results(self, results: List[Dict[str, Any]]) -> None:
+        self.results.extend(results)
+        if self.done:
+            self.finished_at = time.time()
+        # 唤醒正在等待新结果的流，并为下一批结果换一个新的 Event
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def run_group(self, key: Tuple) -> None:
+        if self.started_at is None:
+            self.started_at = time.time()
+        indices = self.groups[key]
+        try:
+            output = await self.runner(f"batch-{self.job_id}-{indices[0]}", self.requests[key])
+            status = "ok"
+        except Exception as e:
+            logger.exception(f"batch job {self.job_id}: item {indices[0]} failed: {e}")
+            output, status = {"error": str(e)}, "error"
+            self.failed += len(indices)
+        self._add_results([
+            {"index": index, "status": status, "deduplicated": index != indices[0], **output}
+            for index in indices
+        ])
+
+    async def stream_results(self, offset: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """从 offset 开始按完成顺序输出结果，直到全部完成；断线后可凭已读取的条数续读"""
+        while True:
+            updated = self._updated
+            while offset < len(self.results):
+                yield self.results[offset]
+                offset += 1
+            if self.done:
+                return
+            await updated.wait()
+
+    def progress(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "unique": len(self.groups),
+            "completed": len(self.results),
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "elapsed": round(end - (self.started_at or end), 3),
+        }
+
+
+class BatchJobManager:
+    """固定数量的 worker 从同一个队列中取任务项执行，批量任务的并发不随提交量增长"""
+
+    def __init__(self, workers: int, max_jobs: int, job_ttl: float, enabled: bool = True):
+        self.enabled = enabled
+        self.workers = max(workers, 1)
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self._jobs: Dict[str, BatchJob] = {}
+        self._queue: "asyncio.Queue[Tuple[BatchJob, Tuple]]" = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _ensure_workers(self) -> None:
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.get_running_loop().create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            job, key = await self._queue.get()
+            try:
+                await job.run_group(key)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, requests: List[TravelRequest], runner: ItemRunner) -> BatchJob:
+        if not self.enabled:
+            raise BatchJobsUnavailable("批量任务只保存在单个进程内，WORKERS > 1 时不可用，请改用单 worker 部署提交批量任务")
+        self._prune()
+        active = sum(1 for job in self._jobs.values() if not job.done)
+        if active >= self.max_jobs:
+            raise BatchJobRejected(f"未完成的批量任务已达上限（{self.max_jobs}）")
+        job = BatchJob(requests, runner)
+        self._jobs[job.job_id] = job
+        for key in job.groups:
+            self._queue.put_nowait((job, key))
+        self._ensure_workers()
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def close(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": len(self._jobs),
+            "active_jobs": sum(1 for job in self._jobs.values() if not job.done),
+            "queued_items": self._queue.qsize(),
+            "workers": len(self._worker_tasks),
+        }
+
+
+batch_job_manager = BatchJobManager(
+    workers=settings.BATCH_WORKERS,
+    max_jobs=settings.BATCH_MAX_JOBS,
+    job_ttl=settings.BATCH_JOB_TTL,
+    enabled=settings.WORKERS == 1,
+)
+
+
+def _batch_job_metrics() -> List[str]:
+    stats = batch_job_manager.stats()
+    return (
+        gauge_lines("trip_batch_jobs_active", "Batch plan jobs not yet finished", stats["active_jobs"])
+        + gauge_lines("trip_batch_items_queued", "Batch plan items waiting for a worker", stats["queued_items"])
+    )
+
+
+registry.register_collector(_batch_job_metrics)
@@ -0,0 +1,309 @@
+# src/services/checkpointer.py
+"""基于 SQLite 的 LangGraph checkpointer。
+
+每个超步结束后保存一次检查点：通道值按版本单独存储，未变化的通道不会重复写入；
+每个线程只保留最近 max_per_thread 个检查点，更早的检查点、写入与不再被引用的通道值在保存时删除；
+会话被淘汰或批量任务项完成时，整个线程随之删除。
+序列化使用 LangGraph 默认的 serde（基于 ormsgpack）。多个 worker 进程可以共享同一个数据库文件；
+异步接口在线程池中执行 SQLite 读写，不阻塞事件循环。
+"""
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+import sqlite3
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    def __init__(self, path: str, max_per_thread: int = 20, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_per_thread = max_per_thread
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    # ---- 读取 ----
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                "SELECT type, blob FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """按 checkpoint_id 读取指定检查点；未指定时读取该线程最新的检查点"""
+        configurable = config["configurable"]
+        params: list = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        query = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT * FROM checkpoints WHERE 1 = 1"
+        params: list = []
+        if config:
+            configurable = config["configurable"]
+            query += " AND thread_id = ?"
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            params.append(get_checkpoint_id(before))
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            tuples = []
+            for row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                item = self._to_tuple(row)
+                # 元数据过滤需要先反序列化，因此在 Python 中完成
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(item)
+        yield from tuples
+
+    # ---- 写入 ----
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values: Dict[str, Any] = stored.pop("channel_values")  # type: ignore[misc]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(stored)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            # 只写入本步发生变化的通道
+            for channel, version in new_versions.items():
+                type_, blob = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, channel, str(version), type_, blob),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                    checkpoint_type, checkpoint_blob, metadata_type, metadata_blob,
+                ),
+            )
+            self._prune(thread_id, checkpoint_ns)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """只保留该线程最近的 max_per_thread 个检查点；checkpoint_id 按时间递增"""
+        if self.max_per_thread <= 0:
+            return
+        row = self._conn.execute(
+            "SELECT checkpoint_id, checkpoint_type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_per_thread - 1),
+        ).fetchone()
+        if row is None:
+            return
+        oldest_id, checkpoint_type, checkpoint_blob = row
+        for table in ("checkpoints", "checkpoint_writes"):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, oldest_id),
+            )
+        # 保留的检查点引用的通道版本都不低于最早一个检查点中的版本（默认的整数版本号单调递增）
+        versions = self.serde.loads_typed((checkpoint_type, checkpoint_blob))["channel_versions"]
+        for channel, version in versions.items():
+            if isinstance(version, int):
+                self._conn.execute(
+                    "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? "
+                    "AND CAST(version AS INTEGER) < ?",
+                    (thread_id, checkpoint_ns, channel, version),
+                )
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                type_, blob = self.serde.dumps_typed(value)
+                # 特殊通道（如 error、interrupt）总是覆盖；普通写入已存在时保持不变
+                verb = "INSERT OR REPLACE" if write_idx < 0 else "INSERT OR IGNORE"
+                self._conn.execute(
+                    f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, task_id, write_idx, channel, type_, blob, task_path),
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.delete_threads([thread_id])
+
+    def delete_threads(self, thread_ids: Sequence[str]) -> None:
+        """删除多个线程的全部检查点，用于会话淘汰后的批量清理"""
+        if not thread_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for start in range(0, len(thread_ids), 500):
+                chunk = list(thread_ids[start:start + 500])
+                placeholders = ", ".join("?" * len(chunk))
+                for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id IN ({placeholders})", chunk)
+
+    # ---- 异步接口：在线程池中复用同步实现 ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
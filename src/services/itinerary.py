@@ -0,0 +1,209 @@
+# src/services/itinerary.py
+"""本地行程优化：按坐标计算距离矩阵，把景点分配到各天，并在开放时间约束下排定每天的游览顺序。
+
+整个过程只依赖景点坐标，不调用高德地图；路线规划只需对最终相邻的景点调用一次。
+"""
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# 按交通方式估算的平均速度（km/h），仅用于排定时间表
+TRAVEL_SPEED_KMH = {"walking": 4.5, "bus": 15.0, "driving": 25.0}
+# 每迟到一分钟折算的距离惩罚（km），使违反开放时间的顺序几乎不会被选中
+LATENESS_PENALTY_KM = 10.0
+MAX_KMEANS_ITERATIONS = 20
+
+_TIME_RANGE = re.compile(r"(\d{1,2}):(\d{2})\s*[-~至]\s*(\d{1,2}):(\d{2})")
+_CLOCK = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+def parse_location(location: Any) -> Optional[Tuple[float, float]]:
+    """解析高德的 "经度,纬度" 字符串"""
+    try:
+        lng, lat = (float(v) for v in str(location).split(","))
+    except ValueError:
+        return None
+    return lng, lat
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """解析 "09:00"，返回当天的分钟数"""
+    match = _CLOCK.match(str(text).strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def parse_open_time(text: Any) -> Optional[Tuple[int, int]]:
+    """解析 "08:00-17:30" 形式的开放时间，返回当天的 (开门分钟, 关门分钟)"""
+    match = _TIME_RANGE.search(str(text or ""))
+    if not match:
+        return None
+    open_h, open_m, close_h, close_m = (int(v) for v in match.groups())
+    opens, closes = open_h * 60 + open_m, close_h * 60 + close_m
+    if closes <= opens:
+        closes += 24 * 60
+    return opens, closes
+
+
+def format_minutes(minutes: float) -> str:
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def haversine_matrix(coords: np.ndarray) -> np.ndarray:
+    """coords 为 (n, 2) 的 [经度, 纬度] 数组，一次向量化计算出 (n, n) 的球面距离矩阵（km）"""
+    radians = np.radians(coords)
+    lng, lat = radians[:, 0], radians[:, 1]
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _distances_to(points: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """每个中心点到每个景点的距离，形状为 (len(points), len(coords))"""
+    return haversine_matrix(np.vstack([points, coords]))[: len(points), len(points):]
+
+
+def cluster_days(coords: np.ndarray, days: int) -> List[List[int]]:
+    """带容量约束的 k-means：每天的景点数不超过 ceil(n / days)，避免某一天过于拥挤"""
+    n = len(coords)
+    days = max(1, min(days, n))
+    capacity = math.ceil(n / days)
+
+    # 最远点初始化：第一个中心取离整体质心最远的点，之后依次取离已有中心最远的点
+    dist = haversine_matrix(coords)
+    seeds = [int(np.argmax(_distances_to(coords.mean(axis=0, keepdims=True), coords)[0]))]
+    while len(seeds) < days:
+        seeds.append(int(np.argmax(dist[seeds].min(axis=0))))
+    centroids = coords[seeds]
+
+    labels = np.full(n, -1)
+    for _ in range(MAX_KMEANS_ITERATIONS):
+        to_centroid = _distances_to(centroids, coords).T
+        # 离最近中心越远的点越先分配，使其优先获得理想的一天
+        order = np.argsort(-to_centroid.min(axis=1))
+        counts = np.zeros(days, dtype=int)
+        new_labels = np.empty(n, dtype=int)
+        for i in order:
+            for day in np.argsort(to_centroid[i]):
+                if counts[day] < capacity:
+                    new_labels[i] = day
+                    counts[day] += 1
+                    break
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        centroids = np.array([
+            coords[labels == day].mean(axis=0) if np.any(labels == day) else centroids[day]
+            for day in range(days)
+        ])
+
+    clusters = [[int(i) for i in np.flatnonzero(labels == day)] for day in range(days)]
+    return [c for c in clusters if c]
+
+
+class DaySchedule:
+    """按给定顺序模拟一天的行程，计算总距离与迟到时长（到达时已无法完成游览的分钟数）"""
+
+    def __init__(
+        self,
+        dist: np.ndarray,
+        windows: Sequence[Optional[Tuple[int, int]]],
+        start_minute: int,
+        visit_minutes: int,
+        speed_kmh: float,
+    ):
+        self.dist = dist
+        self.windows = windows
+        self.start_minute = start_minute
+        self.visit_minutes = visit_minutes
+        self.minutes_per_km = 60.0 / speed_kmh
+
+    def simulate(self, order: Sequence[int]) -> Tuple[float, float, List[Tuple[float, float]]]:
+        clock = float(self.start_minute)
+        km = lateness = 0.0
+        times: List[Tuple[float, float]] = []
+        for position, poi in enumerate(order):
+            if position:
+                leg = float(self.dist[order[position - 1], poi])
+                km += leg
+                clock += leg * self.minutes_per_km
+            window = self.windows[poi]
+            if window:
+                clock = max(clock, window[0])
+                lateness += max(0.0, clock + self.visit_minutes - window[1])
+            times.append((clock, clock + self.visit_minutes))
+            clock += self.visit_minutes
+        return km, lateness, times
+
+    def cost(self, order: Sequence[int]) -> float:
+        km, lateness, _ = self.simulate(order)
+        return km + LATENESS_PENALTY_KM * lateness
+
+    def nearest_neighbour(self, pois: Sequence[int]) -> List[int]:
+        """从最早关门的景点出发，每次选择加入后代价最小的下一个景点"""
+        remaining = list(pois)
+        first = min(remaining, key=lambda p: (self.windows[p] or (0, 24 * 60))[1])
+        order = [first]
+        remaining.remove(first)
+        while remaining:
+            best = min(remaining, key=lambda p: self.cost(order + [p]))
+            order.append(best)
+            remaining.remove(best)
+        return order
+
+    def two_opt(self, order: List[int]) -> List[int]:
+        best, best_cost = order, self.cost(order)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(best) - 1):
+                for j in range(i + 2, len(best) + 1):
+                    candidate = best[:i] + best[i:j][::-1] + best[j:]
+                    candidate_cost = self.cost(candidate)
+                    if candidate_cost + 1e-9 < best_cost:
+                        best, best_cost, improved = candidate, candidate_cost, True
+        return best
+
+
+def optimize(
+    pois: List[Dict[str, Any]],
+    days: int,
+    mode: str = "walking",
+    start_minute: int = 9 * 60,
+    visit_minutes: int = 90,
+) -> Dict[str, Any]:
+    """pois 中每项需包含 location（"经度,纬度"），可选 open_time；返回按天排好顺序的景点下标与时间表。
+    无法解析坐标的景点放入 skipped。
+    """
+    located = [(i, parse_location(p.get("location"))) for i, p in enumerate(pois)]
+    valid = [(i, loc) for i, loc in located if loc is not None]
+    skipped = [i for i, loc in located if loc is None]
+    if not valid:
+        return {"days": [], "skipped": skipped, "total_km": 0.0}
+
+    indices = [i for i, _ in valid]
+    coords = np.array([loc for _, loc in valid], dtype=float)
+    dist = haversine_matrix(coords)
+    windows = [parse_open_time(pois[i].get("open_time")) for i in indices]
+    schedule = DaySchedule(dist, windows, start_minute, visit_minutes, TRAVEL_SPEED_KMH.get(mode, 4.5))
+
+    result_days = []
+    total_km = 0.0
+    for cluster in cluster_days(coords, days):
+        order = schedule.two_opt(schedule.nearest_neighbour(cluster))
+        km, lateness, times = schedule.simulate(order)
+        total_km += km
+        result_days.append({
+            "order": [indices[p] for p in order],
+            "times": [(format_minutes(a), format_minutes(d)) for a, d in times],
+            "legs_km": [round(float(dist[a, b]), 2) for a, b in zip(order, order[1:])],
+            "km": round(km, 2),
+            "late_minutes": round(lateness),
+        })
+    return {"days": result_days, "skipped": skipped, "total_km": round(total_km, 2)}
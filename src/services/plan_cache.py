@@ -0,0 +1,53 @@
+# src/services/plan_cache.py
+from typing import Any, List, Tuple
+
+from ..core.metrics import gauge_lines, registry
+from ..graph.state import GraphState
+from ..schemas import TravelRequest
+from ..settings import settings
+from ..utils.cache import TTLCache
+
+
+def plan_cache_key(request: TravelRequest) -> Tuple:
+    """归一化的计划请求键：城市名去除空白，兴趣偏好去重并排序"""
+    interests = sorted({i.strip() for i in request.interests if i and i.strip()})
+    return (
+        request.departure.strip(),
+        request.destination.strip(),
+        request.start_date,
+        request.end_date,
+        tuple(interests),
+        request.avoid_crowds,
+        request.team_outing,
+    )
+
+
+def is_cacheable_plan(state: Any) -> bool:
+    return isinstance(state, dict) and bool(state.get("messages")) and bool(state.get("current_plan"))
+
+
+def seed_session_state(state: GraphState) -> GraphState:
+    """从缓存的最终状态复制出会话状态；消息列表必须复制，后续对话会在其上追加"""
+    seeded = GraphState(**state)
+    seeded["messages"] = list(state.get("messages", []))
+    return seeded
+
+
+# 计划中包含天气信息，缓存时间不超过天气缓存的有效期
+plan_cache = TTLCache(
+    maxsize=settings.PLAN_CACHE_MAXSIZE,
+    ttl=min(settings.PLAN_CACHE_TTL, settings.AMAP_CACHE_TTL_WEATHER),
+)
+
+
+def _plan_cache_metrics() -> List[str]:
+    stats = plan_cache.stats()
+    return (
+        gauge_lines("trip_plan_cache_hits_total", "Plans served from the plan cache", stats["hits"], "counter")
+        + gauge_lines("trip_plan_cache_coalesced_total", "Plan requests coalesced onto an in-flight run", stats["coalesced"], "counter")
+        + gauge_lines("trip_plan_cache_misses_total", "Plan cache misses", stats["misses"], "counter")
+        + gauge_lines("trip_plan_cache_size", "Entries in the plan cache", stats["size"])
+    )
+
+
+registry.register_collector(_plan_cache_metrics)
@@ -0,0 +1,300 @@
+# src/services/poi_index.py
+"""本地持久化的 POI 索引（SQLite）。
+
+高德工具返回的每个 POI 按 id 写入 pois 表，并记录最后刷新时间；
+文本查询使用 FTS5（trigram 分词，支持中文子串），附近查询使用经纬度网格表。
+search_poi / get_opening_hours / get_poi_congestion 在数据足够新时直接从这里返回，不访问网络。
+索引在应用启动时打开（open_poi_index），读写是阻塞的 SQLite 调用，工具通过 asyncio.to_thread 调用。
+"""
+import functools
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.metrics import gauge_lines, registry
+from ..logger import get_logger
+from ..settings import root_dir, settings
+from .itinerary import EARTH_RADIUS_KM, parse_location
+
+logger = get_logger(service=__name__)
+
+# 网格边长（度），约 1km
+GRID_CELL_DEGREES = 0.01
+# trigram 分词只能匹配不少于 3 个字符的子串，更短的关键词改用 LIKE
+MIN_FTS_CHARS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pois (
+    id TEXT PRIMARY KEY,
+    city TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT '',
+    lng REAL,
+    lat REAL,
+    cell_x INTEGER,
+    cell_y INTEGER,
+    data TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    detail_refreshed_at REAL
+);
+CREATE INDEX IF NOT EXISTS pois_cell ON pois (cell_x, cell_y);
+CREATE INDEX IF NOT EXISTS pois_city ON pois (city);
+CREATE VIRTUAL TABLE IF NOT EXISTS pois_fts USING fts5(id UNINDEXED, name, type, address, tokenize='trigram');
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    poi_ids TEXT NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+"""
+
+
+def _cell(lng: float, lat: float) -> Tuple[int, int]:
+    return math.floor(lng / GRID_CELL_DEGREES), math.floor(lat / GRID_CELL_DEGREES)
+
+
+def _distance_m(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    lng1, lat1, lng2, lat2 = map(math.radians, (lng1, lat1, lng2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * 1000 * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _text(value: Any) -> str:
+    # 高德对空字段返回 []，统一转为字符串
+    return value if isinstance(value, str) else ""
+
+
+def _response(pois: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"status": "1", "info": "OK", "count": str(len(pois)), "pois": pois, "source": "local_index"}
+
+
+def _locked(method):
+    # 连接在线程池的多个线程间共享，同一时间只允许一个调用
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class POIIndex:
+    def __init__(self, path: str, ttl: float, detail_ttl: float):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self.detail_ttl = detail_ttl
+        self.hits = 0
+        self.misses = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---- 写入 ----
+
+    @_locked
+    def upsert(self, pois: Iterable[Dict[str, Any]], city: str = "", detail: bool = False) -> List[str]:
+        """写入或刷新 POI，返回写入的 id 列表；detail 为 True 时表示数据来自详情接口"""
+        now = time.time()
+        ids = []
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for poi in pois:
+                poi_id = _text(poi.get("id"))
+                if not poi_id:
+                    continue
+                location = parse_location(poi.get("location"))
+                lng, lat = location if location else (None, None)
+                cell_x, cell_y = _cell(lng, lat) if location else (None, None)
+                city_name = _text(poi.get("cityname")) or city
+                self._conn.execute(
+                    """
+                    INSERT INTO pois (id, city, name, type, address, lng, lat, cell_x, cell_y, data,
+                                      refreshed_at, detail_refreshed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        city = excluded.city, name = excluded.name, type = excluded.type,
+                        address = excluded.address, lng = excluded.lng, lat = excluded.lat,
+                        cell_x = excluded.cell_x, cell_y = excluded.cell_y, refreshed_at = excluded.refreshed_at,
+                        -- 搜索结果字段少于详情，不覆盖已有的详情数据
+                        data = CASE WHEN excluded.detail_refreshed_at IS NOT NULL OR pois.detail_refreshed_at IS NULL
+                                    THEN excluded.data ELSE pois.data END,
+                        detail_refreshed_at = COALESCE(excluded.detail_refreshed_at, pois.detail_refreshed_at)
+                    """,
+                    (
+                        poi_id, city_name, _text(poi.get("name")), _text(poi.get("type")),
+                        _text(poi.get("address")), lng, lat, cell_x, cell_y,
+                        json.dumps(poi, ensure_ascii=False), now, now if detail else None,
+                    ),
+                )
+                self._conn.execute("DELETE FROM pois_fts WHERE id = ?", (poi_id,))
+                self._conn.execute(
+                    "INSERT INTO pois_fts (id, name, type, address) VALUES (?, ?, ?, ?)",
+                    (poi_id, _text(poi.get("name")), _text(poi.get("type")), _text(poi.get("address"))),
+                )
+                ids.append(poi_id)
+        return ids
+
+    @_locked
+    def record_search(self, key: str, result: Dict[str, Any], city: str = "") -> None:
+        """记录一次成功的高德搜索：POI 写入索引，查询键保存结果顺序"""
+        ids = self.upsert(result.get("pois") or [], city=city)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO searches (key, poi_ids, refreshed_at) VALUES (?, ?, ?)",
+            (key, json.dumps(ids), time.time()),
+        )
+
+    # ---- 查询 ----
+
+    def _load(self, ids: List[str], max_age: float) -> Optional[List[Dict[str, Any]]]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT id, data FROM pois WHERE id IN ({placeholders}) AND refreshed_at > ?",
+            (*ids, time.time() - max_age),
+        ).fetchall()
+        by_id = {poi_id: json.loads(data) for poi_id, data in rows}
+        if len(by_id) < len(ids):
+            return None
+        return [by_id[poi_id] for poi_id in ids]
+
+    def _lookup(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _recorded(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT poi_ids FROM searches WHERE key = ? AND refreshed_at > ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if not row:
+            return None
+        pois = self._load(json.loads(row[0]), self.ttl)
+        return _response(pois) if pois is not None else None
+
+    @_locked
+    def search(self, key: str, city: str, keyword: str, poi_type: str, limit: int) -> Optional[Dict[str, Any]]:
+        """优先返回相同查询的历史结果；否则用全文索引在该城市内匹配，数量不足 limit 时返回 None"""
+        recorded = self._recorded(key)
+        if recorded is not None:
+            return self._lookup(recorded)
+
+        # 高德返回的城市名带“市”等后缀，按前缀匹配
+        filters = "p.city LIKE ? AND p.refreshed_at > ? AND p.type LIKE ?"
+        params = [f"{city}%", time.time() - self.ttl, f"%{poi_type}%"]
+        if len(keyword) >= MIN_FTS_CHARS:
+            rows = self._conn.execute(
+                f"""
+                SELECT p.data FROM pois_fts f JOIN pois p ON p.id = f.id
+                WHERE pois_fts MATCH ? AND {filters}
+                ORDER BY f.rank LIMIT ?
+                """,
+                ['"' + keyword.replace('"', '""') + '"', *params, limit],
+            ).fetchall()
+        else:
+            pattern = f"%{keyword}%"
+            rows = self._conn.execute(
+                f"SELECT p.data FROM pois p WHERE {filters} AND (p.name LIKE ? OR p.type LIKE ?) LIMIT ?",
+                [*params, pattern, pattern, limit],
+            ).fetchall()
+        if len(rows) < limit:
+            return self._lookup(None)
+        return self._lookup(_response([json.loads(data) for (data,) in rows]))
+
+    @_locked
+    def nearby(self, key: str, location: str, radius: int, keyword: str, limit: int) -> Optional[Dict[str, Any]]:
+        """优先返回相同查询的历史结果；否则按网格取出半径内的候选 POI 并按距离排序，新鲜数据不足 limit 个时返回 None"""
+        recorded = self._recorded(key)
+        if recorded is not None:
+            return self._lookup(recorded)
+        center = parse_location(location)
+        if center is None:
+            return self._lookup(None)
+        lng, lat = center
+        lat_span = radius / 111_320
+        lng_span = radius / (111_320 * max(0.01, math.cos(math.radians(lat))))
+        min_x, min_y = _cell(lng - lng_span, lat - lat_span)
+        max_x, max_y = _cell(lng + lng_span, lat + lat_span)
+        query = "SELECT lng, lat, data FROM pois WHERE cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ? AND refreshed_at > ?"
+        params: list = [min_x, max_x, min_y, max_y, time.time() - self.ttl]
+        if keyword:
+            query += " AND (name LIKE ? OR type LIKE ?)"
+            params += [f"%{keyword}%", f"%{keyword}%"]
+
+        candidates = []
+        for poi_lng, poi_lat, data in self._conn.execute(query, params):
+            distance = _distance_m(lng, lat, poi_lng, poi_lat)
+            if distance <= radius:
+                candidates.append((distance, data))
+        if len(candidates) < limit:
+            return self._lookup(None)
+        candidates.sort(key=lambda item: item[0])
+        pois = []
+        for distance, data in candidates[:limit]:
+            poi = json.loads(data)
+            poi["distance"] = str(int(distance))
+            pois.append(poi)
+        return self._lookup(_response(pois))
+
+    @_locked
+    def detail(self, poi_id: str) -> Optional[Dict[str, Any]]:
+        """返回与高德详情接口相同结构的结果；只接受来自详情接口且未过期的数据"""
+        row = self._conn.execute(
+            "SELECT data FROM pois WHERE id = ? AND detail_refreshed_at > ?", (poi_id, time.time() - self.detail_ttl)
+        ).fetchone()
+        return self._lookup(_response([json.loads(row[0])]) if row else None)
+
+    @_locked
+    def stats(self) -> Dict[str, Any]:
+        size = self._conn.execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+
+poi_index: Optional[POIIndex] = None
+
+
+def get_poi_index() -> Optional[POIIndex]:
+    """已打开的索引；POI_INDEX_PATH 为空或应用尚未启动时返回 None，工具直接请求高德"""
+    return poi_index
+
+
+def open_poi_index() -> Optional[POIIndex]:
+    """在应用启动时打开索引；相对路径按项目根目录解析，与启动时的工作目录无关"""
+    global poi_index
+    if poi_index is None and settings.POI_INDEX_PATH:
+        path = os.path.join(root_dir, settings.POI_INDEX_PATH)
+        poi_index = POIIndex(path, settings.POI_INDEX_TTL, settings.POI_INDEX_DETAIL_TTL)
+    return poi_index
+
+
+def close_poi_index() -> None:
+    global poi_index
+    if poi_index is not None:
+        poi_index.close()
+        poi_index = None
+
+
+def _poi_index_metrics() -> List[str]:
+    if poi_index is None:
+        return []
+    stats = poi_index.stats()
+    return (
+        gauge_lines("trip_poi_index_hits_total", "POI lookups answered from the local index", stats["hits"], "counter")
+        + gauge_lines("trip_poi_index_misses_total", "POI lookups that fell through to AMap", stats["misses"], "counter")
+        + gauge_lines("trip_poi_index_size", "POIs stored in the local index", stats["size"])
+    )
+
+
+registry.register_collector(_poi_index_metrics)
@@ -0,0 +1,402 @@
+# src/services/session_store.py
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from ..core.metrics import gauge_lines, registry
+from ..graph.state import GraphState, initialize_graph_state
+from ..logger import get_logger
+from ..settings import settings
+from .state_codec import dumps_state, loads_state
+
+logger = get_logger(service=__name__)
+
+
+def estimate_state_size(state: GraphState) -> int:
+    """粗略估算会话状态占用的字节数（消息内容、工具调用参数、当前计划与工具结果）"""
+    size = 0
+    for message in state.get("messages", []):
+        content = message.content
+        size += len(content.encode("utf-8")) if isinstance(content, str) else len(str(content))
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            size += len(str(tool_calls))
+    size += len((state.get("current_plan") or "").encode("utf-8"))
+    tool_results = state.get("tool_results")
+    if tool_results:
+        size += len(str(tool_results))
+    return size
+
+
+class _SessionLocks:
+    """进程内按会话 id 分配的 asyncio 锁；没有持有者和等待者时移除，数量不随会话总数增长"""
+
+    def __init__(self):
+        self._locks: Dict[str, List[Any]] = {}  # session_id -> [锁, 持有与等待的请求数]
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+
+class SessionStore:
+    """有界会话存储：按最大会话数、空闲超时与内存上限进行 LRU 淘汰，会话中只保存图状态"""
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600.0, max_bytes: int = 0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        # 会话被淘汰/过期后调用（如删除该会话的检查点线程）；在线程池中执行，不阻塞事件循环
+        self.on_evict: Optional[Callable[[List[str]], None]] = None
+        self._evicted_ids: List[str] = []
+        self._locks = _SessionLocks()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def lock(self, session_id: str):
+        """同一会话的请求依次执行（读取会话、执行图、保存会话），避免并发请求互相覆盖状态与检查点"""
+        return self._locks.hold(session_id)
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        """获取会话，不存在时创建；每次访问都会刷新 LRU 顺序与最近访问时间"""
+        self._evict_expired()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {"state": initialize_graph_state(), "last_access": time.monotonic(), "size": 0}
+            self._sessions[session_id] = session
+            self.created += 1
+            self._evict_overflow()
+        else:
+            session["last_access"] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        """在会话状态更新后调用，重新计算内存占用并按需淘汰"""
+        old = self._sessions.get(session_id)
+        if old is not None:
+            self._total_bytes -= old["size"]
+        session["size"] = estimate_state_size(session["state"])
+        session["last_access"] = time.monotonic()
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._total_bytes += session["size"]
+        self._evict_overflow()
+
+    def delete(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_bytes -= session["size"]
+
+    # 异步接口与 SQLiteSessionStore 一致；内存操作不阻塞，直接调用同步实现
+    async def aget(self, session_id: str) -> Dict[str, Any]:
+        session = self.get(session_id)
+        await self._notify_evicted()
+        return session
+
+    async def asave(self, session_id: str, session: Dict[str, Any]) -> None:
+        self.save(session_id, session)
+        await self._notify_evicted()
+
+    def _record_evicted(self, session_id: str) -> None:
+        if self.on_evict is not None:
+            self._evicted_ids.append(session_id)
+
+    async def _notify_evicted(self) -> None:
+        if not self._evicted_ids:
+            return
+        evicted, self._evicted_ids = self._evicted_ids, []
+        await asyncio.to_thread(_call_on_evict, self.on_evict, evicted)
+
+    async def astats(self) -> Dict[str, Any]:
+        return self.stats()
+
+    def _evict_expired(self) -> None:
+        if self.idle_ttl <= 0:
+            return
+        deadline = time.monotonic() - self.idle_ttl
+        # OrderedDict 按访问顺序排列，最久未访问的在最前面
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session["last_access"] >= deadline:
+                break
+            self.delete(session_id)
+            self._record_evicted(session_id)
+            self.expired += 1
+
+    def _evict_overflow(self) -> None:
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            session_id = next(iter(self._sessions))
+            self.delete(session_id)
+            self._record_evicted(session_id)
+            self.evicted += 1
+            logger.info(f"SessionStore: evicted session '{session_id}'")
+
+    def stats(self) -> Dict[str, Any]:
+        count = len(self._sessions)
+        return {
+            "backend": "memory",
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "avg_bytes": self._total_bytes // count if count else 0,
+            "created": self.created,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+    def cached_stats(self) -> Dict[str, Any]:
+        return self.stats()
+
+
+class SQLiteSessionStore:
+    """跨进程共享的会话存储：图状态用 ormsgpack 序列化后写入 SQLite（WAL），
+    多个 worker 进程或同机的多个实例可以处理同一会话的后续请求。接口与 SessionStore 相同，
+    接口层使用在线程池中执行的异步方法（aget/asave/astats）。
+
+    淘汰不在每次读写时进行，而是每隔 evict_interval 秒最多一次；两次之间会话数可能短暂超过上限，
+    读取时按 idle_ttl 过滤已过期的会话。
+
+    同一会话的请求可能落到不同进程，lock 在进程内锁之外再持有数据库中的租约（lock_ttl 秒后自动失效，
+    持有者进程异常退出时不会永久占用）。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 1000,
+        idle_ttl: float = 3600.0,
+        evict_interval: float = 30.0,
+        lock_ttl: float = 300.0,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evict_interval = evict_interval
+        self.lock_ttl = lock_ttl
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        # 会话被淘汰/过期后调用；淘汰发生在同步接口中（异步接口已在线程池中执行），释放锁后直接调用
+        self.on_evict: Optional[Callable[[List[str]], None]] = None
+        self._next_evict = 0.0
+        self._lock = threading.RLock()
+        self._locks = _SessionLocks()
+        self._count = 0
+        self._total_bytes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(id TEXT PRIMARY KEY, state BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks (id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is not None
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """同一会话的请求依次执行：进程内先排队，再轮询获取跨进程租约"""
+        owner = uuid.uuid4().hex
+        async with self._locks.hold(session_id):
+            while not await asyncio.to_thread(self._try_lease, session_id, owner):
+                await asyncio.sleep(0.05)
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(self._release_lease, session_id, owner)
+
+    def _try_lease(self, session_id: str, owner: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM session_locks WHERE id = ? AND expires_at < ?", (session_id, now))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO session_locks (id, owner, expires_at) VALUES (?, ?, ?)",
+                (session_id, owner, now + self.lock_ttl),
+            )
+            return cursor.rowcount == 1
+
+    def _release_lease(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM session_locks WHERE id = ? AND owner = ?", (session_id, owner))
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        """读取并反序列化会话；不存在或已过期时返回新的空会话，调用 save 后才写入存储"""
+        now = time.time()
+        cutoff = now - self.idle_ttl if self.idle_ttl > 0 else 0.0
+        with self._lock:
+            evicted = self._maybe_evict()
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE id = ? AND last_access >= ?", (session_id, cutoff)
+            ).fetchone()
+            if row is None:
+                self.created += 1
+            else:
+                self._conn.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id))
+        _call_on_evict(self.on_evict, evicted)
+        if row is None:
+            return {"state": initialize_graph_state(), "last_access": now, "size": 0}
+        return {"state": loads_state(row[0]), "last_access": now, "size": len(row[0])}
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        data = dumps_state(session["state"])
+        session["size"] = len(data)
+        session["last_access"] = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, size, last_access) VALUES (?, ?, ?, ?)",
+                (session_id, data, session["size"], session["last_access"]),
+            )
+            evicted = self._maybe_evict()
+        _call_on_evict(self.on_evict, evicted)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    async def aget(self, session_id: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def asave(self, session_id: str, session: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.save, session_id, session)
+
+    async def astats(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.stats)
+
+    def _maybe_evict(self) -> List[str]:
+        """到达淘汰时间时删除过期与超出上限的会话，返回被删除的会话 id"""
+        now = time.monotonic()
+        if now < self._next_evict:
+            return []
+        self._next_evict = now + self.evict_interval
+        evicted = self._evict_expired() + self._evict_overflow()
+        self._refresh_totals()
+        return evicted
+
+    def _evict_expired(self) -> List[str]:
+        if self.idle_ttl <= 0:
+            return []
+        rows = self._conn.execute(
+            "DELETE FROM sessions WHERE last_access < ? RETURNING id", (time.time() - self.idle_ttl,)
+        ).fetchall()
+        self.expired += len(rows)
+        return [row[0] for row in rows]
+
+    def _evict_overflow(self) -> List[str]:
+        overflow = len(self) - self.max_sessions
+        if overflow <= 0:
+            return []
+        rows = self._conn.execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_access LIMIT ?) RETURNING id",
+            (overflow,),
+        ).fetchall()
+        self.evicted += len(rows)
+        logger.info(f"SQLiteSessionStore: evicted {len(rows)} sessions")
+        return [row[0] for row in rows]
+
+    def _refresh_totals(self) -> None:
+        with self._lock:
+            self._count, self._total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions"
+            ).fetchone()
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh_totals()
+        return self.cached_stats()
+
+    def cached_stats(self) -> Dict[str, Any]:
+        """不查询数据库：会话数与字节数取自最近一次淘汰或 stats()，供事件循环中的 /metrics 使用"""
+        count, total_bytes = self._count, self._total_bytes
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "total_bytes": total_bytes,
+            "max_bytes": 0,
+            "avg_bytes": total_bytes // count if count else 0,
+            "created": self.created,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+
+def _call_on_evict(on_evict: Optional[Callable[[List[str]], None]], session_ids: List[str]) -> None:
+    if not session_ids or on_evict is None:
+        return
+    try:
+        on_evict(session_ids)
+    except Exception as e:
+        # 清理失败只记录日志，不影响会话读写
+        logger.error(f"SessionStore: on_evict failed for {len(session_ids)} sessions: {e}")
+
+
+def create_session_store() -> Union[SessionStore, SQLiteSessionStore]:
+    """按 SESSION_BACKEND 选择会话存储：memory 只适用于单进程，多 worker 部署需要 sqlite"""
+    if settings.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(
+            settings.SESSION_DB_PATH,
+            max_sessions=settings.SESSION_MAX_SIZE,
+            idle_ttl=settings.SESSION_IDLE_TTL,
+            evict_interval=settings.SESSION_EVICT_INTERVAL,
+            lock_ttl=settings.SESSION_LOCK_TTL,
+        )
+    if settings.SESSION_BACKEND != "memory":
+        raise ValueError(f"不支持的会话存储: {settings.SESSION_BACKEND}（可选 memory 或 sqlite）")
+    return SessionStore(
+        max_sessions=settings.SESSION_MAX_SIZE,
+        idle_ttl=settings.SESSION_IDLE_TTL,
+        max_bytes=settings.SESSION_MAX_MEMORY_MB * 1024 * 1024,
+    )
+
+
+session_store = create_session_store()
+
+
+def _session_metrics() -> list:
+    stats = session_store.cached_stats()
+    return (
+        gauge_lines("trip_sessions", "Sessions held in the session store", stats["sessions"])
+        + gauge_lines("trip_session_bytes", "Estimated bytes held by session state", stats["total_bytes"])
+        + gauge_lines("trip_sessions_evicted_total", "Sessions evicted by LRU or memory limit", stats["evicted"], "counter")
+        + gauge_lines("trip_sessions_expired_total", "Sessions expired by idle TTL", stats["expired"], "counter")
+    )
+
+
+registry.register_collector(_session_metrics)
@@ -0,0 +1,31 @@
+# src/services/state_codec.py
+"""GraphState 的紧凑二进制序列化（ormsgpack），用于跨进程共享的会话存储"""
+from typing import Any
+
+import ormsgpack
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+from ..graph.state import GraphState
+
+STATE_CODEC_VERSION = 1
+
+
+def _default(value: Any) -> Any:
+    # 工具结果中偶尔出现无法直接编码的对象，退化为字符串
+    return str(value)
+
+
+def dumps_state(state: GraphState) -> bytes:
+    payload = dict(state)
+    payload["messages"] = [message_to_dict(m) for m in state.get("messages", [])]
+    return ormsgpack.packb(
+        {"version": STATE_CODEC_VERSION, "state": payload},
+        default=_default,
+        option=ormsgpack.OPT_NON_STR_KEYS,
+    )
+
+
+def loads_state(data: bytes) -> GraphState:
+    payload = ormsgpack.unpackb(data)["state"]
+    payload["messages"] = messages_from_dict(payload.get("messages", []))
+    return GraphState(**payload)
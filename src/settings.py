@@ -12,6 +12,9 @@ config = Config(env_path)
 class Settings(BaseSettings):
     HOST: str = config("HOST", default="127.0.0.1")
     PORT: int = config("PORT", cast=int, default=5000)
+    # 生产环境：WORKERS > 1 且关闭 RELOAD；开发环境保持单进程热重载
+    WORKERS: int = config("WORKERS", cast=int, default=1)
+    RELOAD: bool = config("RELOAD", cast=bool, default=True)
 
     ORIGINS_STR: str = config(
         "ORIGINS", default="http://localhost:5173,http://127.0.0.1:5173"
@@ -23,6 +26,136 @@ class Settings(BaseSettings):
         "QWEN_API_URL", default="https://dashscope.aliyuncs.com/compatible-mode/v1"
     )
     QWEN_MODEL_NAME: str = config("QWEN_MODEL_NAME", default="qwen3-235b-a22b")
+    # 分级模型：router 只需选择工具与参数，可配置为低延迟的小模型（如 qwen-turbo）；为空时使用 QWEN_MODEL_NAME。
+    # 小模型给出无效的工具调用时，用 ROUTER_ESCALATION_MODEL_NAME（默认同 QWEN_MODEL_NAME）重新决策
+    ROUTER_MODEL_NAME: str = config("ROUTER_MODEL_NAME", default="")
+    ROUTER_ESCALATION_MODEL_NAME: str = config("ROUTER_ESCALATION_MODEL_NAME", default="")
+    SUMMARIZER_MODEL_NAME: str = config("SUMMARIZER_MODEL_NAME", default="")
+    # 截止时间：每个计划/对话请求的总时间预算（0 表示不限）；单次 LLM 调用的超时不超过各自的上限与剩余预算，
+    # router 决策额外为最后的 summarizer 预留 DEADLINE_SUMMARIZER_RESERVE 秒
+    REQUEST_DEADLINE: float = config("REQUEST_DEADLINE", cast=float, default=150.0)
+    LLM_CALL_TIMEOUT: float = config("LLM_CALL_TIMEOUT", cast=float, default=20.0)
+    SUMMARIZER_CALL_TIMEOUT: float = config("SUMMARIZER_CALL_TIMEOUT", cast=float, default=90.0)
+    DEADLINE_SUMMARIZER_RESERVE: float = config("DEADLINE_SUMMARIZER_RESERVE", cast=float, default=45.0)
+    # router 对冲请求（默认关闭）：主模型超过其延迟分位数仍未返回时向备用提供商发起第二个请求，主调用失败时直接降级
+    LLM_HEDGE_ENABLED: bool = config("LLM_HEDGE_ENABLED", cast=bool, default=False)
+    LLM_HEDGE_PROVIDER: str = config("LLM_HEDGE_PROVIDER", default="google")
+    LLM_HEDGE_MODEL_NAME: str = config("LLM_HEDGE_MODEL_NAME", default="")
+    LLM_HEDGE_QUANTILE: float = config("LLM_HEDGE_QUANTILE", cast=float, default=0.95)
+    LLM_HEDGE_MIN_SAMPLES: int = config("LLM_HEDGE_MIN_SAMPLES", cast=int, default=20)
+    GOOGLE_API_KEY: str = config("GOOGLE_API_KEY", default="")
+    # 每千 token 单价（元），格式 "模型:输入单价:输出单价,..."，用于按模型统计成本
+    LLM_PRICES: str = config(
+        "LLM_PRICES", default="qwen3-235b-a22b:0.002:0.008,qwen-turbo:0.0003:0.0006,qwen-plus:0.0008:0.002"
+    )
+
+    # 日志：development 输出完整调试信息；production 使用后台队列写入、截断并采样大对象
+    LOG_PROFILE: str = config("LOG_PROFILE", default="development")
+    LOG_MAX_PAYLOAD_CHARS: int = config("LOG_MAX_PAYLOAD_CHARS", cast=int, default=2000)
+    LOG_PAYLOAD_SAMPLE_RATE: float = config("LOG_PAYLOAD_SAMPLE_RATE", cast=float, default=1.0)
+
+    # 录制/回放：off | record | replay
+    CASSETTE_MODE: str = config("CASSETTE_MODE", default="off")
+    CASSETTE_PATH: str = config(
+        "CASSETTE_PATH", default=os.path.join(root_dir, "cicd", "testdata", "expected", "cassette.msgpack")
+    )
+
+    # LLM 响应缓存（默认关闭；磁盘路径为空时只使用内存层）
+    LLM_CACHE_ENABLED: bool = config("LLM_CACHE_ENABLED", cast=bool, default=False)
+    LLM_CACHE_MAXSIZE: int = config("LLM_CACHE_MAXSIZE", cast=int, default=1024)
+    LLM_CACHE_TTL: float = config("LLM_CACHE_TTL", cast=float, default=3600.0)
+    LLM_CACHE_DISK_PATH: str = config("LLM_CACHE_DISK_PATH", default="")
+
+    # 计划级缓存：相同的 TravelRequest 复用同一次图执行结果
+    PLAN_CACHE_ENABLED: bool = config("PLAN_CACHE_ENABLED", cast=bool, default=True)
+    PLAN_CACHE_MAXSIZE: int = config("PLAN_CACHE_MAXSIZE", cast=int, default=512)
+    PLAN_CACHE_TTL: float = config("PLAN_CACHE_TTL", cast=float, default=600.0)
+
+    # 会话存储：memory（单进程）或 sqlite（多 worker 进程共享）
+    SESSION_BACKEND: str = config("SESSION_BACKEND", default="memory")
+    SESSION_DB_PATH: str = config("SESSION_DB_PATH", default=os.path.join(root_dir, "data", "sessions.sqlite"))
+    # sqlite 会话存储的淘汰周期（秒）：过期与超出上限的会话按周期批量删除，而不是每次保存时检查
+    SESSION_EVICT_INTERVAL: float = config("SESSION_EVICT_INTERVAL", cast=float, default=30.0)
+    # 同一会话的请求依次执行；sqlite 会话存储用数据库租约跨进程互斥，租约时长应大于 REQUEST_DEADLINE
+    SESSION_LOCK_TTL: float = config("SESSION_LOCK_TTL", cast=float, default=300.0)
+    # LangGraph checkpointer（SQLite），按会话记录最近一次图执行的每一步（最多 MAX_PER_THREAD 个检查点），默认关闭
+    CHECKPOINT_ENABLED: bool = config("CHECKPOINT_ENABLED", cast=bool, default=False)
+    CHECKPOINT_DB_PATH: str = config("CHECKPOINT_DB_PATH", default=os.path.join(root_dir, "data", "checkpoints.sqlite"))
+    CHECKPOINT_MAX_PER_THREAD: int = config("CHECKPOINT_MAX_PER_THREAD", cast=int, default=20)
+    SESSION_MAX_SIZE: int = config("SESSION_MAX_SIZE", cast=int, default=1000)
+    SESSION_IDLE_TTL: float = config("SESSION_IDLE_TTL", cast=float, default=3600.0)
+    SESSION_MAX_MEMORY_MB: int = config("SESSION_MAX_MEMORY_MB", cast=int, default=512)
+
+    # 对话历史窗口（发送给 LLM 的提示词预算）
+    HISTORY_TOKEN_BUDGET: int = config("HISTORY_TOKEN_BUDGET", cast=int, default=6000)
+    HISTORY_TOKEN_ENCODING: str = config("HISTORY_TOKEN_ENCODING", default="cl100k_base")
+    HISTORY_TOOL_MESSAGE_MAX_CHARS: int = config(
+        "HISTORY_TOOL_MESSAGE_MAX_CHARS", cast=int, default=400
+    )
+    HISTORY_SUMMARY_MAX_CHARS: int = config("HISTORY_SUMMARY_MAX_CHARS", cast=int, default=1500)
+
+    # 启动预热：编译图、构建 LLM 链，并提前建立到 LLM 与高德地图的连接
+    PREWARM_ENABLED: bool = config("PREWARM_ENABLED", cast=bool, default=True)
+    PREWARM_TIMEOUT: float = config("PREWARM_TIMEOUT", cast=float, default=5.0)
+
+    # 计划请求的预取阶段：在首次调用 router 前并发获取天气、兴趣点与开放时间
+    PREFETCH_ENABLED: bool = config("PREFETCH_ENABLED", cast=bool, default=True)
+    PREFETCH_MAX_INTERESTS: int = config("PREFETCH_MAX_INTERESTS", cast=int, default=5)
+    PREFETCH_POIS_PER_INTEREST: int = config("PREFETCH_POIS_PER_INTEREST", cast=int, default=3)
+
+    # 本地 POI 索引（SQLite），在应用启动时打开，路径为空时关闭；相对路径按项目根目录解析。
+    # 搜索结果与详情分别按各自的有效期判断是否足够新
+    POI_INDEX_PATH: str = config("POI_INDEX_PATH", default=os.path.join(root_dir, "data", "poi_index.sqlite"))
+    POI_INDEX_TTL: float = config("POI_INDEX_TTL", cast=float, default=7 * 86400.0)
+    POI_INDEX_DETAIL_TTL: float = config("POI_INDEX_DETAIL_TTL", cast=float, default=86400.0)
+
+    # 准入控制（每个 worker 进程）：同时执行的图不超过 MAX_CONCURRENT，其余按到达顺序排队，
+    # 队列已满立即返回 429，排队超过 MAX_WAIT 秒返回 503，均带 Retry-After
+    ADMISSION_ENABLED: bool = config("ADMISSION_ENABLED", cast=bool, default=True)
+    ADMISSION_MAX_CONCURRENT: int = config("ADMISSION_MAX_CONCURRENT", cast=int, default=16)
+    ADMISSION_MAX_QUEUE: int = config("ADMISSION_MAX_QUEUE", cast=int, default=64)
+    ADMISSION_MAX_WAIT: float = config("ADMISSION_MAX_WAIT", cast=float, default=10.0)
+
+    # 批量计划任务：后台 worker 数、单个任务的最大条数、同时未完成的任务数、完成后保留时间（秒）
+    BATCH_WORKERS: int = config("BATCH_WORKERS", cast=int, default=4)
+    BATCH_MAX_ITEMS: int = config("BATCH_MAX_ITEMS", cast=int, default=500)
+    BATCH_MAX_JOBS: int = config("BATCH_MAX_JOBS", cast=int, default=20)
+    BATCH_JOB_TTL: float = config("BATCH_JOB_TTL", cast=float, default=3600.0)
+
+    # 上游限流（令牌桶，0 表示不限）：LLM 每分钟 token 数、高德每秒请求数，按账号配额填写
+    LLM_TOKENS_PER_MINUTE: int = config("LLM_TOKENS_PER_MINUTE", cast=int, default=0)
+    AMAP_QPS: float = config("AMAP_QPS", cast=float, default=0.0)
+
+    # 高德地图 HTTP 连接池
+    AMAP_BASE_URL: str = config("AMAP_BASE_URL", default="https://restapi.amap.com")
+    AMAP_MAX_CONNECTIONS: int = config("AMAP_MAX_CONNECTIONS", cast=int, default=100)
+    AMAP_MAX_KEEPALIVE_CONNECTIONS: int = config(
+        "AMAP_MAX_KEEPALIVE_CONNECTIONS", cast=int, default=20
+    )
+    AMAP_KEEPALIVE_EXPIRY: float = config("AMAP_KEEPALIVE_EXPIRY", cast=float, default=30.0)
+    AMAP_CONNECT_TIMEOUT: float = config("AMAP_CONNECT_TIMEOUT", cast=float, default=3.0)
+    AMAP_PLACE_TIMEOUT: float = config("AMAP_PLACE_TIMEOUT", cast=float, default=10.0)
+    AMAP_ROUTE_TIMEOUT: float = config("AMAP_ROUTE_TIMEOUT", cast=float, default=15.0)
+    AMAP_WEATHER_TIMEOUT: float = config("AMAP_WEATHER_TIMEOUT", cast=float, default=10.0)
+
+    # 高德地图响应缓存（秒）
+    AMAP_CACHE_MAXSIZE: int = config("AMAP_CACHE_MAXSIZE", cast=int, default=4096)
+    AMAP_CACHE_TTL_WEATHER: float = config("AMAP_CACHE_TTL_WEATHER", cast=float, default=600.0)
+    AMAP_CACHE_TTL_POI_SEARCH: float = config(
+        "AMAP_CACHE_TTL_POI_SEARCH", cast=float, default=86400.0
+    )
+    AMAP_CACHE_TTL_POI_DETAIL: float = config(
+        "AMAP_CACHE_TTL_POI_DETAIL", cast=float, default=3600.0
+    )
+    AMAP_CACHE_TTL_ROUTE: float = config("AMAP_CACHE_TTL_ROUTE", cast=float, default=1800.0)
+    # 过期后仍保留的时间：高德熔断或请求失败时返回过期结果（带 stale 标记）
+    AMAP_CACHE_STALE_TTL: float = config("AMAP_CACHE_STALE_TTL", cast=float, default=86400.0)
+
+    # 高德熔断器（按接口）：连续失败/超时次数达到阈值后打开，经过 RESET 秒后放行探测请求
+    AMAP_BREAKER_ENABLED: bool = config("AMAP_BREAKER_ENABLED", cast=bool, default=True)
+    AMAP_BREAKER_FAILURES: int = config("AMAP_BREAKER_FAILURES", cast=int, default=5)
+    AMAP_BREAKER_RESET: float = config("AMAP_BREAKER_RESET", cast=float, default=30.0)
+    AMAP_BREAKER_PROBES: int = config("AMAP_BREAKER_PROBES", cast=int, default=1)
 
 
 settings = Settings()
@@ -1,11 +1,21 @@
+import asyncio
 from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.routing import APIRoute
 from starlette.routing import Route
 
+from .core.cassette import cassette
+from .core.http_client import close_amap_client, init_amap_client
+from .core.metrics import render_metrics
+from .logger import logger
+from .middlewares.admission import AdmissionMiddleware
+from .middlewares.request_id import request_id_middleware
+from .services.batch_jobs import batch_job_manager
+from .services.poi_index import close_poi_index, open_poi_index
 from .settings import settings
 
 origins = settings.ORIGINS or [
@@ -14,11 +24,19 @@ origins = settings.ORIGINS or [
 ]
 
 
+async def metrics_endpoint() -> PlainTextResponse:
+    """Prometheus 文本格式的指标"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 def _create_application(
     router: APIRouter,
     **kwargs: Any,
 ) -> FastAPI:
     application: FastAPI = FastAPI(**kwargs)
+    # 后注册的中间件位于外层：准入控制在 CORS 之内，429/503 拒绝响应同样带有 CORS 头，浏览器能看到真实状态码
+    if settings.ADMISSION_ENABLED:
+        application.add_middleware(AdmissionMiddleware)
     application.add_middleware(
         CORSMiddleware,
         allow_origins=origins,  # Or ["*"] to allow all origins
@@ -26,12 +44,55 @@ def _create_application(
         allow_methods=["*"],  # Allows all HTTP methods
         allow_headers=["*"],  # Allows all headers
     )
+    # 请求 ID 位于最外层，被准入控制拒绝的响应同样带有请求 ID
+    application.middleware("http")(request_id_middleware)
 
     application.include_router(router)
+    application.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
     return application
 
 
+async def _warm_connection(coro) -> None:
+    try:
+        await asyncio.wait_for(coro, timeout=settings.PREWARM_TIMEOUT)
+    except Exception as e:
+        # 任何响应（包括 4xx）都已完成 DNS/TCP/TLS 建连，失败不影响启动
+        logger.info(f"prewarm: connection warm-up skipped: {e}")
+
+
+async def prewarm() -> None:
+    """编译共享的图与 LLM 链，并预先建立到 LLM 与高德地图的连接，使首个请求不再承担这些开销"""
+    from .graph.graph import get_graph
+    from .graph.nodes.router import get_router_chain
+    from .graph.nodes.summarizer import get_summarizer_chain
+    from .llm_provider import get_chat_model, node_model_name
+
+    get_graph()
+    # 每一级模型（router、升级、summarizer）的链都提前构建
+    models = {node_model_name(node) for node in ("router", "router_escalation", "summarizer")}
+    try:
+        for model_name in models:
+            get_router_chain(model_name)
+            get_summarizer_chain(model_name)
+    except ValueError as e:
+        logger.error(f"prewarm: LLM client unavailable: {e}")
+        return
+    if cassette.enabled:
+        return
+
+    amap_client = await init_amap_client()
+    warmups = [_warm_connection(amap_client.get("/"))]
+    llm_clients = {}
+    for model_name in models:
+        llm_client = getattr(get_chat_model(model_name), "root_async_client", None)
+        if llm_client is not None:
+            llm_clients[id(llm_client)] = llm_client
+    for llm_client in llm_clients.values():
+        warmups.append(_warm_connection(llm_client.models.list()))
+    await asyncio.gather(*warmups)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("App Routes:")
@@ -42,7 +103,18 @@ async def lifespan(app: FastAPI):
         if isinstance(route, (APIRoute, Route)):
             methods = ",".join(route.methods)
             print(f"{methods:10} {route.path} -> {route.name}")
-    yield
+    await init_amap_client()
+    await asyncio.to_thread(open_poi_index)
+    if settings.PREWARM_ENABLED:
+        await prewarm()
+    try:
+        yield
+    finally:
+        await batch_job_manager.close()
+        await close_amap_client()
+        close_poi_index()
+        cassette.save()
+        await logger.complete()  # 等待后台队列中的日志写完
 
 
 def create_application(router: APIRouter) -> FastAPI:
@@ -0,0 +1,164 @@
+# src/utils/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LoadCancelled(Exception):
+    """持有加载的调用方被取消（如客户端断开）；等待者收到后由其中一个重新发起加载"""
+
+
+def make_key(namespace: str, params: Dict[str, Any], exclude: Tuple[str, ...] = ()) -> Tuple:
+    """根据归一化后的参数构造缓存键：去除首尾空白、忽略空值、按参数名排序"""
+    items = []
+    for k, v in params.items():
+        if k in exclude or v is None:
+            continue
+        v = str(v).strip()
+        if v:
+            items.append((k, v))
+    return (namespace, tuple(sorted(items)))
+
+
+class TTLCache:
+    """带 TTL 与 LRU 淘汰的内存缓存，支持并发相同请求的 single-flight 合并。
+
+    stale_ttl > 0 时过期条目不会立即删除，在过期后 stale_ttl 秒内仍可通过 get_stale 取到（上游故障时兜底）。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at < now:
+            if expires_at + self.stale_ttl < now:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Tuple[Any, float]:
+        """返回 (值, 已过期秒数)，未过期时过期秒数为 0；不存在或超出 stale_ttl 时返回 (default, 0)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default, 0.0
+        expires_at, value = entry
+        age = time.monotonic() - expires_at
+        if age > self.stale_ttl:
+            del self._data[key]
+            return default, 0.0
+        self.stale_hits += 1
+        return value, max(age, 0.0)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """命中缓存直接返回；否则同一个 key 只发起一次 loader，其余并发调用等待其结果"""
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            inflight = self.join_inflight(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except LoadCancelled:
+                # 取消只属于原加载者：重新检查缓存，第一个醒来的等待者接手加载，其余等待它
+                continue
+
+        self.begin_load(key)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            self.fail_load(key, LoadCancelled(f"load of {key!r} was cancelled"))
+            raise
+        except BaseException as e:
+            self.fail_load(key, e)
+            raise
+        self.finish_load(key, value, ttl=ttl, should_cache=should_cache)
+        return value
+
+    def join_inflight(self, key: Hashable) -> Optional[asyncio.Future]:
+        """返回该 key 进行中的加载（调用方 await asyncio.shield(future) 等待结果）；没有时返回 None"""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        return inflight
+
+    def begin_load(self, key: Hashable) -> asyncio.Future:
+        """登记一次由调用方自行完成的加载（如流式执行），必须以 finish_load 或 fail_load 结束"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def finish_load(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        future = self._inflight.pop(key, None)
+        if should_cache is None or should_cache(value):
+            self.set(key, value, ttl)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def fail_load(self, key: Hashable, error: BaseException) -> None:
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+            future.exception()  # 标记异常已被读取，避免无人等待时的告警
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,27 @@
+import pytest
+
+
+class FakeClock:
+    """替代模块中的 time：monotonic()/time() 返回手动推进的时间"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """fake_clock(*modules) 把这些模块中的 time 替换为同一个 FakeClock 并返回它"""
+    clock = FakeClock()
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "time", clock)
+        return clock
+
+    return install
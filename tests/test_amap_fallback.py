@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.core.circuit_breaker import BreakerGroup
+from src.graph import tools
+from src.utils import cache as cache_module
+from src.utils.cache import TTLCache
+
+PATH = "/v3/weather/weatherInfo"
+
+
+@pytest.fixture
+def amap(monkeypatch, fake_clock):
+    clock = fake_clock(cache_module)
+    monkeypatch.setattr(tools, "amap_cache", TTLCache(maxsize=16, ttl=10, stale_ttl=3600))
+    monkeypatch.setattr(tools, "amap_breakers", BreakerGroup("amap:", failure_threshold=2, reset_timeout=30))
+    upstream = {"calls": 0, "down": False}
+
+    async def fake_get(path, params, timeout):
+        upstream["calls"] += 1
+        if upstream["down"]:
+            raise httpx.ConnectError("connection refused")
+        return {"status": "1", "lives": [{"city": params["city"], "weather": "晴"}]}
+
+    monkeypatch.setattr(tools, "_amap_get", fake_get)
+    return clock, upstream
+
+
+def _get(city="杭州"):
+    return asyncio.run(tools._cached_amap_get(PATH, {"city": city}, timeout=1.0, ttl=10, tool="get_weather"))
+
+
+def test_upstream_failure_serves_stale_result(amap):
+    clock, upstream = amap
+    assert _get()["lives"][0]["weather"] == "晴"
+    clock.now += 60
+    upstream["down"] = True
+    result = _get()
+    assert result["stale"] is True and result["stale_age_s"] == 50
+    assert result["lives"][0]["weather"] == "晴"
+
+
+def test_open_circuit_fails_fast_without_calling_upstream(amap):
+    clock, upstream = amap
+    upstream["down"] = True
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            _get("苏州")
+    calls = upstream["calls"]
+    result = _get("苏州")
+    assert "熔断中" in result["error"]
+    assert upstream["calls"] == calls
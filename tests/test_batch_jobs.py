@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from src.schemas import TravelRequest
+from src.services.batch_jobs import BatchJobManager, BatchJobRejected, BatchJobsUnavailable
+
+
+def _request(destination, interests=()):
+    return TravelRequest(
+        departure="上海", destination=destination, start_date="2025-05-01", end_date="2025-05-02",
+        interests=list(interests),
+    )
+
+
+def test_identical_requests_run_once_and_fan_out():
+    calls = []
+
+    async def runner(item_id, request):
+        calls.append(request.destination)
+        await asyncio.sleep(0.01)
+        return {"plan": f"{request.destination}两日游"}
+
+    async def run():
+        manager = BatchJobManager(workers=2, max_jobs=4, job_ttl=60)
+        requests = [_request("杭州", ["美食", "历史"]), _request("苏州"), _request("杭州", ["历史", "美食"])]
+        job = manager.submit(requests, runner)
+        assert job.progress()["unique"] == 2
+        results = [result async for result in job.stream_results()]
+        await manager.close()
+        return job, results
+
+    job, results = asyncio.run(run())
+    assert sorted(calls) == ["杭州", "苏州"]
+    by_index = {result["index"]: result for result in results}
+    assert sorted(by_index) == [0, 1, 2]
+    assert by_index[2]["plan"] == by_index[0]["plan"] == "杭州两日游"
+    assert [by_index[i]["deduplicated"] for i in range(3)] == [False, False, True]
+    progress = job.progress()
+    assert progress["status"] == "done"
+    assert progress["completed"] == 3 and progress["failed"] == 0
+    assert progress["finished_at"] is not None
+
+
+def test_progress_and_failures_are_reported_per_item():
+    release = None
+
+    async def runner(item_id, request):
+        await release.wait()
+        if request.destination == "苏州":
+            raise ValueError("未生成任何内容")
+        return {"plan": "ok"}
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        manager = BatchJobManager(workers=1, max_jobs=4, job_ttl=60)
+        job = manager.submit([_request("杭州"), _request("苏州"), _request("苏州")], runner)
+        await asyncio.sleep(0)
+        running = job.progress()
+        release.set()
+        results = [result async for result in job.stream_results()]
+        # 从断点续读只返回剩余结果
+        tail = [result async for result in job.stream_results(offset=2)]
+        await manager.close()
+        return running, job.progress(), results, tail
+
+    running, done, results, tail = asyncio.run(run())
+    assert running["status"] == "running" and running["completed"] == 0
+    assert done["completed"] == 3 and done["failed"] == 2
+    assert sorted(r["status"] for r in results) == ["error", "error", "ok"]
+    assert tail == results[2:]
+
+
+def test_submit_rejects_when_too_many_jobs_are_active():
+    async def runner(item_id, request):
+        await asyncio.sleep(1)
+        return {}
+
+    async def run():
+        manager = BatchJobManager(workers=1, max_jobs=1, job_ttl=60)
+        manager.submit([_request("杭州")], runner)
+        try:
+            with pytest.raises(BatchJobRejected):
+                manager.submit([_request("苏州")], runner)
+        finally:
+            await manager.close()
+
+    asyncio.run(run())
+
+
+def test_submit_refused_when_jobs_cannot_be_shared_across_workers():
+    manager = BatchJobManager(workers=1, max_jobs=1, job_ttl=60, enabled=False)
+    with pytest.raises(BatchJobsUnavailable):
+        manager.submit([_request("杭州")], None)
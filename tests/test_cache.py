@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from src.utils import cache as cache_module
+from src.utils.cache import LoadCancelled, TTLCache, make_key
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(cache_module)
+
+
+def test_make_key_normalizes_params():
+    assert make_key("poi", {"city": " 杭州 ", "keywords": "西湖", "page": None}) == make_key(
+        "poi", {"keywords": "西湖", "city": "杭州", "extra": ""}
+    )
+    assert make_key("poi", {"city": "杭州", "key": "secret"}, exclude=("key",)) == make_key("poi", {"city": "杭州"})
+
+
+def test_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("k", "v")
+    clock.now += 9
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_keeps_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_get_or_load_coalesces_concurrent_calls():
+    cache = TTLCache(maxsize=4, ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"pois": []}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"pois": []} for result in results)
+    assert cache.coalesced == 4
+    assert cache.get("k") == {"pois": []}
+
+
+def test_get_or_load_failure_reaches_waiters_and_is_not_cached():
+    cache = TTLCache(maxsize=4, ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(cache) == 0
+
+
+def test_cancelled_owner_hands_the_load_to_a_waiter():
+    cache = TTLCache(maxsize=4, ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"pois": []}
+
+    async def run():
+        owner = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_load("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return results
+
+    results = asyncio.run(run())
+    # 原加载者的取消不会传给等待者：其中一个重新加载，其余继续合并等待
+    assert results == [{"pois": []}] * 3
+    assert len(calls) == 2
+    assert cache.get("k") == {"pois": []}
+
+
+def test_waiters_retry_when_an_external_load_is_interrupted():
+    cache = TTLCache(maxsize=4, ttl=10)
+
+    async def loader():
+        return "reloaded"
+
+    async def run():
+        # 流式执行通过 begin_load 登记，客户端断开时以 LoadCancelled 结束
+        cache.begin_load("k")
+        waiter = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        cache.fail_load("k", LoadCancelled("interrupted"))
+        return await waiter
+
+    assert asyncio.run(run()) == "reloaded"
+
+
+def test_should_cache_skips_rejected_values():
+    cache = TTLCache(maxsize=4, ttl=10)
+
+    async def loader():
+        return {"error": "quota"}
+
+    value = asyncio.run(cache.get_or_load("k", loader, should_cache=lambda v: "error" not in v))
+    assert value == {"error": "quota"}
+    assert len(cache) == 0
+
+
+def test_expired_entry_is_served_stale_within_stale_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=100)
+    cache.set("k", "v")
+    clock.now += 40
+    assert cache.get("k") is None
+    assert cache.get_stale("k") == ("v", 30)
+    assert cache.stats()["stale_hits"] == 1
+    clock.now += 71
+    assert cache.get_stale("k") == (None, 0.0)
+    assert len(cache) == 0
+
+
+def test_fresh_entry_has_zero_stale_age(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=100)
+    cache.set("k", "v")
+    assert cache.get_stale("k") == ("v", 0.0)
@@ -0,0 +1,161 @@
+import asyncio
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from src.graph.state import GraphState
+from src.services.checkpointer import SQLiteCheckpointSaver
+from src.services.session_store import SQLiteSessionStore
+
+
+def _graph(saver):
+    """三个节点各追加一条消息：一次执行产生 5 个检查点（输入、START 与每个节点各一个）"""
+    def node(name):
+        def run(state: GraphState):
+            return {"messages": [AIMessage(content=name)], "next_node": name}
+        return run
+
+    builder = StateGraph(GraphState)
+    for name in ("prefetch", "router", "summarizer"):
+        builder.add_node(name, node(name))
+    builder.add_edge(START, "prefetch")
+    builder.add_edge("prefetch", "router")
+    builder.add_edge("router", "summarizer")
+    builder.add_edge("summarizer", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _run(graph, thread_id, text="去杭州"):
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, _config(thread_id))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite")
+
+
+def _count(path, table, thread_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def test_put_and_get_latest_state(db_path):
+    graph = _graph(SQLiteCheckpointSaver(db_path, max_per_thread=0))
+    final = _run(graph, "s1")
+    state = graph.get_state(_config("s1"))
+    assert [m.content for m in state.values["messages"]] == [m.content for m in final["messages"]]
+    assert state.values["next_node"] == "summarizer"
+    assert state.next == ()
+
+
+def test_state_survives_a_new_saver_instance(db_path):
+    _run(_graph(SQLiteCheckpointSaver(db_path, max_per_thread=0)), "s1")
+    reopened = _graph(SQLiteCheckpointSaver(db_path, max_per_thread=0))
+    assert [m.content for m in reopened.get_state(_config("s1")).values["messages"]] == [
+        "去杭州", "prefetch", "router", "summarizer",
+    ]
+
+
+def test_list_is_newest_first_and_supports_before_and_limit(db_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=0)
+    _run(_graph(saver), "s1")
+    history = list(saver.list(_config("s1")))
+    ids = [item.config["configurable"]["checkpoint_id"] for item in history]
+    assert len(ids) == 5 and ids == sorted(ids, reverse=True)
+    assert [len(item.checkpoint["channel_values"].get("messages", [])) for item in history] == [4, 3, 2, 1, 0]
+    assert history[1].parent_config["configurable"]["checkpoint_id"] == ids[2]
+
+    older = list(saver.list(_config("s1"), before=history[1].config, limit=2))
+    assert [item.config["configurable"]["checkpoint_id"] for item in older] == ids[2:4]
+    assert list(saver.list(_config("other"))) == []
+
+
+def test_get_tuple_by_checkpoint_id(db_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=0)
+    _run(_graph(saver), "s1")
+    second = list(saver.list(_config("s1")))[3]
+    loaded = saver.get_tuple(second.config)
+    assert loaded.checkpoint["id"] == second.checkpoint["id"]
+    assert [m.content for m in loaded.checkpoint["channel_values"]["messages"]] == ["去杭州"]
+
+
+def _sizes(path, thread_id):
+    return [_count(path, table, thread_id) for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes")]
+
+
+def test_prune_keeps_only_recent_checkpoints_and_their_blobs(db_path, tmp_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=2)
+    graph = _graph(saver)
+    _run(graph, "s1")
+    history = list(saver.list(_config("s1")))
+    assert len(history) == 2
+    # 保留下来的检查点引用的通道值都还在，可以完整恢复
+    for item in history:
+        assert saver.get_tuple(item.config).checkpoint["channel_values"]["messages"]
+
+    unpruned_path = str(tmp_path / "unpruned.sqlite")
+    _run(_graph(SQLiteCheckpointSaver(unpruned_path, max_per_thread=0)), "s1")
+    pruned, unpruned = _sizes(db_path, "s1"), _sizes(unpruned_path, "s1")
+    assert all(p < u for p, u in zip(pruned, unpruned))
+
+    # 同一线程反复执行，存储规模不随执行次数增长
+    for _ in range(5):
+        _run(graph, "s1", "再来一次")
+    assert _sizes(db_path, "s1") == pruned
+
+
+def test_prune_is_per_thread(db_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=3)
+    graph = _graph(saver)
+    _run(graph, "s1")
+    _run(graph, "s2")
+    assert _count(db_path, "checkpoints", "s1") == 3
+    assert _count(db_path, "checkpoints", "s2") == 3
+
+
+def test_delete_threads_leaves_other_threads(db_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=0)
+    graph = _graph(saver)
+    for thread_id in ("s1", "s2", "s3"):
+        _run(graph, thread_id)
+    saver.delete_threads(["s1", "s2"])
+    for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+        assert _count(db_path, table, "s1") == 0 and _count(db_path, table, "s2") == 0
+    assert _count(db_path, "checkpoints", "s3") == 5
+    saver.delete_thread("s3")
+    assert graph.get_state(_config("s3")).values == {}
+
+
+def test_async_interface(db_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=0)
+    graph = _graph(saver)
+
+    async def run():
+        await graph.ainvoke({"messages": [HumanMessage(content="去杭州")]}, _config("s1"))
+        history = [item async for item in saver.alist(_config("s1"), limit=2)]
+        latest = await saver.aget_tuple(_config("s1"))
+        await saver.adelete_thread("s1")
+        return history, latest, await saver.aget_tuple(_config("s1"))
+
+    history, latest, deleted = asyncio.run(run())
+    assert len(history) == 2
+    assert latest.checkpoint["id"] == history[0].checkpoint["id"]
+    assert deleted is None
+
+
+def test_evicted_sessions_lose_their_threads(db_path, tmp_path):
+    saver = SQLiteCheckpointSaver(db_path, max_per_thread=0)
+    graph = _graph(saver)
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite"), max_sessions=1, idle_ttl=0, evict_interval=0)
+    store.on_evict = saver.delete_threads
+    for thread_id in ("s1", "s2"):
+        _run(graph, thread_id)
+        store.save(thread_id, store.get(thread_id))
+    assert _count(db_path, "checkpoints", "s1") == 0
+    assert _count(db_path, "checkpoints", "s2") == 5
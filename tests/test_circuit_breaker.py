@@ -0,0 +1,81 @@
+import pytest
+
+from src.core import circuit_breaker as breaker_module
+from src.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerGroup, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(breaker_module)
+
+
+def _tripped(clock, probes=1):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30, half_open_probes=probes)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker = _tripped(clock)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_after == 30
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = _tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # 探测名额用完后其余调用仍被拒绝
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.failures == 0
+
+
+def test_half_open_probe_failure_reopens_and_restarts_timer(clock):
+    breaker = _tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_release_returns_probe_slot(clock):
+    breaker = _tripped(clock, probes=1)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_disabled_breaker_never_opens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=0, reset_timeout=30)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_group_keeps_endpoints_independent(clock):
+    group = BreakerGroup("amap:", failure_threshold=1, reset_timeout=30)
+    group.get("/v3/weather/weatherInfo").record_failure()
+    assert group.get("/v3/weather/weatherInfo").state == OPEN
+    assert group.get("/v3/place/text").state == CLOSED
+    assert group.get("/v3/place/text").name == "amap:/v3/place/text"
+    assert len(list(group)) == 2
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.core.deadline import DeadlineExceeded, call_timeout, deadline_scope
+from src.core.hedging import hedged_call
+
+
+class Call:
+    """记录调用是否开始、完成或被取消的可控调用"""
+
+    def __init__(self, result="", delay=0.0, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.started = False
+        self.cancelled = False
+
+    async def __call__(self):
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_fast_primary_wins_without_hedging():
+    primary, hedge = Call("primary", delay=0.01), Call("hedge")
+    assert asyncio.run(hedged_call("test", primary, 1.0, hedge=hedge, delay=0.2)) == "primary"
+    assert not hedge.started
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary, hedge = Call("primary", delay=1.0), Call("hedge", delay=0.01)
+    assert asyncio.run(hedged_call("test", primary, 2.0, hedge=hedge, delay=0.05)) == "hedge"
+    assert primary.cancelled
+
+
+def test_primary_still_wins_if_it_returns_before_the_hedge():
+    primary, hedge = Call("primary", delay=0.1), Call("hedge", delay=1.0)
+    assert asyncio.run(hedged_call("test", primary, 2.0, hedge=hedge, delay=0.05)) == "primary"
+    assert hedge.started and hedge.cancelled
+
+
+def test_failed_primary_falls_back_immediately():
+    primary, hedge = Call(error=RuntimeError("503")), Call("hedge")
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # 没有延迟样本（delay=None）时只在主调用失败后降级
+        result = await hedged_call("test", primary, 2.0, hedge=hedge, delay=None)
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "hedge" and elapsed < 0.5
+
+
+def test_error_is_raised_when_every_call_fails():
+    primary, hedge = Call(error=RuntimeError("primary")), Call(error=ValueError("hedge"))
+    with pytest.raises(ValueError):
+        asyncio.run(hedged_call("test", primary, 1.0, hedge=hedge))
+
+
+def test_timeout_cancels_pending_calls():
+    primary, hedge = Call(delay=1.0), Call(delay=1.0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hedged_call("test", primary, 0.1, hedge=hedge, delay=0.02))
+    assert primary.cancelled and hedge.cancelled
+
+
+def test_call_timeout_is_bounded_by_remaining_deadline():
+    assert call_timeout(20) == 20
+    with deadline_scope(5):
+        assert 4 < call_timeout(20) <= 5
+        assert call_timeout(20, reserve=3) <= 2
+        with pytest.raises(DeadlineExceeded):
+            call_timeout(20, reserve=10)
@@ -0,0 +1,60 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.graph.history import build_context_window, count_tokens, message_tokens
+
+BUDGET = 6000
+
+
+def _turn(i):
+    return [
+        HumanMessage(content=f"第{i}轮：杭州第{i}天还有哪些值得去的景点？"),
+        AIMessage(content="", tool_calls=[{"name": "search_poi", "args": {"keywords": f"景点{i}"}, "id": f"call_{i}"}]),
+        ToolMessage(content=f"景点{i}详情；" * 400, tool_call_id=f"call_{i}"),
+        AIMessage(content=f"第{i}轮建议：上午游览景点{i}，下午在附近用餐。" * 3),
+    ]
+
+
+def _window_tokens(window):
+    return sum(message_tokens(m) for m in window)
+
+
+def test_window_stays_within_budget_as_session_grows():
+    messages = []
+    sizes = []
+    for i in range(30):
+        messages.extend(_turn(i))
+        window = build_context_window({"messages": messages}, budget=BUDGET)
+        sizes.append(_window_tokens(window))
+        assert sizes[-1] <= BUDGET
+    # 会话持续增长，而窗口规模在折叠后趋于稳定
+    assert _window_tokens(messages) > 5 * BUDGET
+    assert max(sizes[10:]) - min(sizes[10:]) < BUDGET // 2
+
+
+def test_newest_turns_are_kept_verbatim():
+    messages = [m for i in range(30) for m in _turn(i)]
+    window = build_context_window({"messages": messages}, budget=BUDGET)
+    # 当前轮次原样保留（包括完整的工具结果）
+    assert window[-4:] == messages[-4:]
+    assert window[-2].content == messages[-2].content
+    # 上一轮的问答原样保留，只截断其工具结果
+    previous = messages[-8:-4]
+    assert window[-8].content == previous[0].content and window[-5].content == previous[3].content
+    assert window[-6].tool_call_id == "call_28" and len(window[-6].content) < len(previous[2].content)
+    # 更早的轮次折叠为摘要，合并进窗口中第一条用户消息
+    assert window[0].content.startswith("[早前对话摘要]")
+    assert "第29轮" not in window[0].content.split("\n\n")[0]
+
+
+def test_current_plan_is_attached_to_latest_question_only():
+    messages = [m for i in range(2) for m in _turn(i)]
+    window = build_context_window({"messages": messages, "current_plan": "第一天：西湖"}, budget=BUDGET * 4)
+    plan_messages = [m for m in window if "当前旅游计划：第一天：西湖" in str(m.content)]
+    assert plan_messages == [window[-4]]
+    assert messages[-4].content == "第1轮：杭州第1天还有哪些值得去的景点？"
+
+
+def test_count_tokens_is_cached_by_content():
+    text = "西湖十景" * 100
+    assert count_tokens(text) == count_tokens("西湖" + "十景" + "西湖十景" * 99) > 0
+    assert count_tokens("") == 0
@@ -0,0 +1,103 @@
+import numpy as np
+
+from src.services.itinerary import (
+    LATENESS_PENALTY_KM,
+    DaySchedule,
+    cluster_days,
+    haversine_matrix,
+    optimize,
+    parse_open_time,
+)
+
+# 西湖周边与萧山各三个景点，两组相距十余公里
+WEST_LAKE = [(120.150, 30.250), (120.155, 30.255), (120.160, 30.245)]
+XIAOSHAN = [(120.270, 30.180), (120.275, 30.185), (120.265, 30.175)]
+
+
+def _schedule(coords, windows=None, start_minute=9 * 60, visit_minutes=60):
+    coords = np.array(coords, dtype=float)
+    windows = windows or [None] * len(coords)
+    return DaySchedule(haversine_matrix(coords), windows, start_minute, visit_minutes, speed_kmh=4.5)
+
+
+def test_cluster_days_groups_nearby_pois():
+    clusters = cluster_days(np.array(WEST_LAKE + XIAOSHAN), 2)
+    assert sorted(sorted(c) for c in clusters) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_cluster_days_respects_per_day_capacity():
+    # 五个景点挤在西湖、一个在萧山：每天最多 ceil(6 / 2) = 3 个
+    coords = np.array(WEST_LAKE + [(120.152, 30.252), (120.158, 30.248)] + XIAOSHAN[:1])
+    clusters = cluster_days(coords, 2)
+    assert sorted(len(c) for c in clusters) == [3, 3]
+    assert sorted(i for c in clusters for i in c) == list(range(6))
+    clusters = cluster_days(np.array(WEST_LAKE + XIAOSHAN), 3)
+    assert [len(c) for c in clusters] == [2, 2, 2]
+
+
+def test_cluster_days_with_more_days_than_pois():
+    clusters = cluster_days(np.array(WEST_LAKE[:2]), 5)
+    assert sorted(clusters) == [[0], [1]]
+
+
+def test_two_opt_untangles_a_crossing_route():
+    # 一条直线上的四个点，按交叉的顺序出发
+    coords = [(120.10 + 0.01 * i, 30.25) for i in range(4)]
+    schedule = _schedule(coords)
+    crossing = [0, 2, 1, 3]
+    order = schedule.two_opt(crossing)
+    assert order in ([0, 1, 2, 3], [3, 2, 1, 0])
+    assert schedule.cost(order) < schedule.cost(crossing)
+
+
+def test_nearest_neighbour_starts_with_earliest_closing_poi():
+    windows = [None, (9 * 60, 11 * 60), None]
+    schedule = _schedule(WEST_LAKE, windows)
+    order = schedule.nearest_neighbour([0, 1, 2])
+    assert order[0] == 1 and sorted(order) == [0, 1, 2]
+
+
+def test_lateness_is_penalized_over_distance():
+    # 景点 2 只开到 10:30：绕远先去它，也好过按距离最短的顺序迟到
+    windows = [None, None, (9 * 60, 10 * 60 + 30)]
+    coords = [(120.150, 30.250), (120.151, 30.250), (120.160, 30.250)]
+    schedule = _schedule(coords, windows)
+    by_distance = [0, 1, 2]
+    km, lateness, _ = schedule.simulate(by_distance)
+    assert lateness > 0
+    assert schedule.cost(by_distance) == km + LATENESS_PENALTY_KM * lateness
+    order = schedule.two_opt(by_distance)
+    assert order[0] == 2
+    assert schedule.simulate(order)[1] == 0
+
+
+def test_optimize_waits_for_opening_and_skips_unparseable_locations():
+    pois = [
+        {"name": "西湖", "location": "120.150,30.250"},
+        {"name": "坐标缺失", "location": ""},
+        {"name": "灵隐寺", "location": "120.155,30.255", "open_time": "10:00-17:00"},
+        {"name": "坐标错误", "location": "杭州市西湖区"},
+        {"name": "无坐标"},
+    ]
+    result = optimize(pois, days=1, visit_minutes=60)
+    assert result["skipped"] == [1, 3, 4]
+    day = result["days"][0]
+    assert sorted(day["order"]) == [0, 2]
+    arrival, _ = day["times"][day["order"].index(2)]
+    assert arrival >= "10:00"
+    assert day["late_minutes"] == 0 and result["total_km"] == day["km"]
+
+
+def test_optimize_with_more_days_than_pois_or_no_valid_locations():
+    pois = [{"location": "120.150,30.250"}, {"location": "120.270,30.180"}]
+    result = optimize(pois, days=5)
+    assert len(result["days"]) == 2
+    assert sorted(d["order"] for d in result["days"]) == [[0], [1]]
+    assert all(d["km"] == 0 and d["legs_km"] == [] for d in result["days"])
+    assert optimize([{"location": "未知"}], days=2) == {"days": [], "skipped": [0], "total_km": 0.0}
+
+
+def test_parse_open_time_handles_overnight_ranges():
+    assert parse_open_time("08:00-17:30") == (480, 1050)
+    assert parse_open_time("周一至周日 18:00~02:00") == (1080, 1560)
+    assert parse_open_time([]) is None
@@ -0,0 +1,54 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.core.llm_cache import LLMResponseCache
+
+
+def _conversation(suffix: str):
+    return [
+        HumanMessage(content="去杭州玩两天", id=f"human-{suffix}"),
+        AIMessage(
+            content="",
+            id=f"ai-{suffix}",
+            tool_calls=[{"name": "get_weather", "args": {"city": "杭州"}, "id": "call_1"}],
+            response_metadata={"model_name": "qwen", "request_id": suffix},
+            usage_metadata={"input_tokens": 10, "output_tokens": len(suffix), "total_tokens": 10 + len(suffix)},
+        ),
+        ToolMessage(content='{"weather":"晴"}', tool_call_id="call_1", id=f"tool-{suffix}"),
+    ]
+
+
+def test_make_key_ignores_ids_and_metadata():
+    cache = LLMResponseCache(enabled=True, maxsize=16, ttl=60)
+    assert cache.make_key("m", "tools", "sys", _conversation("a")) == cache.make_key("m", "tools", "sys", _conversation("bb"))
+
+
+def test_make_key_depends_on_content_model_and_tool_calls():
+    cache = LLMResponseCache(enabled=True, maxsize=16, ttl=60)
+    base = cache.make_key("m", "tools", "sys", _conversation("a"))
+    changed = _conversation("a")
+    changed[1].tool_calls[0]["args"] = {"city": "苏州"}
+    assert cache.make_key("m", "tools", "sys", changed) != base
+    assert cache.make_key("other", "tools", "sys", _conversation("a")) != base
+    assert cache.make_key("m", "tools", "sys", [HumanMessage(content="去苏州玩两天")]) != base
+
+
+def test_disk_tier_serves_repeated_prompt(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return AIMessage(content="第一天：西湖")
+
+    async def run(cache):
+        return await cache.get_or_call(call, "m", "", "sys", _conversation("a"))
+
+    first = asyncio.run(run(LLMResponseCache(enabled=True, maxsize=16, ttl=60, disk_path=path)))
+    # 新实例的内存层为空，只能从磁盘层命中
+    second_cache = LLMResponseCache(enabled=True, maxsize=16, ttl=60, disk_path=path)
+    second = asyncio.run(run(second_cache))
+    assert first.content == second.content == "第一天：西湖"
+    assert len(calls) == 1
+    assert second_cache.disk_hits == 1
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.schemas import TravelRequest
+from src.services.plan_cache import is_cacheable_plan, plan_cache_key, seed_session_state
+from src.utils.cache import TTLCache
+
+
+def _request(**overrides):
+    fields = dict(departure="上海", destination="杭州", start_date="2025-05-01", end_date="2025-05-02")
+    fields.update(overrides)
+    return TravelRequest(**fields)
+
+
+def test_plan_cache_key_normalizes_interests():
+    assert plan_cache_key(_request(interests=["美食", " 历史 ", "美食", ""])) == plan_cache_key(
+        _request(interests=["历史", "美食"])
+    )
+    assert plan_cache_key(_request()) != plan_cache_key(_request(avoid_crowds=True))
+
+
+def test_streamed_load_is_shared_with_joiners():
+    cache = TTLCache(maxsize=4, ttl=10)
+    state = {"messages": [AIMessage(content="第一天")], "current_plan": "第一天"}
+
+    async def run():
+        assert cache.join_inflight("k") is None
+        load = cache.begin_load("k")
+        joined = cache.join_inflight("k")
+        assert joined is load
+        waiter = asyncio.ensure_future(asyncio.shield(joined))
+        await asyncio.sleep(0)
+        cache.finish_load("k", state, should_cache=is_cacheable_plan)
+        return await waiter
+
+    assert asyncio.run(run()) is state
+    assert cache.get("k") is state
+    assert cache.coalesced == 1
+
+
+def test_failed_or_uncacheable_load_is_not_stored():
+    cache = TTLCache(maxsize=4, ttl=10)
+
+    async def run():
+        cache.begin_load("failed")
+        joined = cache.join_inflight("failed")
+        cache.fail_load("failed", RuntimeError("图执行失败"))
+        with pytest.raises(RuntimeError):
+            await joined
+        cache.begin_load("empty")
+        cache.finish_load("empty", {"messages": []}, should_cache=is_cacheable_plan)
+
+    asyncio.run(run())
+    assert cache.get("failed") is None and cache.get("empty") is None
+    assert cache.join_inflight("failed") is None
+
+
+def test_seed_session_state_copies_messages():
+    cached = {"messages": [AIMessage(content="第一天")], "current_plan": "第一天"}
+    seeded = seed_session_state(cached)
+    seeded["messages"].append(AIMessage(content="追问"))
+    assert len(cached["messages"]) == 1
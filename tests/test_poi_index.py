@@ -0,0 +1,110 @@
+import pytest
+
+from src.services import poi_index as poi_index_module
+from src.services.poi_index import POIIndex
+
+TTL = 3600
+DETAIL_TTL = 600
+
+
+def _poi(poi_id, name, location, poi_type="风景名胜;风景名胜;风景名胜", address="西湖区", **extra):
+    return {"id": poi_id, "name": name, "type": poi_type, "address": address, "location": location, **extra}
+
+
+HANGZHOU_POIS = [
+    _poi("B001", "西湖风景名胜区", "120.1500,30.2500"),
+    _poi("B002", "西湖国宾馆", "120.1450,30.2480", poi_type="住宿服务;宾馆酒店;五星级宾馆"),
+    _poi("B003", "灵隐寺", "120.1010,30.2410"),
+    _poi("B004", "楼外楼(孤山路店)", "120.1440,30.2540", poi_type="餐饮服务;中餐厅;浙江菜"),
+]
+
+
+@pytest.fixture
+def index(tmp_path, fake_clock):
+    fake_clock(poi_index_module)
+    index = POIIndex(str(tmp_path / "poi" / "index.db"), ttl=TTL, detail_ttl=DETAIL_TTL)
+    index.upsert(HANGZHOU_POIS, city="杭州市")
+    index.upsert([_poi("S001", "西湖天地", "121.4700,31.2200")], city="上海市")
+    yield index
+    index.close()
+
+
+def _names(result):
+    return [p["name"] for p in result["pois"]]
+
+
+def test_search_matches_substrings_within_city(index):
+    result = index.search("k1", "杭州", "西湖国宾", "", limit=1)
+    assert _names(result) == ["西湖国宾馆"] and result["source"] == "local_index"
+    # 按城市前缀过滤：上海的“西湖天地”不会出现在杭州的结果中
+    assert sorted(_names(index.search("k2", "杭州", "名胜区", "", limit=1))) == ["西湖风景名胜区"]
+    assert _names(index.search("k3", "上海", "西湖天地", "", limit=1)) == ["西湖天地"]
+    # 按类型过滤
+    assert _names(index.search("k4", "杭州", "孤山路", "餐饮", limit=1)) == ["楼外楼(孤山路店)"]
+
+
+def test_short_queries_fall_back_to_like(index):
+    # trigram 分词无法匹配不足 3 个字符的关键词，这类查询改用 LIKE
+    conn = index._conn
+    assert conn.execute("SELECT COUNT(*) FROM pois_fts WHERE pois_fts MATCH ?", ('"西湖"',)).fetchone()[0] == 0
+    assert sorted(_names(index.search("k1", "杭州", "西湖", "", limit=2))) == ["西湖国宾馆", "西湖风景名胜区"]
+    assert _names(index.search("k2", "杭州", "寺", "", limit=1)) == ["灵隐寺"]
+    # 类型字段同样可以被短关键词匹配
+    assert _names(index.search("k3", "杭州", "宾馆", "", limit=1)) == ["西湖国宾馆"]
+
+
+def test_search_misses_when_not_enough_fresh_results(index, fake_clock):
+    assert index.search("k1", "杭州", "西湖", "", limit=3) is None
+    assert index.search("k2", "杭州", "雷峰塔", "", limit=1) is None
+    clock = fake_clock()
+    clock.now += TTL + 1
+    assert index.search("k3", "杭州", "灵隐寺", "", limit=1) is None
+
+
+def test_recorded_search_keeps_amap_order_until_expired(index, fake_clock):
+    result = {"status": "1", "pois": [HANGZHOU_POIS[2], HANGZHOU_POIS[0]]}
+    index.record_search("search|杭州|景点", result, city="杭州市")
+    # 相同查询直接返回记录的结果与顺序，即使关键词本身无法匹配
+    assert _names(index.search("search|杭州|景点", "杭州", "景点", "", limit=5)) == ["灵隐寺", "西湖风景名胜区"]
+    clock = fake_clock()
+    clock.now += TTL + 1
+    assert index.search("search|杭州|景点", "杭州", "景点", "", limit=5) is None
+
+
+def test_nearby_filters_by_radius_and_sorts_by_distance(index):
+    result = index.nearby("n1", "120.1500,30.2500", 1000, "", limit=3)
+    assert _names(result) == ["西湖风景名胜区", "西湖国宾馆", "楼外楼(孤山路店)"]
+    distances = [int(p["distance"]) for p in result["pois"]]
+    assert distances == sorted(distances) and distances[0] == 0 and distances[-1] < 1000
+    # 灵隐寺约 5km 外，不在 1km 半径内
+    assert index.nearby("n2", "120.1500,30.2500", 1000, "", limit=4) is None
+    assert _names(index.nearby("n3", "120.1500,30.2500", 6000, "寺", limit=1)) == ["灵隐寺"]
+    assert index.nearby("n4", "not-a-location", 1000, "", limit=1) is None
+
+
+def test_detail_requires_fresh_detail_data(index, fake_clock):
+    assert index.detail("B003") is None
+    detail = _poi("B003", "灵隐寺", "120.1010,30.2410", biz_ext={"opentime2": "07:00-18:00", "rating": "4.8"})
+    index.upsert([detail], city="杭州市", detail=True)
+    assert index.detail("B003")["pois"][0]["biz_ext"]["opentime2"] == "07:00-18:00"
+    # 之后的搜索结果字段更少，不覆盖已有的详情数据
+    index.upsert([HANGZHOU_POIS[2]], city="杭州市")
+    assert index.detail("B003")["pois"][0]["biz_ext"]["rating"] == "4.8"
+    clock = fake_clock()
+    clock.now += DETAIL_TTL + 1
+    assert index.detail("B003") is None
+
+
+def test_upsert_refreshes_full_text_index(index):
+    renamed = _poi("B002", "杭州西子宾馆", "120.1450,30.2480", poi_type="住宿服务;宾馆酒店;五星级宾馆")
+    assert index.upsert([renamed, {"name": "没有 id 的 POI"}], city="杭州市") == ["B002"]
+    assert index.search("k1", "杭州", "西湖国宾", "", limit=1) is None
+    assert _names(index.search("k2", "杭州", "西子宾馆", "", limit=1)) == ["杭州西子宾馆"]
+    assert index.stats()["size"] == 5
+
+
+def test_stats_counts_hits_and_misses(index):
+    index.search("k1", "杭州", "灵隐寺", "", limit=1)
+    index.search("k2", "杭州", "雷峰塔", "", limit=1)
+    index.detail("B001")
+    assert index.stats() == {"size": 5, "hits": 1, "misses": 2}
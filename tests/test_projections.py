@@ -0,0 +1,107 @@
+import json
+
+from src.core.metrics import TOOL_TOKENS_SAVED, record_tool_tokens_saved, track_request
+from src.graph.projections import (
+    BYTES_PER_TOKEN,
+    MAX_POIS,
+    MAX_ROUTE_STEPS,
+    MAX_TRANSITS,
+    estimate_tokens_saved,
+    project_pois,
+    project_route,
+    project_tool_result,
+    project_weather,
+)
+
+
+def _poi(i):
+    return {
+        "id": f"B0FFG{i:05d}", "name": f"西湖景点{i}", "type": "风景名胜;公园广场;公园", "typecode": "110101",
+        "location": "120.155070,30.251940", "address": "龙井路1号", "tel": [], "distance": "",
+        "photos": [{"url": "http://store.is.autonavi.com/showpic/abc.jpg", "title": []}],
+        "biz_ext": {"rating": "4.8", "cost": [], "open_time": "", "opentime2": "08:00-17:30"},
+    }
+
+
+def _route_payload(steps=40):
+    step = {"instruction": "向东步行100米右转进入湖滨路", "polyline": ";".join(["120.16,30.25"] * 50)}
+    return {"status": "1", "route": {"paths": [{"distance": "5200", "duration": "1800", "steps": [step] * steps}]}}
+
+
+def test_project_pois_keeps_decision_fields_only():
+    raw = {"status": "1", "info": "OK", "count": "25", "pois": [_poi(i) for i in range(25)], "suggestion": {}}
+    projected = project_pois(raw)
+    assert projected["count"] == 25 and len(projected["pois"]) == MAX_POIS
+    assert projected["pois"][0] == {
+        "id": "B0FFG00000", "name": "西湖景点0", "type": "风景名胜", "location": "120.155070,30.251940",
+        "address": "龙井路1号", "rating": "4.8", "open_time": "08:00-17:30",
+    }
+    assert project_pois({"status": "0", "info": "INVALID_USER_KEY"}) == {"error": "INVALID_USER_KEY"}
+
+
+def test_project_weather_handles_forecasts_and_live_reports():
+    forecast = {"status": "1", "forecasts": [{"city": "杭州市", "adcode": "330100", "casts": [
+        {"date": "2025-05-01", "week": "4", "dayweather": "晴", "nightweather": "多云",
+         "daytemp": "26", "nighttemp": "17", "daywind": "东", "nightwind": "东", "daypower": "1-3"},
+    ]}]}
+    assert project_weather(forecast) == {
+        "city": "杭州市",
+        "forecast": [{"date": "2025-05-01", "day": "晴", "night": "多云", "temp": "17~26℃", "wind": "东"}],
+    }
+    live = {"status": "1", "lives": [{"city": "杭州市", "weather": "小雨", "temperature": "20",
+                                      "winddirection": "东北", "humidity": [], "reporttime": "2025-05-01 10:00:00"}]}
+    assert project_weather(live) == {"city": "杭州市", "weather": "小雨", "temperature": "20", "wind": "东北"}
+    assert project_weather({"status": "1", "lives": []}) == {"error": "未获取到天气信息"}
+
+
+def test_project_route_summarizes_driving_and_transit():
+    driving = project_route(_route_payload(steps=20))
+    assert driving["distance_m"] == "5200" and driving["duration_s"] == "1800"
+    assert len(driving["steps"]) == MAX_ROUTE_STEPS + 1 and driving["steps"][-1] == "…共20步"
+    assert "polyline" not in json.dumps(driving)
+
+    transit = {"status": "1", "route": {"distance": "8000", "taxi_cost": "25", "transits": [
+        {"duration": "2400", "cost": "2", "walking_distance": "600", "segments": [
+            {"bus": {"buslines": [{"name": "地铁1号线(湘湖--下沙江滨)", "polyline": "120.1,30.2;120.2,30.3"},
+                                  {"name": "地铁1号线(备选)"}]}},
+            {"bus": {"buslines": []}},
+        ]}
+        for _ in range(5)
+    ]}}
+    projected = project_route(transit)
+    assert projected["taxi_cost"] == "25" and len(projected["options"]) == MAX_TRANSITS
+    assert projected["options"][0] == {
+        "duration_s": "2400", "cost": "2", "walking_m": "600", "lines": ["地铁1号线(湘湖--下沙江滨)"],
+    }
+    assert project_route({"status": "1", "route": {"paths": []}}) == {"error": "未找到路线"}
+
+
+def test_project_tool_result_marks_stale_data_and_passes_unknown_tools_through():
+    stale = {"status": "1", "pois": [_poi(0)], "stale": True, "stale_age_s": 120}
+    projected = json.loads(project_tool_result("search_poi", stale))
+    assert projected["stale"] is True and projected["stale_age_s"] == 120
+    assert json.loads(project_tool_result("search_poi", {"error": "熔断"})) == {"error": "熔断"}
+    assert project_tool_result("optimize_itinerary", {"days": [["西湖"]]}) == '{"days":[["西湖"]]}'
+
+
+def test_tokens_saved_is_estimated_from_bytes():
+    raw = _route_payload()
+    content = project_tool_result("get_route", raw)
+    saved = estimate_tokens_saved(raw, content)
+    assert saved > 1000
+    assert estimate_tokens_saved(content, content) == 0
+    # 投影结果比原始结果大时（如错误信息）不记为负数
+    assert estimate_tokens_saved({}, "x" * BYTES_PER_TOKEN * 10) == 0
+
+
+def test_tokens_saved_is_reported_once_per_request():
+    before = TOOL_TOKENS_SAVED._values.get(("get_route",), 0.0)
+    with track_request("generate_plan") as request_metrics:
+        record_tool_tokens_saved("get_route", 100)
+        record_tool_tokens_saved("get_route", 50)
+        record_tool_tokens_saved("prefetch", 20)
+        # 请求结束前只在请求内累计
+        assert TOOL_TOKENS_SAVED._values.get(("get_route",), 0.0) == before
+    assert request_metrics.tool_tokens_saved == 170
+    assert request_metrics.tool_tokens_saved_by_tool == {"get_route": 150, "prefetch": 20}
+    assert TOOL_TOKENS_SAVED._values[("get_route",)] == before + 150
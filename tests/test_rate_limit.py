@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from src.core.rate_limit import TokenBucket
+
+
+def test_disabled_bucket_never_waits():
+    bucket = TokenBucket("test", rate=0, capacity=1)
+    assert asyncio.run(bucket.acquire(1000)) == 0.0
+
+
+def test_burst_is_free_then_waits_for_refill():
+    bucket = TokenBucket("test", rate=100, capacity=10)
+
+    async def run():
+        burst = await bucket.acquire(10)
+        refill = await bucket.acquire(5)
+        return burst, refill
+
+    burst, refill = asyncio.run(run())
+    assert burst < 0.01
+    # 5 个令牌按每秒 100 个补充约需 50ms
+    assert 0.04 <= refill < 0.2
+
+
+def test_concurrent_waiters_are_served_in_turn():
+    bucket = TokenBucket("test", rate=100, capacity=10)
+
+    async def run():
+        await bucket.acquire(10)
+        start = time.perf_counter()
+        await asyncio.gather(*(bucket.acquire(5) for _ in range(3)))
+        return time.perf_counter() - start
+
+    # 三个请求共需 15 个令牌，只能按补充速度依次放行
+    assert 0.13 <= asyncio.run(run()) < 0.4
+
+
+def test_adjust_overdraft_delays_next_caller():
+    bucket = TokenBucket("test", rate=100, capacity=10)
+
+    async def run():
+        await bucket.acquire(10)
+        bucket.adjust(5)  # 实际用量比预扣多 5 个，透支
+        return await bucket.acquire(1)
+
+    assert asyncio.run(run()) >= 0.05
+
+
+def test_oversized_request_is_capped_at_capacity():
+    bucket = TokenBucket("test", rate=100, capacity=10)
+    assert asyncio.run(bucket.acquire(1000)) < 0.01
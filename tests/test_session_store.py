@@ -0,0 +1,197 @@
+import asyncio
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.services import session_store as store_module
+from src.services.session_store import SessionStore, SQLiteSessionStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(store_module)
+
+
+def _with_messages(session, *texts):
+    session["state"]["messages"] = [HumanMessage(content=texts[0])] + [AIMessage(content=t) for t in texts[1:]]
+    return session
+
+
+def _contents(session):
+    return [m.content for m in session["state"]["messages"]]
+
+
+# ---- 内存存储 ----
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = SessionStore(max_sessions=2, idle_ttl=0)
+    for session_id in ("a", "b"):
+        store.save(session_id, _with_messages(store.get(session_id), session_id))
+    store.get("a")
+    store.save("c", _with_messages(store.get("c"), "c"))
+    assert "b" not in store and "a" in store and "c" in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_memory_store_expires_idle_sessions(clock):
+    store = SessionStore(max_sessions=10, idle_ttl=60)
+    store.save("a", _with_messages(store.get("a"), "去杭州"))
+    clock.now += 61
+    assert _contents(store.get("a")) == []
+    assert store.stats()["expired"] == 1
+
+
+def test_memory_store_reports_evictions_through_async_interface(clock):
+    store = SessionStore(max_sessions=1, idle_ttl=0)
+    evicted = []
+    store.on_evict = evicted.extend
+
+    async def run():
+        for session_id in ("a", "b", "c"):
+            await store.asave(session_id, await store.aget(session_id))
+
+    asyncio.run(run())
+    assert evicted == ["a", "b"]
+
+
+# ---- SQLite 存储 ----
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite")
+
+
+def test_sqlite_store_round_trips_state(db_path):
+    store = SQLiteSessionStore(db_path)
+    assert _contents(store.get("a")) == []
+    store.save("a", _with_messages(store.get("a"), "去杭州", "第一天：西湖"))
+    assert _contents(store.get("a")) == ["去杭州", "第一天：西湖"]
+    assert "a" in store and len(store) == 1
+    # 另一个实例（相当于另一个 worker）读到同一份会话
+    assert _contents(SQLiteSessionStore(db_path).get("a")) == ["去杭州", "第一天：西湖"]
+
+
+def test_sqlite_store_filters_and_evicts_expired_sessions(db_path, clock):
+    store = SQLiteSessionStore(db_path, idle_ttl=60, evict_interval=100)
+    store.save("a", _with_messages(store.get("a"), "去杭州"))
+    clock.now += 61
+    # 淘汰周期未到时也不会读到过期会话
+    assert _contents(store.get("a")) == []
+    assert "a" in store
+    clock.now += 40
+    store.get("b")
+    assert "a" not in store
+    assert store.stats()["expired"] == 1
+
+
+def test_sqlite_store_evicts_overflow_on_schedule(db_path, clock):
+    store = SQLiteSessionStore(db_path, max_sessions=2, idle_ttl=0, evict_interval=30)
+    evicted = []
+    store.on_evict = evicted.extend
+    for session_id in ("a", "b", "c", "d"):
+        clock.now += 1
+        store.save(session_id, store.get(session_id))
+    # 第一次访问时已执行过一次淘汰，之后 30 秒内不再检查，会话数可以短暂超过上限
+    assert len(store) == 4 and evicted == []
+    clock.now += 30
+    store.get("d")
+    assert len(store) == 2 and evicted == ["a", "b"]
+    assert store.cached_stats()["sessions"] == 2
+
+
+def test_sqlite_cached_stats_do_not_query(db_path, clock):
+    store = SQLiteSessionStore(db_path, evict_interval=30)
+    store.save("a", _with_messages(store.get("a"), "去杭州"))
+    assert store.cached_stats()["sessions"] == 0
+    assert store.stats()["sessions"] == 1
+    assert store.cached_stats()["sessions"] == 1
+
+
+def test_lock_serializes_requests_for_one_session(db_path):
+    store = SQLiteSessionStore(db_path)
+    order = []
+
+    async def request(name, session_id):
+        async with store.lock(session_id):
+            order.append(f"{name}:start")
+            await asyncio.sleep(0.05)
+            order.append(f"{name}:end")
+
+    async def run():
+        await asyncio.gather(request("first", "a"), request("second", "a"), request("other", "b"))
+
+    asyncio.run(run())
+    first, second = order.index("first:end"), order.index("second:start")
+    assert first < second
+    # 不同会话互不等待
+    assert order.index("other:start") < first
+
+
+def test_lock_lease_expires(db_path, clock):
+    holder = SQLiteSessionStore(db_path, lock_ttl=10)
+    assert holder._try_lease("a", "crashed-worker")
+    other = SQLiteSessionStore(db_path, lock_ttl=10)
+    assert not other._try_lease("a", "owner")
+    clock.now += 11
+    assert other._try_lease("a", "owner")
+
+
+# ---- 跨进程 ----
+
+def _run_child(db_path, body):
+    """在另一个 Python 进程中使用同一个数据库文件，相当于另一个 worker"""
+    script = textwrap.dedent(
+        f"""
+        import asyncio, sys
+        from langchain_core.messages import AIMessage
+        from src.services.session_store import SQLiteSessionStore
+        store = SQLiteSessionStore({db_path!r})
+        """
+    ) + textwrap.dedent(body)
+    return subprocess.Popen(
+        [sys.executable, "-c", script], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+
+def test_sessions_are_shared_between_processes(db_path):
+    store = SQLiteSessionStore(db_path)
+    store.save("a", _with_messages(store.get("a"), "去杭州"))
+    child = _run_child(db_path, """
+        session = store.get("a")
+        session["state"]["messages"].append(AIMessage(content="来自另一个进程"))
+        store.save("a", session)
+    """)
+    _, stderr = child.communicate(timeout=60)
+    assert child.returncode == 0, stderr
+    assert _contents(store.get("a")) == ["去杭州", "来自另一个进程"]
+
+
+def test_lock_excludes_other_processes(db_path):
+    child = _run_child(db_path, """
+        import time
+        async def hold():
+            async with store.lock("a"):
+                print("locked", flush=True)
+                time.sleep(0.5)
+        asyncio.run(hold())
+    """)
+    try:
+        assert child.stdout.readline().strip() == "locked"
+        store = SQLiteSessionStore(db_path)
+
+        async def acquire():
+            start = time.perf_counter()
+            async with store.lock("a"):
+                return time.perf_counter() - start
+
+        assert asyncio.run(acquire()) >= 0.2
+    finally:
+        _, stderr = child.communicate(timeout=60)
+    assert child.returncode == 0, stderr
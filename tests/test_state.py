@@ -0,0 +1,83 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from src.graph.state import GraphState, append_messages, merge_tool_results
+
+
+def test_append_messages_does_not_mutate_inputs():
+    left = [HumanMessage(content="去杭州")]
+    right = [AIMessage(content="好的")]
+    merged = append_messages(left, right)
+    assert [m.content for m in merged] == ["去杭州", "好的"]
+    assert len(left) == 1 and len(right) == 1
+    assert merged is not left
+
+
+def test_append_messages_accepts_single_message_and_empty_updates():
+    left = [HumanMessage(content="去杭州")]
+    assert append_messages(left, None) is left
+    assert append_messages(left, []) is left
+    assert append_messages(None, AIMessage(content="好的"))[0].content == "好的"
+
+
+def test_saved_checkpoints_do_not_change_in_later_steps():
+    def node(name):
+        def run(state: GraphState):
+            return {"messages": [AIMessage(content=name)]}
+        return run
+
+    builder = StateGraph(GraphState)
+    builder.add_node("router", node("router"))
+    builder.add_node("summarizer", node("summarizer"))
+    builder.add_edge(START, "router")
+    builder.add_edge("router", "summarizer")
+    builder.add_edge("summarizer", END)
+    graph = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t"}}
+
+    async def run():
+        await graph.ainvoke({"messages": [HumanMessage(content="去杭州")]}, config)
+        return [snapshot async for snapshot in graph.aget_state_history(config)]
+
+    history = asyncio.run(run())
+    # 最新的检查点在前：每一步只比上一步多一条消息，先保存的检查点没有被后续步骤改写
+    counts = [len(snapshot.values.get("messages", [])) for snapshot in history]
+    assert counts == sorted(counts, reverse=True)
+    assert counts[0] == 3 and counts[-1] == 0
+
+
+def test_merge_tool_results_keeps_every_round():
+    first = {"call_1": {"name": "search_poi", "result": {"pois": []}}}
+    merged = merge_tool_results(first, {"call_2": {"name": "get_weather", "result": {}}})
+    assert sorted(merged) == ["call_1", "call_2"]
+    assert sorted(first) == ["call_1"]
+    assert merge_tool_results(first, {}) is first
+    assert merge_tool_results(first, None) == {}
+
+
+def test_tool_results_accumulate_across_rounds_until_cleared():
+    def tool_round(call_id):
+        def run(state: GraphState):
+            return {"tool_results": {call_id: {"name": "search_poi", "result": {"count": 1}}}}
+        return run
+
+    seen = {}
+
+    def summarizer(state: GraphState):
+        seen.update(state["tool_results"])
+        return {"tool_results": None}
+
+    builder = StateGraph(GraphState)
+    builder.add_node("round_1", tool_round("call_1"))
+    builder.add_node("round_2", tool_round("call_2"))
+    builder.add_node("summarizer", summarizer)
+    builder.add_edge(START, "round_1")
+    builder.add_edge("round_1", "round_2")
+    builder.add_edge("round_2", "summarizer")
+    builder.add_edge("summarizer", END)
+    final_state = asyncio.run(builder.compile().ainvoke({"tool_results": {}}))
+    assert sorted(seen) == ["call_1", "call_2"]
+    assert final_state["tool_results"] == {}
@@ -0,0 +1,65 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.graph.state import initialize_graph_state
+from src.services.state_codec import dumps_state, loads_state
+
+
+def _state():
+    state = initialize_graph_state()
+    state["messages"] = [
+        SystemMessage(content="你是旅行规划助手"),
+        HumanMessage(content="生成2天的旅游计划", id="human-1"),
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[
+                {"name": "get_weather", "args": {"city": "杭州"}, "id": "call_1"},
+                {"name": "search_poi", "args": {"keywords": "西湖", "city": "杭州"}, "id": "call_2"},
+            ],
+            usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150},
+            response_metadata={"model_name": "qwen-turbo"},
+        ),
+        ToolMessage(content='{"weather":"晴"}', tool_call_id="call_1", name="get_weather"),
+        ToolMessage(content='{"pois":[]}', tool_call_id="call_2", name="search_poi"),
+        AIMessage(content="第一天：西湖"),
+    ]
+    state["current_plan"] = "第一天：西湖"
+    state["max_iterations"] = 3
+    state["next_node"] = "summarizer"
+    state["tool_results"] = {"call_1": {"weather": "晴", "temperature": [18, 26]}}
+    state["travel_request"] = {"departure": "上海", "destination": "杭州", "interests": ["美食"]}
+    return state
+
+
+def test_round_trip_keeps_every_message_type():
+    original = _state()
+    restored = loads_state(dumps_state(original))
+    assert [type(m) for m in restored["messages"]] == [type(m) for m in original["messages"]]
+    assert restored["messages"] == original["messages"]
+
+
+def test_round_trip_keeps_tool_calls_and_ids():
+    restored = loads_state(dumps_state(_state()))
+    ai = restored["messages"][2]
+    assert [tc["id"] for tc in ai.tool_calls] == ["call_1", "call_2"]
+    assert ai.tool_calls[1]["args"] == {"keywords": "西湖", "city": "杭州"}
+    assert ai.usage_metadata["total_tokens"] == 150
+    assert [m.tool_call_id for m in restored["messages"][3:5]] == ["call_1", "call_2"]
+
+
+def test_round_trip_keeps_other_fields():
+    original = _state()
+    restored = loads_state(dumps_state(original))
+    for field in ("current_plan", "max_iterations", "next_node", "tool_results", "travel_request"):
+        assert restored[field] == original[field]
+
+
+class Stamp:
+    def __str__(self):
+        return "2025-10-01"
+
+
+def test_unencodable_values_fall_back_to_strings():
+    state = _state()
+    state["tool_results"] = {"call_1": {"at": Stamp()}}
+    assert loads_state(dumps_state(state))["tool_results"] == {"call_1": {"at": "2025-10-01"}}